@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CampusRoom, Department, DepartmentAlias
+
+
+class DepartmentAliasInline(admin.TabularInline):
+    model = DepartmentAlias
+    extra = 1
+
+
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ("code", "created_at")
+    search_fields = ("code", "aliases__alias")
+    inlines = [DepartmentAliasInline]
+
+
+@admin.register(CampusRoom)
+class CampusRoomAdmin(admin.ModelAdmin):
+    list_display = ("building", "room_number", "capacity", "created_at")
+    list_filter = ("building",)
+    search_fields = ("building", "room_number")
@@ -0,0 +1,79 @@
+import re
+
+from .models import Department, DepartmentAlias
+
+
+def normalize_department_name(value):
+    """Canonical spelling used for department aliases: trimmed, upper-case, single-spaced."""
+    return re.sub(r"\s+", " ", str(value or "")).strip().upper()
+
+
+class DepartmentResolver:
+    """
+    Resolve free-text department / branch names to canonical `Department` ids.
+
+    The alias table is loaded once per resolver, so a whole upload (or a whole
+    schedule) is resolved with a single query. Names that match no alias are
+    collected in `unmatched`; `register_unmatched()` turns them into new
+    departments in bulk so every row ends up with an integer FK, and the caller
+    reports them back to the admin at upload time.
+    """
+
+    def __init__(self):
+        self._alias_map = dict(DepartmentAlias.objects.values_list("alias", "department_id"))
+        self._codes = dict(Department.objects.values_list("id", "code"))
+        self.unmatched = []
+        self.registered = []
+
+    def resolve(self, raw_name):
+        alias = normalize_department_name(raw_name)
+        if not alias or alias == "EMPTY":
+            return None
+        department_id = self._alias_map.get(alias)
+        if department_id is None and alias not in self.unmatched:
+            self.unmatched.append(alias)
+        return department_id
+
+    def code_for(self, department_id):
+        return self._codes.get(department_id, "")
+
+    def register_unmatched(self):
+        """Create departments (and their self-alias) for every unmatched name; return the new codes."""
+        pending = [alias for alias in self.unmatched if alias not in self._alias_map]
+        if not pending:
+            return []
+
+        Department.objects.bulk_create([Department(code=alias) for alias in pending], ignore_conflicts=True)
+        created = dict(Department.objects.filter(code__in=pending).values_list("code", "id"))
+        DepartmentAlias.objects.bulk_create(
+            [DepartmentAlias(alias=alias, department_id=created[alias]) for alias in pending if alias in created],
+            ignore_conflicts=True,
+        )
+
+        for alias in pending:
+            department_id = created.get(alias)
+            if department_id is not None:
+                self._alias_map[alias] = department_id
+                self._codes[department_id] = alias
+        self.unmatched = []
+        self.registered.extend(pending)
+        return pending
+
+    def resolve_or_register(self, raw_name):
+        department_id = self.resolve(raw_name)
+        if department_id is None and self.unmatched:
+            self.register_unmatched()
+            department_id = self._alias_map.get(normalize_department_name(raw_name))
+        return department_id
+
+    def resolve_all(self, raw_names):
+        """Resolve a column of names, registering any unmatched ones; returns ids in input order."""
+        raw_names = list(raw_names)
+        department_ids = [self.resolve(raw) for raw in raw_names]
+        if self.unmatched:
+            self.register_unmatched()
+            department_ids = [
+                department_id if department_id is not None else self.resolve(raw)
+                for raw, department_id in zip(raw_names, department_ids)
+            ]
+        return department_ids
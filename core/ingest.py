@@ -0,0 +1,540 @@
+"""
+Streaming ingestion for student upload files.
+
+Uploads are read in bounded chunks by `core.uploads` (pandas `chunksize` for
+CSV, openpyxl `read_only` row iteration for XLSX), each chunk is normalized
+with column-wise pandas operations and handed to a sink in one batch. Peak
+memory therefore depends on the chunk size, not on the size of the file.
+"""
+import json
+import os
+import re
+import secrets
+import time
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+from .bulk import bulk_insert
+from .models import Student, StudentDataFile
+from .uploads import iter_upload_chunks
+
+
+STUDENT_CHUNK_ROWS = 5000
+STUDENT_WRITE_BATCH = 1000
+MAX_ERROR_REPORT_ROWS = 10000
+ERROR_REPORT_TTL_SECONDS = 24 * 60 * 60
+PARSED_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+STUDENT_COLUMN_ALIASES = {
+    "course": ["course"],
+    "semester": ["sem", "semester"],
+    "branch": ["branch"],
+    "room_number": ["room number", "room_number", "room no", "roomno"],
+    "name": ["student name", "name"],
+    "roll_number": ["rollno", "roll_no", "roll number", "roll no"],
+    "registration_number": ["reg no", "registration number", "reg_no"],
+    "student_id": ["std id", "student id", "student_id"],
+    "academic_status": ["academic_status", "academic status", "status"],
+}
+STUDENT_FIELDS = list(STUDENT_COLUMN_ALIASES)
+STUDENT_LOAD_FIELDS = ["student_file_id", "canonical_department_id"] + STUDENT_FIELDS
+
+REQUIRED_STUDENT_FIELDS = {
+    "roll_number": "ROLL NO",
+    "registration_number": "REG NO",
+    "student_id": "STD ID",
+}
+
+ERROR_REPORT_COLUMNS = ["chunk", "sheet", "row", "reason", "roll_number", "registration_number", "student_id", "name"]
+
+
+# =========================
+# Normalization
+# =========================
+def _normalized_column(frame, aliases):
+    """First non-null value across `aliases`, stripped; "" when none is present."""
+    column = None
+    for alias in aliases:
+        if alias in frame.columns:
+            values = frame[alias]
+            column = values if column is None else column.where(column.notna(), values)
+    if column is None:
+        return pd.Series("", index=frame.index, dtype=object)
+    return column.where(column.notna(), "").astype(str).str.strip()
+
+
+def has_required_student_columns(columns):
+    columns = {str(c).strip().lower() for c in columns}
+    return all(
+        any(alias in columns for alias in STUDENT_COLUMN_ALIASES[field])
+        for field in REQUIRED_STUDENT_FIELDS
+    )
+
+
+def normalize_student_chunk(frame):
+    """
+    Normalize one raw chunk into the student field layout.
+
+    Returns `(valid, rejected)` frames indexed by position in the chunk; blank
+    rows are dropped from both. `rejected` carries a `reason` column.
+    """
+    frame = frame.copy()
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    frame = frame.reset_index(drop=True)
+    cells = frame.apply(lambda column: column.where(column.notna(), "").astype(str).str.strip())
+    frame = frame[(cells != "").any(axis=1)]
+
+    normalized = pd.DataFrame(
+        {field: _normalized_column(frame, aliases) for field, aliases in STUDENT_COLUMN_ALIASES.items()},
+        index=frame.index,
+    )
+
+    missing = pd.DataFrame(
+        {label: normalized[field] == "" for field, label in REQUIRED_STUDENT_FIELDS.items()},
+        index=normalized.index,
+    )
+    invalid = missing.any(axis=1)
+
+    rejected = normalized.loc[invalid].copy()
+    labels = list(missing.columns)
+    rejected["reason"] = [
+        "Missing " + ", ".join(label for label, is_missing in zip(labels, row) if is_missing)
+        for row in missing.loc[invalid].itertuples(index=False)
+    ]
+
+    return normalized.loc[~invalid], rejected
+
+
+# =========================
+# Pipeline
+# =========================
+class StudentIngestor:
+    """
+    Drive an upload through read -> normalize -> sink, one chunk at a time.
+
+    `sink` is called with each chunk's valid rows as a DataFrame whose columns
+    are `STUDENT_FIELDS`. Rejected rows are collected (up to
+    `MAX_ERROR_REPORT_ROWS`) in `errors` for the downloadable report. When a
+    `cache_writer` is given, valid rows are also streamed into the parsed
+    upload cache so identical bytes never need parsing again.
+    """
+
+    def __init__(self, sink, chunk_rows=STUDENT_CHUNK_ROWS, cache_writer=None):
+        self.sink = sink
+        self.chunk_rows = chunk_rows
+        self.cache_writer = cache_writer
+        self.total = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.from_cache = False
+
+    @classmethod
+    def for_existing_file(cls, student_file, rejects=None):
+        """Result for re-uploading the bytes `student_file` already holds, without parsing."""
+        ingestor = cls(sink=None)
+        ingestor._restore_rejects(rejects)
+        ingestor.inserted = student_file.row_count
+        ingestor.total = ingestor.inserted + ingestor.skipped
+        return ingestor
+
+    def run(self, uploaded_file):
+        try:
+            self._run(uploaded_file)
+        except Exception:
+            if self.cache_writer is not None:
+                self.cache_writer.abort()
+            raise
+        if self.cache_writer is not None:
+            self.cache_writer.close(self.skipped, self.errors, self.errors_truncated)
+        return self
+
+    def _run(self, uploaded_file):
+        seen_chunk = False
+        for chunk_number, chunk in enumerate(iter_upload_chunks(uploaded_file, self.chunk_rows), start=1):
+            if not has_required_student_columns(chunk.frame.columns):
+                if not seen_chunk:
+                    raise ValueError("File missing required columns: ROLL NO, REG NO, STD ID")
+                self._record_errors([{
+                    "chunk": chunk_number,
+                    "sheet": chunk.sheet,
+                    "row": chunk.first_row,
+                    "reason": "Sheet missing required columns: ROLL NO, REG NO, STD ID",
+                }])
+                continue
+            seen_chunk = True
+
+            valid, rejected = normalize_student_chunk(chunk.frame)
+            self.total += len(valid) + len(rejected) + len(chunk.bad_lines)
+            self.skipped += len(rejected) + len(chunk.bad_lines)
+
+            if chunk.bad_lines:
+                self._record_errors([{
+                    "chunk": chunk_number,
+                    "sheet": chunk.sheet,
+                    "row": line.row,
+                    "reason": f"Expected {line.expected} fields, found {len(line.fields)}: " + " | ".join(line.fields),
+                } for line in chunk.bad_lines])
+
+            if not rejected.empty:
+                report = rejected[["roll_number", "registration_number", "student_id", "name", "reason"]].copy()
+                report["row"] = report.index + chunk.first_row
+                report["chunk"] = chunk_number
+                report["sheet"] = chunk.sheet
+                self._record_errors(report[ERROR_REPORT_COLUMNS].to_dict(orient="records"))
+
+            if not valid.empty:
+                valid = valid.reset_index(drop=True)
+                self.sink(valid)
+                if self.cache_writer is not None:
+                    self.cache_writer(valid)
+                self.inserted += len(valid)
+
+        if self.total == 0:
+            raise ValueError("File is empty. Please check your file.")
+
+    def replay(self, frame, rejects=None):
+        """
+        Feed an already-normalized frame (from the parsed cache) to the sink in
+        chunks. `rejects` (see `load_parsed_rejects`) restores the skipped count
+        and row errors of the original parse.
+        """
+        self.from_cache = True
+        for start in range(0, len(frame), self.chunk_rows):
+            self.sink(frame.iloc[start:start + self.chunk_rows].reset_index(drop=True))
+        self._restore_rejects(rejects)
+        self.inserted = len(frame)
+        self.total = self.inserted + self.skipped
+        return self
+
+    def _restore_rejects(self, rejects):
+        rejects = rejects or {}
+        self.skipped = rejects.get("skipped", 0)
+        self.errors = list(rejects.get("errors", []))
+        self.errors_truncated = rejects.get("errors_truncated", False)
+
+    def _record_errors(self, rows):
+        room = MAX_ERROR_REPORT_ROWS - len(self.errors)
+        if len(rows) > room:
+            self.errors_truncated = True
+            rows = rows[:max(room, 0)]
+        self.errors.extend(rows)
+
+
+class StudentRecordCollector:
+    """Sink that keeps normalized rows as plain dicts (session-backed wizard uploads)."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, frame):
+        self.records.extend(frame[STUDENT_FIELDS].to_dict(orient="records"))
+
+
+class StudentFileWriter:
+    """Sink that loads normalized rows into `Student` for one `StudentDataFile`
+    (COPY on PostgreSQL, batched bulk_create elsewhere; see `core.bulk`)."""
+
+    def __init__(self, student_file, resolver, batch_size=STUDENT_WRITE_BATCH):
+        self.student_file = student_file
+        self.resolver = resolver
+        self.batch_size = batch_size
+
+    def __call__(self, frame):
+        branches = frame["branch"].unique().tolist()
+        department_ids = dict(zip(branches, self.resolver.resolve_all(branches)))
+
+        rows = zip(
+            repeat(self.student_file.id),
+            [department_ids.get(branch) for branch in frame["branch"]],
+            *(frame[field].tolist() for field in STUDENT_FIELDS),
+        )
+        return bulk_insert(Student, STUDENT_LOAD_FIELDS, rows, batch_size=self.batch_size)
+
+
+class StudentFrameCollector:
+    """Sink that keeps normalized chunks so the whole upload can be diffed at once."""
+
+    def __init__(self):
+        self.frames = []
+
+    def __call__(self, frame):
+        self.frames.append(frame[STUDENT_FIELDS])
+
+    def frame(self):
+        if not self.frames:
+            return pd.DataFrame(columns=STUDENT_FIELDS)
+        return pd.concat(self.frames, ignore_index=True)
+
+
+def apply_student_file_diff(student_file, new_frame, resolver, batch_size=STUDENT_WRITE_BATCH):
+    """
+    Bring `student_file`'s students in line with `new_frame`, writing only what changed.
+
+    Rows are matched on registration number; repeated numbers are paired in
+    file order. Matched students keep their id (and therefore their exam links)
+    and are updated with `bulk_update` restricted to the changed columns,
+    unmatched new rows are bulk inserted and unmatched old rows are deleted.
+    Returns counts of inserted / updated / deleted / unchanged students.
+    """
+    old_frame = pd.DataFrame.from_records(
+        Student.objects.filter(student_file=student_file).order_by("id").values_list("id", *STUDENT_FIELDS),
+        columns=["id"] + STUDENT_FIELDS,
+    )
+    new_frame = new_frame[STUDENT_FIELDS].reset_index(drop=True)
+
+    key = ["registration_number", "_occurrence"]
+    old_frame["_occurrence"] = old_frame.groupby("registration_number").cumcount()
+    new_frame = new_frame.assign(_occurrence=new_frame.groupby("registration_number").cumcount())
+    merged = old_frame.merge(new_frame, on=key, how="outer", suffixes=("_old", ""), indicator=True)
+
+    compared = [field for field in STUDENT_FIELDS if field != "registration_number"]
+    matched = merged[merged["_merge"] == "both"]
+    changed = pd.DataFrame(
+        {field: matched[f"{field}_old"].astype(str) != matched[field].astype(str) for field in compared},
+        index=matched.index,
+    )
+    updates = matched[changed.any(axis=1)]
+    changed_fields = [field for field in compared if changed[field].any()]
+
+    if not updates.empty:
+        if "branch" in changed_fields:
+            branches = updates["branch"].unique().tolist()
+            department_ids = dict(zip(branches, resolver.resolve_all(branches)))
+            changed_fields.append("canonical_department_id")
+        objects = []
+        for row in updates[["id"] + [f for f in changed_fields if f != "canonical_department_id"]].to_dict(orient="records"):
+            student = Student(id=int(row.pop("id")), **row)
+            if "branch" in row:
+                student.canonical_department_id = department_ids.get(row["branch"])
+            objects.append(student)
+        Student.objects.bulk_update(objects, changed_fields, batch_size=batch_size)
+
+    deleted_ids = merged.loc[merged["_merge"] == "left_only", "id"].astype(int).tolist()
+    if deleted_ids:
+        Student.objects.filter(id__in=deleted_ids).delete()
+
+    inserts = merged.loc[merged["_merge"] == "right_only", STUDENT_FIELDS]
+    if not inserts.empty:
+        StudentFileWriter(student_file, resolver, batch_size=batch_size)(inserts.reset_index(drop=True))
+
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deleted_ids),
+        "unchanged": len(matched) - len(updates),
+    }
+
+
+def refresh_student_file_stats(file_ids):
+    """
+    Recompute `row_count` and `department_summary` for `file_ids` from their
+    students with one grouped query, and save them with one `bulk_update`.
+    Call after any ingest or edit that adds, removes or re-brands students.
+    """
+    file_ids = list(file_ids)
+    if not file_ids:
+        return
+    summaries = {file_id: {} for file_id in file_ids}
+    grouped = (
+        Student.objects.filter(student_file_id__in=file_ids)
+        .values_list("student_file_id", "canonical_department__code")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for file_id, code, total in grouped:
+        key = code or ""
+        summaries[file_id][key] = summaries[file_id].get(key, 0) + total
+
+    files = list(StudentDataFile.objects.filter(id__in=file_ids).only("id"))
+    for student_file in files:
+        summary = summaries[student_file.id]
+        student_file.department_summary = summary
+        student_file.row_count = sum(summary.values())
+    StudentDataFile.objects.bulk_update(files, ["department_summary", "row_count"])
+
+
+def error_report_csv(errors, truncated=False):
+    """Render collected row errors as CSV text."""
+    frame = pd.DataFrame(errors, columns=ERROR_REPORT_COLUMNS)
+    text = frame.to_csv(index=False)
+    if truncated:
+        text += f"# Report truncated after {MAX_ERROR_REPORT_ROWS} rows\n"
+    return text
+
+
+def _error_report_dir():
+    return Path(settings.MEDIA_ROOT) / "upload_reports"
+
+
+def save_error_report(ingestor):
+    """Write the ingestor's row errors to disk and return an opaque token (None when clean)."""
+    if not ingestor.errors:
+        return None
+
+    directory = _error_report_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    cutoff = time.time() - ERROR_REPORT_TTL_SECONDS
+    for stale in directory.glob("*.csv"):
+        try:
+            if stale.stat().st_mtime < cutoff:
+                stale.unlink()
+        except OSError:
+            pass
+
+    token = secrets.token_hex(16)
+    (directory / f"{token}.csv").write_text(
+        error_report_csv(ingestor.errors, ingestor.errors_truncated), encoding="utf-8"
+    )
+    return token
+
+
+def error_report_path(token):
+    """Path of a saved report, or None for unknown/expired/malformed tokens."""
+    if not re.fullmatch(r"[0-9a-f]{32}", token or ""):
+        return None
+    path = _error_report_dir() / f"{token}.csv"
+    return path if path.exists() else None
+
+
+# =========================
+# Parsed upload cache
+# =========================
+def _parsed_cache_dir():
+    return Path(settings.MEDIA_ROOT) / "parsed_uploads"
+
+
+def _parsed_cache_path(content_hash):
+    if not re.fullmatch(r"[0-9a-f]{64}", content_hash or ""):
+        return None
+    return _parsed_cache_dir() / f"{content_hash}.parquet"
+
+
+def _rejects_path(parquet_path):
+    return parquet_path.with_suffix(".rejects.json")
+
+
+def load_parsed_upload(content_hash):
+    """Normalized student rows for previously parsed bytes, or None on a cache miss."""
+    path = _parsed_cache_path(content_hash)
+    if not PARQUET_AVAILABLE or path is None or not path.exists():
+        return None
+    try:
+        frame = pq.read_table(path).to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
+    try:
+        os.utime(path)  # keep recently used entries alive
+    except OSError:
+        pass
+    return frame.reindex(columns=STUDENT_FIELDS).fillna("")
+
+
+def load_parsed_rejects(content_hash):
+    """`{"skipped", "errors", "errors_truncated"}` recorded with a cached parse, or None."""
+    path = _parsed_cache_path(content_hash)
+    if path is None:
+        return None
+    path = _rejects_path(path)
+    try:
+        rejects = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return rejects
+
+
+class ParsedUploadCacheWriter:
+    """
+    Sink that streams normalized chunks into `<content_hash>.parquet`.
+
+    Rows go to a temporary file that is only renamed into place by `close()`,
+    so a failed or partial upload never leaves a truncated cache entry. The
+    rejected rows of the parse are kept next to it in `<content_hash>.rejects.json`.
+    Returns None from `for_hash()` when pyarrow is not installed.
+    """
+
+    SCHEMA = None
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = path.with_name(f"{path.name}.{secrets.token_hex(4)}.tmp")
+        self._writer = None
+
+    @classmethod
+    def for_hash(cls, content_hash):
+        path = _parsed_cache_path(content_hash)
+        if not PARQUET_AVAILABLE or path is None:
+            return None
+        if cls.SCHEMA is None:
+            cls.SCHEMA = pa.schema([(field, pa.string()) for field in STUDENT_FIELDS])
+        return cls(path)
+
+    def __call__(self, frame):
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self._tmp_path, self.SCHEMA)
+        table = pa.Table.from_pandas(frame[STUDENT_FIELDS].astype(str), schema=self.SCHEMA, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self, skipped=0, errors=(), errors_truncated=False):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        # Renamed into place before the rows, so whoever finds the rows also finds their rejects.
+        rejects_tmp_path = self._tmp_path.with_suffix(".json")
+        try:
+            rejects_tmp_path.write_text(json.dumps({
+                "skipped": skipped,
+                "errors": list(errors),
+                "errors_truncated": errors_truncated,
+            }, default=str), encoding="utf-8")
+            os.replace(rejects_tmp_path, _rejects_path(self.path))
+        except Exception:
+            self.abort()
+            try:
+                rejects_tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+        os.replace(self._tmp_path, self.path)
+        _prune_parsed_cache()
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        try:
+            self._tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def _prune_parsed_cache():
+    cutoff = time.time() - PARSED_CACHE_TTL_SECONDS
+    directory = _parsed_cache_dir()
+    for entry in [*directory.glob("*.parquet"), *directory.glob("*.rejects.json")]:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                entry.unlink()
+        except OSError:
+            pass
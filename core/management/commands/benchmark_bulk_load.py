@@ -0,0 +1,51 @@
+import time
+
+from django.db import connections, router, transaction
+from django.core.management.base import BaseCommand
+
+from core.bulk import batched_insert, copy_insert
+from core.ingest import STUDENT_LOAD_FIELDS
+from core.models import Student, StudentDataFile
+
+
+def _student_rows(file_id, count):
+    for i in range(count):
+        yield (file_id, None, "BTECH", str(1 + i % 8), "CSE", "", f"Student {i}", f"R{i:06d}", f"REG{i:08d}", f"S{i:06d}", "Eligible")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare COPY FROM STDIN against batched bulk_create for Student rows. "
+        "Every run is rolled back, so nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        using = router.db_for_write(Student)
+        vendor = connections[using].vendor
+
+        loaders = [("bulk_create", lambda file_id: batched_insert(
+            Student, STUDENT_LOAD_FIELDS, _student_rows(file_id, rows), using, batch_size=options["batch_size"]
+        ))]
+        if vendor == "postgresql":
+            loaders.insert(0, ("copy", lambda file_id: copy_insert(
+                Student, STUDENT_LOAD_FIELDS, _student_rows(file_id, rows), using
+            )))
+        else:
+            self.stdout.write(f"copy: skipped ({vendor} backend; COPY needs PostgreSQL)")
+
+        for label, load in loaders:
+            with transaction.atomic(using=using):
+                student_file = StudentDataFile.objects.using(using).create(file_name="benchmark_bulk_load")
+                started = time.perf_counter()
+                inserted = load(student_file.id)
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True, using=using)
+
+            self.stdout.write(
+                f"{label:<12} rows={inserted}  {elapsed * 1000:9.1f} ms  ({inserted / max(elapsed, 1e-9):,.0f} rows/s)"
+            )
@@ -0,0 +1,77 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import seating_pdf
+from core.views import _draw_seating_pdf_page
+
+
+BRANCHES = ["CSE", "ECE", "ME", "CE", "EEE"]
+ROOM_CAPACITY = 40
+
+
+def _synthetic_rooms(count):
+    rooms = []
+    for index in range(count):
+        seats = []
+        for seat_index in range(ROOM_CAPACITY):
+            row, column = divmod(seat_index, 5)
+            branch = BRANCHES[(index + seat_index) % len(BRANCHES)]
+            seats.append({
+                "row": chr(ord("A") + row),
+                "column": column + 1,
+                "registration": f"REG{index:05d}{seat_index:03d}" if seat_index % 9 else "EMPTY",
+                "department": branch,
+                "semester": str(1 + index % 8),
+                "is_eligible": seat_index % 7 != 0,
+            })
+        rooms.append({
+            "building": "Main",
+            "room_number": f"R{index:04d}",
+            "capacity": ROOM_CAPACITY,
+            "slot_date": "2026-05-04",
+            "slot_session": "1st Half",
+            "department_details": [
+                {"department": branch, "semester": str(1 + index % 8), "exam_date": "2026-05-04",
+                 "session": "1st Half", "exam_name": f"{branch} Paper", "start_time": "10:00", "end_time": "13:00"}
+                for branch in BRANCHES
+            ],
+            "seats": seats,
+        })
+    return rooms
+
+
+class Command(BaseCommand):
+    help = "Time the seating PDF rendered on one canvas against chunked rendering on the worker pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", default="50,500,2000", help="Comma separated page counts.")
+        parser.add_argument("--workers", type=int, default=seating_pdf.PDF_RENDER_WORKERS)
+        parser.add_argument("--chunk-pages", type=int, default=seating_pdf.PDF_PAGES_PER_CHUNK)
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if not seating_pdf.PYPDF_AVAILABLE:
+            self.stdout.write("pypdf is not installed: the parallel path falls back to serial rendering.")
+
+        for pages in [int(value) for value in options["pages"].split(",") if value.strip()]:
+            rooms = _synthetic_rooms(pages)
+
+            started = time.perf_counter()
+            serial = seating_pdf.render_pages(_draw_seating_pdf_page, "Benchmark", rooms)
+            serial_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            output = io.BytesIO()
+            seating_pdf.render_seating_pdf(
+                _draw_seating_pdf_page, "Benchmark", rooms, output, workers=workers, chunk_pages=options["chunk_pages"]
+            )
+            parallel = output.getvalue()
+            parallel_s = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{pages:>5} pages  serial={serial_s:7.2f} s ({len(serial) / 1024:,.0f} KiB)  "
+                f"workers={workers} chunked={parallel_s:7.2f} s ({len(parallel) / 1024:,.0f} KiB)  "
+                f"speedup={serial_s / max(parallel_s, 1e-9):4.2f}x"
+            )
@@ -0,0 +1,79 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.ingest import StudentIngestor
+from core.uploads import sniff_upload_format
+
+
+HEADER = ["COURSE", "SEM", "BRANCH", "STUDENT NAME", "ROLLNO", "REG NO", "STD ID", "ACADEMIC_STATUS"]
+BRANCHES = ["CSE", "ECE", "ME", "CE", "EEE"]
+
+
+def _synthetic_rows(count):
+    for i in range(count):
+        yield ["BTECH", str(1 + i % 8), BRANCHES[i % len(BRANCHES)], f"Student {i}", f"R{i:06d}", f"REG{i:08d}", f"S{i:06d}", "Eligible"]
+
+
+def _csv_upload(count, delimiter):
+    lines = [delimiter.join(HEADER)] + [delimiter.join(row) for row in _synthetic_rows(count)]
+    upload = io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+    upload.name = "students.csv"
+    return upload
+
+
+def _xlsx_upload(count):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Students")
+    sheet.append(HEADER)
+    for row in _synthetic_rows(count):
+        sheet.append(row)
+    upload = io.BytesIO()
+    workbook.save(upload)
+    upload.seek(0)
+    upload.name = "students.xlsx"
+    return upload
+
+
+class Command(BaseCommand):
+    help = "Time format sniffing and chunked parsing of student uploads for each supported format."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000, help="Synthetic rows per generated file.")
+        parser.add_argument("--xls", help="Path to a legacy .xls file to include (XLS cannot be generated here).")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        uploads = [
+            ("csv (comma)", _csv_upload(rows, ",")),
+            ("csv (semicolon)", _csv_upload(rows, ";")),
+            ("csv (tab)", _csv_upload(rows, "\t")),
+            ("xlsx", _xlsx_upload(rows)),
+        ]
+        if options.get("xls"):
+            with open(options["xls"], "rb") as handle:
+                upload = io.BytesIO(handle.read())
+            upload.name = options["xls"]
+            uploads.append(("xls", upload))
+        else:
+            self.stdout.write("xls: skipped (pass --xls PATH to include a legacy workbook)")
+
+        for label, upload in uploads:
+            size_kb = len(upload.getvalue()) / 1024
+
+            started = time.perf_counter()
+            detected = sniff_upload_format(upload)
+            sniff_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            ingestor = StudentIngestor(lambda frame: None).run(upload)
+            parse_ms = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(
+                f"{label:<16} {size_kb:>9.0f} KiB  detected={detected.kind:<4} "
+                f"sniff={sniff_ms:7.2f} ms  parse+normalize={parse_ms:9.1f} ms  "
+                f"rows={ingestor.inserted} ({ingestor.inserted / max(parse_ms / 1000, 1e-9):,.0f} rows/s)"
+            )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from django.utils import timezone
+
+from core.purge import PURGE_BATCH_ROWS, expired_exams, purge_deleted, purge_exams
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete completed exams whose end date has passed, together with their "
+        "seat allocations, students, sheets and rooms, in bounded batches. "
+        "Also finishes purging exams and student files deleted from the UI whose "
+        "background purge did not complete. "
+        "The dashboard's exam list queues the same purge in the background; "
+        "run this from a scheduler to purge without waiting for a dashboard visit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_ROWS)
+        parser.add_argument("--dry-run", action="store_true", help="List the exams that would be purged.")
+
+    def handle(self, *args, **options):
+        exams = list(expired_exams().values_list("id", "name", "end_date"))
+        if not exams:
+            self.stdout.write("No expired exams.")
+
+        for exam_id, name, end_date in exams:
+            if options["dry_run"]:
+                self.stdout.write(f"would purge exam {exam_id} '{name}' (ended {end_date})")
+                continue
+            # Hide it first so the dashboard stops listing it while the batches run.
+            expired_exams().filter(id=exam_id).update(deleted_at=timezone.now())
+            counts = purge_exams([exam_id], batch_size=options["batch_size"])
+            self.stdout.write(f"purged exam {exam_id} '{name}' (ended {end_date}): {self._detail(counts)}")
+
+        if not options["dry_run"]:
+            counts = purge_deleted(batch_size=options["batch_size"])
+            if any(counts.values()):
+                self.stdout.write(f"purged deleted exams and files: {self._detail(counts)}")
+
+    @staticmethod
+    def _detail(counts):
+        return ", ".join(f"{table}={rows}" for table, rows in counts.items() if rows)
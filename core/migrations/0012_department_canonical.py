@@ -0,0 +1,89 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:43
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _normalize(value):
+    return re.sub(r"\s+", " ", str(value or "")).strip().upper()
+
+
+def backfill_canonical_departments(apps, schema_editor):
+    Department = apps.get_model('core', 'Department')
+    DepartmentAlias = apps.get_model('core', 'DepartmentAlias')
+    sources = (
+        (apps.get_model('core', 'Student'), 'branch'),
+        (apps.get_model('core', 'DepartmentExam'), 'department'),
+        (apps.get_model('core', 'SeatAllocation'), 'department'),
+    )
+
+    raw_names = set()
+    for model, field in sources:
+        raw_names.update(model.objects.values_list(field, flat=True).distinct())
+
+    department_ids = {}
+    for raw in raw_names:
+        code = _normalize(raw)
+        if not code or code == 'EMPTY' or code in department_ids:
+            continue
+        department = Department.objects.create(code=code)
+        DepartmentAlias.objects.create(alias=code, department=department)
+        department_ids[code] = department.id
+
+    for model, field in sources:
+        for raw in model.objects.values_list(field, flat=True).distinct():
+            department_id = department_ids.get(_normalize(raw))
+            if department_id:
+                model.objects.filter(**{field: raw}).update(canonical_department_id=department_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_alter_seatallocation_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Department',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DepartmentAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='departmentexam',
+            name='canonical_department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='department_exams', to='core.department'),
+        ),
+        migrations.AddField(
+            model_name='seatallocation',
+            name='canonical_department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='seat_allocations', to='core.department'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='canonical_department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='students', to='core.department'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['canonical_department', 'semester'], name='student_dept_sem_idx'),
+        ),
+        migrations.AddField(
+            model_name='departmentalias',
+            name='department',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='core.department'),
+        ),
+        migrations.RunPython(backfill_canonical_departments, migrations.RunPython.noop),
+    ]
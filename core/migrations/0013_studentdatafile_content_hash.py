@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:53
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_row_counts(apps, schema_editor):
+    StudentDataFile = apps.get_model('core', 'StudentDataFile')
+    Student = apps.get_model('core', 'Student')
+    counts = Student.objects.values_list('student_file_id').annotate(total=Count('id'))
+    for file_id, total in counts:
+        StudentDataFile.objects.filter(id=file_id).update(row_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_department_canonical'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentdatafile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='studentdatafile',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_row_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_catalogue(apps, schema_editor):
+    """Catalogue every building/room already used by an exam and link those rooms to it."""
+    Room = apps.get_model('core', 'Room')
+    CampusRoom = apps.get_model('core', 'CampusRoom')
+    latest = {}
+    for room_id, building, room_number, capacity in Room.objects.order_by('id').values_list(
+        'id', 'building', 'room_number', 'capacity'
+    ):
+        latest[(building, room_number)] = capacity
+    CampusRoom.objects.bulk_create(
+        [CampusRoom(building=b, room_number=r, capacity=c) for (b, r), c in latest.items()],
+        ignore_conflicts=True,
+    )
+    for catalogue_id, building, room_number in CampusRoom.objects.values_list('id', 'building', 'room_number'):
+        Room.objects.filter(building=building, room_number=room_number).update(catalogue_room_id=catalogue_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_studentdatafile_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampusRoom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('building', models.CharField(max_length=100)),
+                ('room_number', models.CharField(max_length=50)),
+                ('capacity', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('building', 'room_number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='catalogue_room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exam_rooms', to='core.campusroom'),
+        ),
+        migrations.RunPython(backfill_catalogue, migrations.RunPython.noop),
+    ]
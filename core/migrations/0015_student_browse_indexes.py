@@ -0,0 +1,63 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+# istartswith compiles to UPPER(col::text) LIKE UPPER('q%'); under a non-C
+# collation PostgreSQL only uses an index for that with text_pattern_ops.
+PREFIX_INDEXES = [
+    ('student_file_name_prefix_idx', 'name'),
+    ('student_file_reg_prefix_idx', 'registration_number'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, column in PREFIX_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON core_student '
+            f'(student_file_id, UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_campus_room_catalogue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_file', 'id'], name='student_file_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_file', 'branch', 'id'], name='student_file_branch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_file', 'semester', 'id'], name='student_file_sem_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_file', 'academic_status', 'id'], name='student_file_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_file', 'name', 'id'], name='student_file_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_file', 'registration_number', 'id'], name='student_file_reg_idx'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
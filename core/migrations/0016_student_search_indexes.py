@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+# Global (cross-file) prefix search; see core/search.py.
+SEARCH_INDEXES = [
+    ('student_reg_prefix_idx', 'registration_number'),
+    ('student_roll_prefix_idx', 'roll_number'),
+    ('student_sid_prefix_idx', 'student_id'),
+    ('student_name_prefix_idx', 'name'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON core_student '
+            f'(UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_student_browse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seatallocation',
+            index=models.Index(fields=['exam', 'registration_number'], name='seat_exam_reg_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_department_summaries(apps, schema_editor):
+    StudentDataFile = apps.get_model('core', 'StudentDataFile')
+    Student = apps.get_model('core', 'Student')
+    summaries = {}
+    grouped = (
+        Student.objects.values_list('student_file_id', 'canonical_department__code')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for file_id, code, total in grouped:
+        summary = summaries.setdefault(file_id, {})
+        summary[code or ''] = summary.get(code or '', 0) + total
+    for file_id, summary in summaries.items():
+        StudentDataFile.objects.filter(id=file_id).update(
+            department_summary=summary, row_count=sum(summary.values())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_student_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentdatafile',
+            name='department_summary',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_department_summaries, migrations.RunPython.noop),
+    ]
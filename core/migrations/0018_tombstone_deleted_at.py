@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_studentdatafile_department_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentdatafile',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:15
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_tombstone_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSummarySnapshot',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary_snapshot', serialize=False, to='core.exam')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('is_stale', models.BooleanField(default=True)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
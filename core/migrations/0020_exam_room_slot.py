@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:18
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_exam_summary_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamRoomSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('summary', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('seats', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_slots', to='core.exam')),
+            ],
+            options={
+                'unique_together': {('exam', 'position')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_exam_room_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentdatafile',
+            name='exam',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owned_student_files', to='core.exam'),
+        ),
+    ]
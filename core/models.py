@@ -1,5 +1,45 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
+
+# =========================
+# Deleted rows awaiting purge
+# =========================
+class LiveManager(models.Manager):
+    """Hides rows whose `deleted_at` is set; core.purge removes them later in batches."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+# =========================
+# Canonical Departments (resolved once at ingest time)
+# =========================
+class Department(models.Model):
+    # normalized upper-case code, e.g. "CSE"
+    code = models.CharField(max_length=50, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.code
+
+
+class DepartmentAlias(models.Model):
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        related_name="aliases"
+    )
+    # normalized spelling as it appears in uploads/schedules
+    alias = models.CharField(max_length=50, unique=True)
+
+    def save(self, *args, **kwargs):
+        self.alias = " ".join(str(self.alias or "").split()).upper()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.department.code}"
+
 # =========================
 # Upload Student Data (DB only, NO file storage)
 # =========================
@@ -7,10 +47,38 @@ class StudentDataFile(models.Model):
     # store filename ONLY (not the actual file)
     file_name = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # sha256 of the uploaded bytes; re-uploading the same bytes over this file changes nothing.
+    # Cleared once the students are edited, since they no longer match the bytes.
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # The exam whose setup wizard uploaded this file; None for dashboard uploads.
+    # Only the owning exam may rewrite the file in place (see _replace_student_file).
+    exam = models.ForeignKey(
+        "Exam",
+        on_delete=models.SET_NULL,
+        related_name="owned_student_files",
+        null=True,
+        blank=True,
+    )
+    row_count = models.PositiveIntegerField(default=0)
+    # {department code: student count}; kept in step with the students by
+    # core.ingest.refresh_student_file_stats so listings need no aggregation.
+    department_summary = models.JSONField(default=dict, blank=True)
+    # Set on delete; the rows stay hidden until the background purge removes them.
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"{self.file_name}"
 
+    @property
+    def primary_department(self):
+        """The department with the most students in this file ('' when empty)."""
+        if not self.department_summary:
+            return ""
+        return max(sorted(self.department_summary), key=self.department_summary.get)
+
 
 # =========================
 # Student Model (same as before)
@@ -28,6 +96,13 @@ class Student(models.Model):
     course = models.CharField(max_length=50)
     semester = models.CharField(max_length=10)
     branch = models.CharField(max_length=50)
+    canonical_department = models.ForeignKey(
+        Department,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="students"
+    )
     room_number = models.CharField(max_length=50, blank=True, default="")
     academic_status = models.CharField(max_length=50)
 
@@ -36,7 +111,18 @@ class Student(models.Model):
 
     class Meta:
         # no unique constraints; identical rows are permitted in any file
-        pass
+        # The (student_file, ..., id) indexes back keyset pagination of a file's
+        # students; PostgreSQL additionally gets UPPER(...) text_pattern_ops
+        # indexes for prefix search (see migration 0015).
+        indexes = [
+            models.Index(fields=["canonical_department", "semester"], name="student_dept_sem_idx"),
+            models.Index(fields=["student_file", "id"], name="student_file_id_idx"),
+            models.Index(fields=["student_file", "branch", "id"], name="student_file_branch_idx"),
+            models.Index(fields=["student_file", "semester", "id"], name="student_file_sem_idx"),
+            models.Index(fields=["student_file", "academic_status", "id"], name="student_file_status_idx"),
+            models.Index(fields=["student_file", "name", "id"], name="student_file_name_idx"),
+            models.Index(fields=["student_file", "registration_number", "id"], name="student_file_reg_idx"),
+        ]
 
 
 # =========================
@@ -49,6 +135,11 @@ class Exam(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_completed = models.BooleanField(default=False)  # True when Complete Setup clicked
     is_temporary = models.BooleanField(default=True)   # True until Complete Setup
+    # Set on delete; the rows stay hidden until the background purge removes them.
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.name
@@ -64,6 +155,13 @@ class DepartmentExam(models.Model):
         related_name="departments"
     )
     department = models.CharField(max_length=50)
+    canonical_department = models.ForeignKey(
+        Department,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="department_exams"
+    )
 
     exam_name = models.CharField(max_length=255)
     paper_code = models.CharField(max_length=50)
@@ -78,7 +176,23 @@ class DepartmentExam(models.Model):
 
 
 # =========================
-# Room Model
+# Campus Room Catalogue (shared by all exams)
+# =========================
+class CampusRoom(models.Model):
+    building = models.CharField(max_length=100)
+    room_number = models.CharField(max_length=50)
+    capacity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('building', 'room_number')
+
+    def __str__(self):
+        return f"{self.building} - {self.room_number} ({self.capacity})"
+
+
+# =========================
+# Room Model (a catalogue room attached to one exam)
 # =========================
 class Room(models.Model):
     exam = models.ForeignKey(
@@ -86,6 +200,14 @@ class Room(models.Model):
         on_delete=models.CASCADE,
         related_name='rooms'
     )
+    catalogue_room = models.ForeignKey(
+        CampusRoom,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='exam_rooms'
+    )
+    # copied from the catalogue when attached; capacity may be adjusted per exam
     building = models.CharField(max_length=100)
     room_number = models.CharField(max_length=50)
     capacity = models.PositiveIntegerField()
@@ -130,6 +252,13 @@ class SeatAllocation(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='allocations')
     registration_number = models.CharField(max_length=50)
     department = models.CharField(max_length=50)
+    canonical_department = models.ForeignKey(
+        Department,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="seat_allocations"
+    )
     seat_code = models.CharField(max_length=10)  # A1, B2, etc
     row = models.CharField(max_length=1)  # A-H
     column = models.IntegerField()  # 1-5
@@ -140,11 +269,51 @@ class SeatAllocation(models.Model):
 
     class Meta:
         unique_together = ('exam', 'room', 'exam_date', 'exam_session', 'seat_code')
+        indexes = [
+            models.Index(fields=['exam', 'registration_number'], name='seat_exam_reg_idx'),
+        ]
 
     def __str__(self):
         return f"{self.registration_number} - {self.seat_code}"
 
 
+# =========================
+# Materialized Exam Summary
+# =========================
+class ExamSummarySnapshot(models.Model):
+    """
+    The Step 6 / view-exam summary payload, stored so it is not rebuilt on
+    every view. Any change to the exam's seating marks it stale (see
+    core.summaries); the next request rebuilds it under a new version.
+    """
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, primary_key=True, related_name='summary_snapshot')
+    version = models.PositiveIntegerField(default=0)
+    is_stale = models.BooleanField(default=True)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary of exam {self.exam_id} v{self.version}"
+
+
+class ExamRoomSlot(models.Model):
+    """
+    One room (per exam slot) of an exam's summary snapshot, in viewer order.
+    The exam viewer lists the `summary` of every slot and pages in `seats`
+    on demand; rows are rewritten whenever the snapshot is rebuilt.
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='room_slots')
+    position = models.PositiveIntegerField()
+    summary = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    seats = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = ('exam', 'position')
+
+    def __str__(self):
+        return f"Exam {self.exam_id} room slot {self.position}"
+
+
 # =========================
 # Attendance Sheet Records
 # =========================
@@ -0,0 +1,112 @@
+"""
+Sparse and compact encodings for the seating JSON responses.
+
+Seat lists repeat long keys and the same per-slot values (date, session,
+paper, times, semester) on every seat. Clients may ask for fewer seat
+fields with `fields=` and for `format=compact`, which per room:
+
+- lists each distinct slot once in `slots` and refers to it by index,
+- stores the seats column-wise (`{"seat": [...], "registration": [...]}`),
+- leaves out empty seats, reporting only how many there were.
+"""
+SLOT_FIELDS = ("exam_date", "session", "exam_name", "start_time", "end_time", "semester")
+# Seat keys that only repeat the room they belong to.
+ROOM_SEAT_FIELDS = ("room_id", "room_building", "room_number")
+SEAT_FORMATS = ("full", "compact")
+
+
+def is_empty_seat(seat):
+    registration = str(seat.get("registration") or "").strip()
+    return not registration or registration.upper() == "EMPTY"
+
+
+def seat_options(params):
+    """
+    Read `format` and `fields` (comma separated) from a QueryDict. Returns
+    `(compact, fields)`, `fields` being None when not restricted; raises
+    ValueError for an unknown format.
+    """
+    seat_format = (params.get("format") or "full").strip().lower()
+    if seat_format not in SEAT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(SEAT_FORMATS)}")
+    fields = [field.strip() for field in (params.get("fields") or "").split(",") if field.strip()]
+    return seat_format == "compact", fields or None
+
+
+def representation_key(compact, fields):
+    """Short label of the chosen encoding, used to keep ETags apart."""
+    if not compact and not fields:
+        return ""
+    return ("compact" if compact else "full") + (f";{','.join(fields)}" if fields else "")
+
+
+def _check_fields(rooms, fields):
+    available = set()
+    for room in rooms:
+        for seat in room.get("seats") or []:
+            available.update(seat)
+    unknown = [field for field in fields if field not in available]
+    if unknown and available:
+        raise ValueError(
+            f"Unknown seat field(s): {', '.join(unknown)}. Available: {', '.join(sorted(available))}"
+        )
+
+
+def select_seat_fields(rooms, fields):
+    """Copy `rooms` keeping only `fields` on every seat."""
+    _check_fields(rooms, fields)
+    return [
+        {**room, "seats": [{field: seat.get(field) for field in fields} for seat in room.get("seats") or []]}
+        for room in rooms
+    ]
+
+
+def compact_rooms(rooms, fields=None):
+    """Encode rooms column-wise with hoisted slots and without empty seats (see module docstring)."""
+    if fields:
+        _check_fields(rooms, fields)
+
+    encoded = []
+    for room in rooms:
+        seats = room.get("seats") or []
+        filled = [seat for seat in seats if not is_empty_seat(seat)]
+
+        if fields:
+            slot_fields = [field for field in SLOT_FIELDS if field in fields]
+            columns = [field for field in fields if field not in SLOT_FIELDS]
+        else:
+            keys = {}
+            for seat in filled:
+                keys.update(dict.fromkeys(seat))
+            slot_fields = [field for field in SLOT_FIELDS if field in keys]
+            columns = [field for field in keys if field not in SLOT_FIELDS and field not in ROOM_SEAT_FIELDS]
+
+        data = {column: [seat.get(column) for seat in filled] for column in columns}
+        slots = []
+        if slot_fields:
+            slot_index = {}
+            data["slot"] = []
+            for seat in filled:
+                slot = tuple(seat.get(field) for field in slot_fields)
+                if slot not in slot_index:
+                    slot_index[slot] = len(slots)
+                    slots.append(dict(zip(slot_fields, slot)))
+                data["slot"].append(slot_index[slot])
+
+        encoded.append({
+            **{key: value for key, value in room.items() if key != "seats"},
+            "slots": slots,
+            "seats": data,
+            "seat_count": len(filled),
+            "empty_seats": len(seats) - len(filled),
+        })
+    return encoded
+
+
+def encode_rooms(rooms, compact, fields):
+    """Apply the `seat_options` choice to a list of rooms with `seats`."""
+    if compact:
+        return compact_rooms(rooms, fields)
+    if fields:
+        return select_seat_fields(rooms, fields)
+    return rooms
@@ -0,0 +1,105 @@
+"""
+Content-addressed cache of rendered PDFs on local disk.
+
+A PDF is stored under the SHA-256 of everything it is drawn from (the kind
+of document, its template version and the input data), so a changed sheet
+or seating simply hashes to a new entry and nothing has to be invalidated
+by hand; stale entries age out. The cache is bounded in bytes and evicts
+the least recently used files: a hit stamps the file's access time, while
+its modification time stays the moment it was rendered (the response's
+Last-Modified). Files are written atomically, so web worker processes can
+share the directory.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+logger = logging.getLogger('exam_system')
+
+
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR") or Path(tempfile.gettempdir()) / "exam_system_pdf_cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def cache_key(kind, template_version, data):
+    """Hex digest addressing the PDF of `kind` drawn by `template_version` from `data` (any JSON-like value)."""
+    material = json.dumps([kind, template_version, data], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return PDF_CACHE_DIR / f"{key}.pdf"
+
+
+def _open_entry(key):
+    try:
+        handle = open(_path(key), "rb")
+    except FileNotFoundError:
+        return None
+    # The file stays readable through the handle even if it is evicted now.
+    stat = os.fstat(handle.fileno())
+    os.utime(handle.fileno(), (time.time(), stat.st_mtime))
+    return handle
+
+
+def _store(key, render):
+    PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".part")
+    try:
+        # Rendered straight into the cache directory: no copy of the document is held in memory.
+        with os.fdopen(fd, "wb") as handle:
+            render(handle)
+        os.replace(temp_path, _path(key))
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    # Opened before evicting, so even a PDF larger than the cache is served.
+    handle = open(_path(key), "rb")
+    evict()
+    return handle
+
+
+def open_pdf(key, render):
+    """
+    `(file, hit)` for the cached PDF `key`, rendering it on a miss with
+    `render(output)`, which writes the PDF into the binary file `output`.
+    The returned file is open for reading.
+    """
+    handle = _open_entry(key)
+    if handle is not None:
+        return handle, True
+    return _store(key, render), False
+
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache holds at most `max_bytes`. Returns the files removed."""
+    max_bytes = PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    try:
+        with os.scandir(PDF_CACHE_DIR) as scan:
+            for entry in scan:
+                if entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    if removed:
+        logger.info(f"PDF cache: evicted {removed} file(s), {total} bytes kept")
+    return removed
@@ -0,0 +1,161 @@
+"""
+Batched removal of exams and student files with their dependent rows.
+
+Deleting a large exam through the ORM makes Django collect every related
+row in memory and delete them in one long transaction. Instead, a delete
+only stamps `deleted_at` (the default managers then hide the row) and a
+background thread empties each dependent table with raw
+`DELETE ... WHERE id IN (SELECT id ... LIMIT n)` statements of bounded
+size, each committed on its own, so locks are short and memory use does
+not grow with the exam. Expired exams are hidden and queued the same way
+whenever the dashboard lists exams; `manage.py purge_expired_exams` does
+it in the foreground and finishes any purge a restarted worker left behind.
+"""
+import logging
+import threading
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    AttendanceSheet,
+    DepartmentExam,
+    Exam,
+    ExamRoomSlot,
+    ExamStudent,
+    ExamSummarySnapshot,
+    MarksSheet,
+    Room,
+    SeatAllocation,
+    Student,
+    StudentDataFile,
+)
+from .summaries import invalidate_exam_summaries
+
+
+logger = logging.getLogger('exam_system')
+
+
+PURGE_BATCH_ROWS = 5000
+
+# Children first, so no batch ever violates a foreign key.
+EXAM_DEPENDENTS = [
+    (SeatAllocation, "exam_id"),
+    (ExamSummarySnapshot, "exam_id"),
+    (ExamRoomSlot, "exam_id"),
+    (ExamStudent, "exam_id"),
+    (AttendanceSheet, "exam_id"),
+    (MarksSheet, "exam_id"),
+    (DepartmentExam, "exam_id"),
+    (Room, "exam_id"),
+]
+STUDENT_FILE_DEPENDENTS = [
+    (ExamStudent, "student_file_id"),
+    (AttendanceSheet, "student_file_id"),
+    (MarksSheet, "student_file_id"),
+    (Student, "student_file_id"),
+]
+
+
+def delete_in_batches(model, column, ids, batch_size=PURGE_BATCH_ROWS):
+    """Delete `model` rows whose `column` is in `ids`, at most `batch_size` per statement. Returns the row count."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    pk = qn(model._meta.pk.column)
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = (
+        f"DELETE FROM {table} WHERE {pk} IN ("
+        f"SELECT {pk} FROM {table} WHERE {qn(column)} IN ({placeholders}) LIMIT %s)"
+    )
+
+    deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, ids + [batch_size])
+            rows = max(cursor.rowcount, 0)
+        deleted += rows
+        if rows < batch_size:
+            return deleted
+
+
+def _purge(plan, ids, batch_size):
+    ids = list(ids)
+    counts = {}
+    for model, column in plan:
+        counts[model._meta.db_table] = delete_in_batches(model, column, ids, batch_size)
+    return counts
+
+
+def purge_exams(exam_ids, batch_size=PURGE_BATCH_ROWS):
+    """Remove exams and everything hanging off them in bounded batches. Returns `{table: rows deleted}`."""
+    exam_ids = list(exam_ids)
+    # The student files they uploaded stay, as dashboard files.
+    StudentDataFile.all_objects.filter(exam_id__in=exam_ids).update(exam=None)
+    return _purge(EXAM_DEPENDENTS + [(Exam, "id")], exam_ids, batch_size)
+
+
+def purge_student_files(file_ids, batch_size=PURGE_BATCH_ROWS):
+    """Remove student files, their students and sheets in bounded batches. Returns `{table: rows deleted}`."""
+    return _purge(STUDENT_FILE_DEPENDENTS + [(StudentDataFile, "id")], file_ids, batch_size)
+
+
+def _purge_in_background(purge, ids):
+    ids = list(ids)
+
+    def run():
+        try:
+            purge(ids)
+        except Exception:
+            # The tombstones stay; purge_expired_exams retries them.
+            logger.exception(f"Background {purge.__name__} failed for ids {ids}")
+        finally:
+            connection.close()
+
+    # Start only once the tombstones are committed, so the thread sees them.
+    transaction.on_commit(
+        lambda: threading.Thread(target=run, name=purge.__name__, daemon=True).start()
+    )
+
+
+def delete_exams(exam_ids):
+    """Hide the exams at once and purge them in the background. Returns the number hidden."""
+    exam_ids = list(exam_ids)
+    hidden = Exam.objects.filter(id__in=exam_ids).update(deleted_at=timezone.now())
+    if hidden:
+        _purge_in_background(purge_exams, exam_ids)
+    return hidden
+
+
+def delete_student_files(file_ids):
+    """Hide the student files at once and purge them in the background. Returns the number hidden."""
+    file_ids = list(file_ids)
+    hidden = StudentDataFile.objects.filter(id__in=file_ids).update(deleted_at=timezone.now())
+    invalidate_exam_summaries(ExamStudent.objects.filter(student_file_id__in=file_ids).values_list('exam_id', flat=True))
+    if hidden:
+        _purge_in_background(purge_student_files, file_ids)
+    return hidden
+
+
+def purge_deleted(batch_size=PURGE_BATCH_ROWS):
+    """Purge every tombstoned exam and student file now. Returns `{table: rows deleted}`."""
+    counts = {}
+    exam_ids = Exam.all_objects.filter(deleted_at__isnull=False).values_list("id", flat=True)
+    file_ids = StudentDataFile.all_objects.filter(deleted_at__isnull=False).values_list("id", flat=True)
+    for purged in (purge_exams(exam_ids, batch_size), purge_student_files(file_ids, batch_size)):
+        for table, rows in purged.items():
+            counts[table] = counts.get(table, 0) + rows
+    return counts
+
+
+def expired_exams(today=None):
+    """Completed exams whose end date has passed."""
+    return Exam.objects.filter(end_date__lt=today or date.today(), is_completed=True)
+
+
+def delete_expired_exams(today=None):
+    """Hide the expired exams and purge them in the background, like `delete_exams`. Returns the number hidden."""
+    return delete_exams(expired_exams(today).values_list("id", flat=True))
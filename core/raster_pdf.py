@@ -0,0 +1,90 @@
+"""
+Page-at-a-time PDF writer for rendered page images.
+
+Used when ReportLab is missing and pages are drawn with Pillow.
+`Image.save(..., save_all=True)` needs every page raster in memory at once,
+and its `append=True` mode re-reads the growing file on each page. This
+writer instead encodes each image as JPEG (DCTDecode, as Pillow's PDF
+plugin does for RGB), writes it straight to the output file and keeps only
+the byte offsets for the cross-reference table. Memory therefore stays at
+one page however long the document is.
+"""
+from io import BytesIO
+
+
+class RasterPdfWriter:
+    """
+    Write `add_page(image)` calls as PDF pages of `resolution` DPI into the
+    binary file `output`; `close()` writes the page tree and trailer.
+    """
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self, output, resolution=72.0, title=None):
+        self.output = output
+        self.resolution = float(resolution)
+        self.title = title
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = self.PAGES + 1
+        self.position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+
+    def _write(self, data):
+        self.output.write(data)
+        self.position += len(data)
+
+    def _allocate(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def _write_object(self, object_id, body, stream=None):
+        self.offsets[object_id] = self.position
+        self._write(b"%d 0 obj\n" % object_id + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_page(self, image):
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        encoded = BytesIO()
+        image.save(encoded, format="JPEG")
+        data = encoded.getvalue()
+        width = image.width * 72.0 / self.resolution
+        height = image.height * 72.0 / self.resolution
+        color_space = b"/DeviceRGB" if image.mode == "RGB" else b"/DeviceGray"
+
+        image_id, contents_id, page_id = self._allocate(), self._allocate(), self._allocate()
+        self._write_object(image_id, (
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s "
+            b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>"
+        ) % (image.width, image.height, color_space, len(data)), data)
+        contents = b"q %.4f 0 0 %.4f 0 0 cm /Im0 Do Q" % (width, height)
+        self._write_object(contents_id, b"<< /Length %d >>" % len(contents), contents)
+        self._write_object(page_id, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.4f %.4f] "
+            b"/Resources << /XObject << /Im0 %d 0 R >> /ProcSet [/PDF /ImageC /ImageB] >> /Contents %d 0 R >>"
+        ) % (self.PAGES, width, height, image_id, contents_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._write_object(self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        info_id = self._allocate() if self.title else None
+        if info_id:
+            title = b"<FEFF" + self.title.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+            self._write_object(info_id, b"<< /Title %s /Producer (Exam Seating System) >>" % title)
+        trailer = b"<< /Size %d /Root %d 0 R" % (self.next_id, self.CATALOG)
+        if info_id:
+            trailer += b" /Info %d 0 R" % info_id
+        trailer += b" >>"
+
+        xref_offset = self.position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id)
+        for object_id in range(1, self.next_id):
+            self._write(b"%010d 00000 n \n" % self.offsets[object_id])
+        self._write(b"trailer\n" + trailer + b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
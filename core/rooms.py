@@ -0,0 +1,165 @@
+"""
+Campus room catalogue and per-exam room sets.
+
+Buildings and rooms are kept once in `CampusRoom`; an exam's `Room` rows
+reference the catalogue. Imports upsert the catalogue in bulk, and saving an
+exam's room list applies a diff (add / update / remove) so rooms that did not
+change keep their id and therefore their seat allocations.
+"""
+import re
+
+import pandas as pd
+from django.db import transaction
+
+from .models import CampusRoom, Room
+
+
+ROOM_COLUMN_ALIASES = {
+    "building": ["building", "building name", "building_name"],
+    "room_number": ["room number", "room_number", "roomno", "room no", "room"],
+    "capacity": ["capacity", "cap", "seats", "seat capacity", "room capacity"],
+}
+
+
+def room_key(building, room_number):
+    """Case- and whitespace-insensitive identity of a building/room pair."""
+    def clean(value):
+        return re.sub(r"\s+", " ", str(value or "")).strip().casefold()
+    return clean(building), clean(room_number)
+
+
+def parse_room_frame(frame):
+    """
+    Validate a rooms upload column-wise.
+
+    Returns `(rooms, errors)`: `rooms` has `building`, `room_number` and an
+    integer `capacity` (blank counts as 0), without rows lacking a building or
+    room number and without repeats of the same room; `errors` lists rows whose
+    capacity is not a whole number of seats as `{"row": <file row>, "errors": [...]}`.
+    """
+    frame = frame.dropna(how="all")
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    renames = {}
+    for field, candidates in ROOM_COLUMN_ALIASES.items():
+        column = next((c for c in candidates if c in frame.columns), None)
+        if column is None:
+            raise ValueError("File must include columns: Building, Room Number, Capacity.")
+        renames[column] = field
+
+    frame = frame[list(renames)].rename(columns=renames)
+    frame = frame.astype(object).where(frame.notna(), "").astype(str)
+    for field in ROOM_COLUMN_ALIASES:
+        frame[field] = frame[field].str.strip()
+    frame.index = frame.index + 2  # file row numbers; row 1 is the header
+
+    frame = frame[(frame["building"] != "") & (frame["room_number"] != "")]
+    capacity = pd.to_numeric(frame["capacity"].replace("", "0"), errors="coerce")
+    invalid = capacity.isna() | (capacity < 0) | (capacity % 1 != 0)
+    errors = [
+        {"row": int(row), "errors": [f"Invalid capacity value: '{value}'"]}
+        for row, value in frame.loc[invalid, "capacity"].items()
+    ]
+
+    frame = frame[~invalid].assign(capacity=capacity[~invalid].astype(int))
+    keys = frame["building"].str.casefold() + "\x00" + frame["room_number"].str.casefold()
+    return frame[~keys.duplicated()], errors
+
+
+def catalogue_index():
+    """All catalogue rooms keyed by `room_key` (one query)."""
+    return {room_key(room.building, room.room_number): room for room in CampusRoom.objects.all()}
+
+
+def upsert_catalogue_rooms(rooms, update_capacity=True):
+    """
+    Add `(building, room_number, capacity)` triples to the catalogue.
+
+    Rooms already catalogued (compared with `room_key`) keep their spelling;
+    their capacity is refreshed when `update_capacity` is set. New rooms go in
+    with one `bulk_create` and changed ones with one `bulk_update`. Returns the
+    refreshed `catalogue_index()`.
+    """
+    index = catalogue_index()
+    new, changed = {}, []
+    for building, room_number, capacity in rooms:
+        key = room_key(building, room_number)
+        room = index.get(key)
+        if room is None:
+            new.setdefault(key, CampusRoom(building=building, room_number=room_number, capacity=capacity))
+        elif update_capacity and room.capacity != capacity:
+            room.capacity = capacity
+            changed.append(room)
+
+    if changed:
+        CampusRoom.objects.bulk_update(changed, ["capacity"])
+    if new:
+        # ignore_conflicts: a concurrent import may have catalogued the same room
+        CampusRoom.objects.bulk_create(new.values(), ignore_conflicts=True)
+        index = catalogue_index()
+    return index
+
+
+def sync_exam_rooms(exam, rooms):
+    """
+    Make `rooms` (dicts with `building`, `room_number`, `capacity`) the exam's
+    room set by diff, in one transaction.
+
+    Rooms are matched to the exam's current rooms with `room_key`: matches are
+    updated in place (keeping their seat allocations), missing ones are linked
+    from the catalogue with one `bulk_create`, and only rooms no longer listed
+    are deleted. Returns `{"added", "updated", "removed", "unchanged"}` counts.
+    """
+    with transaction.atomic():
+        catalogue = upsert_catalogue_rooms(
+            ((r["building"], r["room_number"], r["capacity"]) for r in rooms),
+            update_capacity=False,
+        )
+
+        existing = {}
+        removed = []
+        for room in Room.objects.filter(exam=exam).order_by("id"):
+            key = room_key(room.building, room.room_number)
+            if key in existing:
+                removed.append(room.id)  # legacy duplicate of the same room
+            else:
+                existing[key] = room
+
+        wanted = set()
+        added, changed = [], []
+        unchanged = 0
+        for r in rooms:
+            key = room_key(r["building"], r["room_number"])
+            wanted.add(key)
+            catalogue_room = catalogue.get(key)
+            room = existing.get(key)
+            if room is None:
+                added.append(Room(
+                    exam=exam,
+                    catalogue_room=catalogue_room,
+                    building=r["building"],
+                    room_number=r["room_number"],
+                    capacity=r["capacity"],
+                ))
+                continue
+            values = {
+                "building": r["building"],
+                "room_number": r["room_number"],
+                "capacity": r["capacity"],
+                "catalogue_room_id": catalogue_room.id if catalogue_room else None,
+            }
+            if any(getattr(room, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(room, field, value)
+                changed.append(room)
+            else:
+                unchanged += 1
+
+        removed.extend(room.id for key, room in existing.items() if key not in wanted)
+        if removed:
+            Room.objects.filter(id__in=removed).delete()
+        if changed:
+            Room.objects.bulk_update(changed, ["building", "room_number", "capacity", "catalogue_room"])
+        if added:
+            Room.objects.bulk_create(added)
+
+    return {"added": len(added), "updated": len(changed), "removed": len(removed), "unchanged": unchanged}
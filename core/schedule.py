@@ -0,0 +1,223 @@
+"""
+Exam schedule (timetable) parsing.
+
+A schedule upload is validated column-wise with pandas: dates and times are
+parsed for the whole frame at once, and duplicate papers and timetable clashes
+are found with grouped operations instead of nested loops. The result is a
+frame of clean rows ready for a single `bulk_create`, plus per-row errors.
+"""
+import pandas as pd
+
+from .departments import normalize_department_name
+from .models import DepartmentExam
+
+
+SCHEDULE_COLUMN_ALIASES = {
+    "department": ["dept name", "department", "dept"],
+    "exam_name": ["exam name", "exam", "course"],
+    "paper_code": ["paper code", "code"],
+    "exam_date": ["date"],
+    "session": ["session"],
+    "start_time": ["start time", "starttime", "start"],
+    "end_time": ["end time", "endtime", "end"],
+    "semester": ["semester", "sem"],
+}
+REQUIRED_SCHEDULE_FIELDS = {
+    "department": "Dept Name",
+    "exam_name": "Exam Name",
+    "paper_code": "Paper Code",
+    "exam_date": "Date",
+    "session": "Session",
+    "start_time": "Start Time",
+    "end_time": "End Time",
+}
+SCHEDULE_TEXT_FIELDS = ["department", "exam_name", "paper_code", "session", "semester"]
+
+SESSION_NAMES = {
+    "morning": "1st Half",
+    "1st half": "1st Half",
+    "1sthalf": "1st Half",
+    "afternoon": "2nd Half",
+    "2nd half": "2nd Half",
+    "2ndhalf": "2nd Half",
+}
+
+DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y"]
+TIME_FORMATS = ["%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M:%S %p", "%I %p"]
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+EXCEL_MAX_SERIAL = 2958465  # 9999-12-31
+
+
+def _field_max_length(field):
+    return DepartmentExam._meta.get_field(field).max_length
+
+
+def map_schedule_columns(frame):
+    """Rename schedule headers to model field names; return (frame, missing labels)."""
+    lookup = {str(column).strip().lower(): column for column in frame.columns}
+    renames = {}
+    for field, candidates in SCHEDULE_COLUMN_ALIASES.items():
+        for candidate in candidates:
+            if candidate in lookup:
+                renames[lookup[candidate]] = field
+                break
+    missing = [label for field, label in REQUIRED_SCHEDULE_FIELDS.items() if field not in renames.values()]
+    frame = frame.rename(columns=renames)
+    for field in SCHEDULE_COLUMN_ALIASES:
+        if field not in frame.columns:
+            frame[field] = ""
+    return frame[list(SCHEDULE_COLUMN_ALIASES)], missing
+
+
+def parse_schedule_dates(values):
+    """ISO, dd-mm-yyyy, dd/mm/yyyy and Excel serial dates -> datetime64 (NaT when invalid)."""
+    text = values.str.strip()
+    # openpyxl cells come through as "YYYY-MM-DD 00:00:00"
+    parsed = pd.to_datetime(text.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+    for fmt in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(text, format=fmt, errors="coerce"))
+    serial = pd.to_numeric(text, errors="coerce")
+    serial = serial.where((serial > 0) & (serial <= EXCEL_MAX_SERIAL)).round()
+    return parsed.fillna(EXCEL_EPOCH + pd.to_timedelta(serial, unit="D"))
+
+
+def parse_schedule_times(values):
+    """12h ("10:00 AM") or 24h ("14:00") times and Excel day fractions -> minutes since midnight."""
+    text = (
+        values.str.strip()
+        .str.upper()
+        .str.replace(r"\s*([AP])\.?M\.?$", r" \1M", regex=True)
+    )
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in TIME_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(text, format=fmt, errors="coerce"))
+    minutes = (parsed.dt.hour * 60 + parsed.dt.minute).astype(float)
+    fraction = pd.to_numeric(text, errors="coerce")
+    fraction = fraction.where((fraction >= 0) & (fraction < 1))
+    return minutes.fillna((fraction * 24 * 60).round())
+
+
+def normalize_sessions(values):
+    text = values.str.strip()
+    return text.str.lower().map(SESSION_NAMES).fillna(text)
+
+
+def minutes_to_time(minutes):
+    return f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}"
+
+
+def parse_schedule_frame(frame, resolver):
+    """
+    Validate a raw schedule frame.
+
+    Returns `(rows, errors)`: `rows` holds the clean, typed rows and `errors`
+    is a list of `{"row": <file row>, "errors": [...]}` for every rejected row.
+    Only when there are no errors are the departments resolved (registering
+    unknown ones) into `canonical_department_id`; callers should refuse the
+    whole schedule otherwise.
+    """
+    frame, missing = map_schedule_columns(frame)
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    frame = frame.astype(object).where(frame.notna(), "").astype(str)
+    for field in SCHEDULE_TEXT_FIELDS:
+        frame[field] = frame[field].str.strip()
+    frame.index = pd.RangeIndex(2, len(frame) + 2)  # file row numbers; row 1 is the header
+
+    frame = frame[(frame != "").any(axis=1)]
+    if frame.empty:
+        raise ValueError("Schedule file has no rows.")
+
+    frame["session"] = normalize_sessions(frame["session"])
+    dates = parse_schedule_dates(frame["exam_date"])
+    starts = parse_schedule_times(frame["start_time"])
+    ends = parse_schedule_times(frame["end_time"])
+
+    problems = []  # (mask, message) pairs; message may be a Series for per-row text
+
+    for field, label in REQUIRED_SCHEDULE_FIELDS.items():
+        problems.append((frame[field].str.strip() == "", f"{label} is required"))
+    problems.append((dates.isna() & (frame["exam_date"] != ""), "Date is not a valid date"))
+    problems.append((starts.isna() & (frame["start_time"] != ""), "Start Time is not a valid time"))
+    problems.append((ends.isna() & (frame["end_time"] != ""), "End Time is not a valid time"))
+    problems.append((ends <= starts, "End Time must be after Start Time"))
+    for field in SCHEDULE_TEXT_FIELDS:
+        max_length = _field_max_length(field)
+        problems.append((frame[field].str.len() > max_length, f"{field} is longer than {max_length} characters"))
+
+    # Cohorts are keyed by canonical department where one exists, so alias
+    # spellings of the same department still collide. Nothing is registered yet.
+    department_keys = {
+        name: str(resolver.resolve(name) or normalize_department_name(name))
+        for name in frame["department"].unique()
+    }
+    cohort = frame["department"].map(department_keys) + "|" + frame["semester"].str.upper()
+
+    # The same paper listed twice for one cohort.
+    paper_key = cohort + "|" + frame["paper_code"].str.upper()
+    duplicated = paper_key.duplicated(keep=False) & (frame["paper_code"] != "")
+    problems.append((duplicated, "Paper " + frame["paper_code"] + " is listed more than once for this department/semester"))
+
+    # Two papers for one cohort whose time ranges overlap on the same day.
+    timed = pd.DataFrame({
+        "key": cohort + "|" + dates.dt.strftime("%Y-%m-%d"),
+        "start": starts,
+        "end": ends,
+    }).dropna().sort_values(["key", "start"])
+    latest_end = timed.groupby("key")["end"].cummax().groupby(timed["key"]).shift()
+    clashes = (timed["start"] < latest_end).reindex(frame.index, fill_value=False)
+    problems.append((clashes & ~duplicated, "Clashes with another paper for this department/semester on the same date"))
+
+    errors = {}
+    for mask, message in problems:
+        mask = mask.reindex(frame.index, fill_value=False)
+        messages = message[mask] if isinstance(message, pd.Series) else pd.Series(message, index=mask[mask].index)
+        for row_number, text in messages.items():
+            errors.setdefault(row_number, []).append(text)
+
+    rows = frame.drop(index=list(errors))
+    rows = rows.assign(
+        exam_date=dates.reindex(rows.index).dt.date,
+        start_time=starts.reindex(rows.index).map(minutes_to_time),
+        end_time=ends.reindex(rows.index).map(minutes_to_time),
+    )
+    if not errors:
+        rows["canonical_department_id"] = resolver.resolve_all(rows["department"])
+    error_rows = [{"row": int(row), "errors": errors[row]} for row in sorted(errors)]
+    return rows, error_rows
+
+
+def department_exam_objects(exam, rows):
+    """Build unsaved `DepartmentExam`s from parsed schedule rows."""
+    return [
+        DepartmentExam(
+            exam=exam,
+            department=row.department,
+            canonical_department_id=row.canonical_department_id,
+            exam_name=row.exam_name,
+            paper_code=row.paper_code,
+            exam_date=row.exam_date,
+            session=row.session,
+            start_time=row.start_time,
+            end_time=row.end_time,
+            semester=row.semester or None,
+        )
+        for row in rows.itertuples(index=False)
+    ]
+
+
+def schedule_by_department(rows):
+    """Group parsed rows into the `{department: [paper, ...]}` shape the setup page edits."""
+    departments = {}
+    for row in rows.itertuples(index=False):
+        departments.setdefault(row.department, []).append({
+            "name": row.exam_name,
+            "code": row.paper_code,
+            "date": row.exam_date.isoformat(),
+            "session": row.session,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "semester": row.semester,
+        })
+    return departments
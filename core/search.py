@@ -0,0 +1,105 @@
+"""
+Global student lookup across every uploaded file.
+
+A search is a case-insensitive prefix match on registration number, roll
+number, student id or name. The matching students, their file, the exams
+they were merged into and their seats are fetched in one SQL statement;
+on PostgreSQL each prefix is served by an `UPPER(col) text_pattern_ops`
+index (migration 0016) and the seat join by `seat_exam_reg_idx`.
+"""
+from django.db import connection
+
+from .models import Exam, ExamStudent, Room, SeatAllocation, Student, StudentDataFile
+
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_COLUMNS = ["registration_number", "roll_number", "student_id", "name"]
+
+
+def _like_prefix(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.upper() + "%"
+
+
+def find_students(term, limit=SEARCH_DEFAULT_LIMIT):
+    """
+    Return up to `limit` students whose identifiers start with `term`, each as
+    `{student fields, "file": {...}, "exams": [{..., "seats": [...]}]}`.
+    """
+    qn = connection.ops.quote_name
+    tables = {
+        "student": qn(Student._meta.db_table),
+        "file": qn(StudentDataFile._meta.db_table),
+        "exam_student": qn(ExamStudent._meta.db_table),
+        "exam": qn(Exam._meta.db_table),
+        "seat": qn(SeatAllocation._meta.db_table),
+        "room": qn(Room._meta.db_table),
+    }
+    pattern = _like_prefix(term)
+    matches = " OR ".join(f"UPPER(s.{column}) LIKE %s ESCAPE '\\'" for column in SEARCH_COLUMNS)
+
+    sql = f"""
+        SELECT m.id, m.name, m.roll_number, m.registration_number, m.student_id,
+               m.course, m.semester, m.branch, m.academic_status,
+               f.id, f.file_name,
+               e.id, e.name, e.is_temporary,
+               sa.exam_date, sa.exam_session, r.building, r.room_number, sa.seat_code
+        FROM (
+            SELECT s.* FROM {tables['student']} s
+            JOIN {tables['file']} sf ON sf.id = s.student_file_id AND sf.deleted_at IS NULL
+            WHERE ({matches})
+            ORDER BY s.id
+            LIMIT %s
+        ) m
+        JOIN {tables['file']} f ON f.id = m.student_file_id
+        LEFT JOIN ({tables['exam_student']} es
+                   JOIN {tables['exam']} e ON e.id = es.exam_id AND e.deleted_at IS NULL)
+               ON es.student_id = m.id
+        LEFT JOIN {tables['seat']} sa ON sa.exam_id = es.exam_id AND sa.registration_number = m.registration_number
+        LEFT JOIN {tables['room']} r ON r.id = sa.room_id
+        ORDER BY m.id, e.id, sa.exam_date, sa.exam_session
+    """
+    params = [pattern] * len(SEARCH_COLUMNS) + [limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = []
+    by_student = {}
+    for (student_id, name, roll_number, registration_number, std_id, course, semester, branch, status,
+         file_id, file_name, exam_id, exam_name, is_temporary,
+         exam_date, session, building, room_number, seat_code) in rows:
+        student = by_student.get(student_id)
+        if student is None:
+            student = {
+                "id": student_id,
+                "name": name,
+                "roll_number": roll_number,
+                "registration_number": registration_number,
+                "student_id": std_id,
+                "course": course,
+                "semester": semester,
+                "branch": branch,
+                "academic_status": status,
+                "file": {"id": file_id, "file_name": file_name},
+                "exams": [],
+            }
+            by_student[student_id] = student
+            results.append(student)
+        if exam_id is None:
+            continue
+        exams = student["exams"]
+        if not exams or exams[-1]["exam_id"] != exam_id:
+            exams.append({"exam_id": exam_id, "exam_name": exam_name, "is_temporary": bool(is_temporary), "seats": []})
+        if seat_code:
+            exams[-1]["seats"].append({
+                "exam_date": str(exam_date) if exam_date else None,
+                "session": session,
+                "building": building,
+                "room_number": room_number,
+                "seat_code": seat_code,
+            })
+    return results
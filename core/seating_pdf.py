@@ -0,0 +1,170 @@
+"""
+Parallel rendering of the seating PDF.
+
+Each room slot is one independent A4 page, so a large exam is split into
+chunks of consecutive pages that are drawn on a process pool (ReportLab is
+pure Python and holds the GIL), each chunk into its own small PDF file on
+disk, so only paths travel back from the workers. The parts are then read
+back and concatenated in order with pypdf, which holds the pages of the
+merged document in the request's memory until it is written. Small exams,
+servers without pypdf and a failed pool all fall back to drawing every page
+on one canvas in the request, which produces the same pages.
+
+The pool is started lazily, once per web worker process, and reused; the
+children only draw, they never touch the database. They are started with
+`forkserver` (`spawn` where that is unavailable) rather than forked from the
+web worker, whose other threads may hold locks a forked child would inherit
+and never see released. Its size is set with the PDF_RENDER_WORKERS
+environment variable (default 2, 0 or 1 to always render in the request);
+every web worker gets its own pool of that size.
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import django
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as reportlab_canvas
+except Exception:
+    A4 = None
+    reportlab_canvas = None
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except Exception:
+    PdfReader = None
+    PdfWriter = None
+    PYPDF_AVAILABLE = False
+
+
+logger = logging.getLogger('exam_system')
+
+
+# Workers per web process; 0 disables the pool.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", 2))
+PDF_PAGES_PER_CHUNK = 50
+# Below this many pages forking and merging cost more than they save.
+PDF_PARALLEL_MIN_PAGES = 100
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def render_pages(draw, title, rooms, output=None):
+    """
+    Draw `draw(pdf, title, room, width, height)` for each room on one canvas
+    into the binary file `output`, or return the PDF bytes without one.
+    """
+    buffer = BytesIO() if output is None else output
+    pdf = reportlab_canvas.Canvas(buffer, pagesize=A4)
+    page_width, page_height = A4
+    for index, room in enumerate(rooms):
+        if index > 0:
+            pdf.showPage()
+        draw(pdf, title, room, page_width, page_height)
+    pdf.save()
+    if output is None:
+        return buffer.getvalue()
+
+
+def render_chunk_file(draw, title, rooms, directory):
+    """Draw the pages of `rooms` (see `render_pages`) into a new file in `directory` and return its path."""
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".chunk.part")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            render_pages(draw, title, rooms, handle)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+def merge_pdfs(paths, output):
+    """Concatenate the PDF files at `paths` in order into the binary file `output`."""
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(PdfReader(path))
+    writer.write(output)
+
+
+def chunked(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _start_method():
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _init_worker():
+    # A fresh interpreter: `draw` lives in the app, which needs Django set up to import.
+    django.setup()
+
+
+def _render_pool(workers):
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited through fork (e.g. gunicorn --preload) belongs to the parent.
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(_start_method()),
+                initializer=_init_worker,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_seating_pdf(draw, title, rooms, output, workers=None, chunk_pages=PDF_PAGES_PER_CHUNK, chunk_dir=None):
+    """
+    Render one page per room with `draw` (see `render_pages`) into `output`,
+    in parallel chunks when the exam is large enough. `draw` must be a
+    module-level function and `rooms` plain data, as both are sent to the
+    workers. The chunks are written to `chunk_dir` (the system temp directory
+    by default) and removed after the merge.
+    """
+    workers = PDF_RENDER_WORKERS if workers is None else workers
+    if workers < 2 or not PYPDF_AVAILABLE or len(rooms) < PDF_PARALLEL_MIN_PAGES:
+        render_pages(draw, title, rooms, output)
+        return
+
+    chunk_dir = str(chunk_dir or tempfile.gettempdir())
+    os.makedirs(chunk_dir, exist_ok=True)
+    chunks = chunked(rooms, chunk_pages)
+    futures = []
+    try:
+        pool = _render_pool(workers)
+        futures = [pool.submit(render_chunk_file, draw, title, chunk, chunk_dir) for chunk in chunks]
+        paths = [future.result() for future in futures]
+        merge_pdfs(paths, output)
+    except BrokenProcessPool:
+        logger.exception("Seating PDF worker pool broke; rendering in the request instead")
+        _discard_pool()
+        render_pages(draw, title, rooms, output)
+    finally:
+        for future in futures:
+            # Wait for every chunk, even after a failure, so none is left behind on disk.
+            try:
+                path = future.result()
+            except Exception:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
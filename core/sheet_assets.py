@@ -0,0 +1,94 @@
+"""
+Process-wide assets of the attendance and marks sheet renderers.
+
+Fonts, the college logo and the table column geometry do not change between
+requests, yet were loaded from disk, converted and resized for every PDF
+(the logo once per page). Each is now built on first use and kept for the
+life of the worker process, and the Pillow and ReportLab renderers share
+them. Restart the workers after replacing the logo or the fonts.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageFont
+
+try:
+    from reportlab.lib.utils import ImageReader
+except Exception:
+    ImageReader = None
+
+
+LOGO_PATH_CANDIDATES = (
+    settings.BASE_DIR / "static" / "core" / "img" / "logo.png",
+    settings.BASE_DIR / "staticfiles" / "core" / "img" / "logo.png",
+)
+FONT_CANDIDATES = {
+    "regular": (
+        Path("/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf"),
+        Path("/usr/share/fonts/truetype/liberation2/LiberationSerif-Regular.ttf"),
+        Path("C:/Windows/Fonts/times.ttf"),
+        Path("C:/Windows/Fonts/georgia.ttf"),
+        Path("C:/Windows/Fonts/arial.ttf"),
+    ),
+    "bold": (
+        Path("/usr/share/fonts/truetype/dejavu/DejaVuSerif-Bold.ttf"),
+        Path("/usr/share/fonts/truetype/liberation2/LiberationSerif-Bold.ttf"),
+        Path("C:/Windows/Fonts/timesbd.ttf"),
+        Path("C:/Windows/Fonts/georgiab.ttf"),
+        Path("C:/Windows/Fonts/arialbd.ttf"),
+    ),
+}
+# Resolution the logo is embedded at in ReportLab PDFs.
+LOGO_PRINT_DPI = 300
+
+
+@lru_cache(maxsize=None)
+def font(face, size):
+    """The TrueType font of `face` ("regular" or "bold") at `size` pixels, or Pillow's default font."""
+    for font_path in FONT_CANDIDATES[face]:
+        if font_path.exists():
+            return ImageFont.truetype(str(font_path), size=size)
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=1)
+def logo():
+    """The logo as RGBA, or None when it is not installed."""
+    for logo_path in LOGO_PATH_CANDIDATES:
+        if logo_path.exists():
+            with Image.open(logo_path) as image:
+                return image.convert("RGBA")
+    return None
+
+
+@lru_cache(maxsize=None)
+def logo_resized(size):
+    """The logo stretched to `size` x `size` pixels, for pasting onto a page raster."""
+    image = logo()
+    return image.resize((size, size)) if image else None
+
+
+@lru_cache(maxsize=None)
+def logo_reader(points):
+    """
+    A ReportLab ImageReader of the logo scaled to fit a `points` square at
+    LOGO_PRINT_DPI. The reader keeps its decoded pixels, so later PDFs reuse them.
+    """
+    image = logo()
+    if not image or not ImageReader:
+        return None
+    pixels = int(round(points * LOGO_PRINT_DPI / 72))
+    if max(image.size) > pixels:
+        image = image.copy()
+        image.thumbnail((pixels, pixels), Image.LANCZOS)
+    return ImageReader(image)
+
+
+@lru_cache(maxsize=None)
+def column_edges(left, widths):
+    """x of every column boundary of a table starting at `left` with column `widths` (a tuple)."""
+    edges = [left]
+    for width in widths:
+        edges.append(edges[-1] + width)
+    return tuple(edges)
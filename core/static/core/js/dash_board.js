@@ -305,7 +305,7 @@ if (proceedToWizardBtn) {
 
 function checkStudentDataAndShowModal() {
   // Fetch uploaded files to check if any exist
-  fetch('/get_uploaded_files/?t=' + Date.now())
+  fetch('/get_uploaded_files/?limit=1&t=' + Date.now())
     .then(r => r.json())
     .then(data => {
       // always show both buttons; disable continue if no files
@@ -348,7 +348,7 @@ if (generateMarksheetBtn) {
 
 function checkStudentDataAndShowMarksheetModal() {
   // Fetch uploaded files to check if any exist
-  fetch('/get_uploaded_files/?t=' + Date.now())
+  fetch('/get_uploaded_files/?limit=1&t=' + Date.now())
     .then(r => r.json())
     .then(data => {
       if (data.status === 'success' && Array.isArray(data.files) && data.files.length > 0) {
@@ -444,230 +444,26 @@ function updateDepartmentSelectionUI() {
     });
 }
 
-function parseCsv(text) {
-    // Remove BOM if present
-    if (text.charCodeAt(0) === 0xFEFF) {
-        text = text.slice(1);
-    }
-
-    // Detect delimiter: count commas, tabs, and semicolons in first line
-    const firstLine = text.split('\n')[0] || '';
-    const commaCount = (firstLine.match(/,/g) || []).length;
-    const tabCount = (firstLine.match(/\t/g) || []).length;
-    const semicolonCount = (firstLine.match(/;/g) || []).length;
-    const maxCount = Math.max(commaCount, tabCount, semicolonCount);
-    let delimiter = ',';
-    if (tabCount === maxCount) delimiter = '\t';
-    else if (semicolonCount === maxCount) delimiter = ';';
-
-    const rows = [];
-    let current = '';
-    let inQuotes = false;
-    let row = [];
-
-    for (let i = 0; i < text.length; i++) {
-        const ch = text[i];
-        if (ch === '"') {
-            if (inQuotes && i + 1 < text.length && text[i + 1] === '"') {
-                // Escaped quote
-                current += '"';
-                i++;
-            } else {
-                inQuotes = !inQuotes;
-            }
-        } else if (ch === delimiter && !inQuotes) {
-            row.push(current);
-            current = '';
-        } else if ((ch === '\n' || ch === '\r') && !inQuotes) {
-            if (ch === '\r' && i + 1 < text.length && text[i + 1] === '\n') {
-                i++; // skip \n in CRLF
-            }
-            row.push(current);
-            rows.push(row);
-            row = [];
-            current = '';
-        } else {
-            current += ch;
-        }
-    }
-
-    if (current !== '' || row.length > 0) {
-        row.push(current);
-        rows.push(row);
-    }
-
-    return rows;
-}
-
-function loadExamScheduleFromCsv(rows) {
-    if (!rows || rows.length < 2) {
-        throw new Error('File must contain a header row and at least one data row.');
-    }
-
-    const headerRow = rows[0].map(h => (h || '').toString().trim().toLowerCase());
-    const findHeaderIndex = candidates => {
-        for (const candidate of candidates) {
-            const idx = headerRow.indexOf(candidate);
-            if (idx !== -1) return idx;
-        }
-        return -1;
-    };
-
-    const deptIdx = findHeaderIndex(['dept name', 'department', 'dept']);
-    const examNameIdx = findHeaderIndex(['exam name', 'exam', 'course']);
-    const paperCodeIdx = findHeaderIndex(['paper code', 'code']);
-    const dateIdx = findHeaderIndex(['date']);
-    const sessionIdx = findHeaderIndex(['session']);
-    const startTimeIdx = findHeaderIndex(['start time', 'starttime', 'start']);
-    const endTimeIdx = findHeaderIndex(['end time', 'endtime', 'end']);
-    const semesterIdx = findHeaderIndex(['semester', 'sem']);
-
-    const missing = [];
-    if (deptIdx === -1) missing.push('Dept Name');
-    if (examNameIdx === -1) missing.push('Exam Name');
-    if (paperCodeIdx === -1) missing.push('Paper Code');
-    if (dateIdx === -1) missing.push('Date');
-    if (sessionIdx === -1) missing.push('Session');
-    if (startTimeIdx === -1) missing.push('Start Time');
-    if (endTimeIdx === -1) missing.push('End Time');
-    if (missing.length) {
-        throw new Error('Missing required column(s): ' + missing.join(', ') + '. Found headers: ' + rows[0].join(', '));
-    }
-
-    const newDepartments = {};
-    const errors = [];
-
-    function normalizeDepartmentName(raw) {
-        const val = (raw || '').trim();
-        if (!val) return '';
-        const lower = val.toLowerCase();
-
-        // Exact match for existing department items
-        const existing = Array.from(deptDivs).map(d => d.dataset.name);
-        const exact = existing.find(d => d.toLowerCase() === lower);
-        if (exact) return exact;
-
-        // Try substring match (e.g. "BCA" -> "Bachelor of Computer Applications (BCA)")
-        const substring = existing.find(d => d.toLowerCase().includes(lower));
-        if (substring) return substring;
-
-        // As a fallback, use original value
-        return val;
-    }
-
-    function excelSerialToDate(serial) {
-        // Excel serial date to JS Date
-        const utc_days = Math.floor(serial - 25569);
-        const utc_value = utc_days * 86400;
-        const date = new Date(utc_value * 1000);
-        const fractional = serial - Math.floor(serial);
-        let totalSeconds = Math.round(86400 * fractional);
-        const seconds = totalSeconds % 60;
-        totalSeconds = (totalSeconds - seconds) / 60;
-        const minutes = totalSeconds % 60;
-        const hours = (totalSeconds - minutes) / 60;
-        date.setHours(hours, minutes, seconds, 0);
-        return date;
-    }
-
-    function formatDateYYYYMMDD(d) {
-        const year = d.getFullYear();
-        const month = String(d.getMonth() + 1).padStart(2, '0');
-        const day = String(d.getDate()).padStart(2, '0');
-        return `${year}-${month}-${day}`;
-    }
-
-    function normalizeTextValue(value) {
-        if (value == null || value === '') return '';
-        if (value instanceof Date) {
-            return formatDateYYYYMMDD(value);
-        }
-        return String(value).trim();
-    }
-
-    function normalizeDateValue(value) {
-        if (value == null || value === '') return '';
-        if (value instanceof Date) {
-            return formatDateYYYYMMDD(value);
-        }
-        if (typeof value === 'number') {
-            const d = excelSerialToDate(value);
-            return formatDateYYYYMMDD(d);
-        }
-        const s = normalizeTextValue(value);
-        // Accept dd-mm-yyyy or dd/mm/yyyy
-        const m = s.match(/^(\d{1,2})[\/-](\d{1,2})[\/-](\d{4})$/);
-        if (m) {
-            const [_, d, mth, y] = m;
-            return `${y}-${String(mth).padStart(2, '0')}-${String(d).padStart(2, '0')}`;
-        }
-        return s;
-    }
-
-    function normalizeTimeValue(value) {
-        if (value == null || value === '') return '';
-        if (value instanceof Date) {
-            const hours = value.getHours();
-            const minutes = value.getMinutes();
-            return `${String(hours).padStart(2, '0')}:${String(minutes).padStart(2, '0')}`;
-        }
-        if (typeof value === 'number') {
-            // Excel time is fraction of a day
-            const totalSeconds = Math.round(86400 * value);
-            const hours = Math.floor(totalSeconds / 3600);
-            const minutes = Math.floor((totalSeconds % 3600) / 60);
-            return `${String(hours).padStart(2, '0')}:${String(minutes).padStart(2, '0')}`;
-        }
-        return String(value).trim();
-    }
-
-    rows.slice(1).forEach((row, rowIndex) => {
-        let dept = (row[deptIdx] || '').trim();
-        dept = normalizeDepartmentName(dept);
-        if (!dept) return; // skip blank lines
-
-        const examName = (row[examNameIdx] || '').trim();
-        const paperCode = (row[paperCodeIdx] || '').trim();
-        const date = normalizeDateValue(row[dateIdx]);
-        const session = normalizeSession(row[sessionIdx] || '');
-        const startTimeRaw = normalizeTimeValue(row[startTimeIdx]);
-        const endTimeRaw = normalizeTimeValue(row[endTimeIdx]);
-        const semester = normalizeTextValue(row[semesterIdx]);
-
-        const startParts = parse12HourTime(startTimeRaw);
-        const endParts = parse12HourTime(endTimeRaw);
-
-        if (!examName || !paperCode || !date || !session || !startParts || !endParts) {
-            errors.push(`Row ${rowIndex + 2} is missing required data or has invalid time format.`);
-            return;
-        }
-
-        const startTime24 = convertTo24HourFormat(startParts.hour, startParts.minute, startParts.ampm);
-        const endTime24 = convertTo24HourFormat(endParts.hour, endParts.minute, endParts.ampm);
-
-        if (!newDepartments[dept]) newDepartments[dept] = [];
-        newDepartments[dept].push({
-            name: examName,
-            code: paperCode,
-            date,
-            session,
-            start_time: startTime24,
-            end_time: endTime24,
-            start_hour: startParts.hour,
-            start_minute: startParts.minute,
-            start_ampm: startParts.ampm,
-            end_hour: endParts.hour,
-            end_minute: endParts.minute,
-            end_ampm: endParts.ampm,
-            semester: semester
-        });
-    });
-
-    return { departments: newDepartments, errors };
+function matchDepartmentName(raw) {
+    const val = (raw || '').trim();
+    if (!val) return '';
+    const lower = val.toLowerCase();
+
+    // Exact match for existing department items
+    const existing = Array.from(deptDivs).map(d => d.dataset.name);
+    const exact = existing.find(d => d.toLowerCase() === lower);
+    if (exact) return exact;
+
+    // Try substring match (e.g. "BCA" -> "Bachelor of Computer Applications (BCA)")
+    const substring = existing.find(d => d.toLowerCase().includes(lower));
+    if (substring) return substring;
+
+    // As a fallback, use original value
+    return val;
 }
 
 if (uploadExamScheduleBtn) {
-    uploadExamScheduleBtn.addEventListener('click', e => {
+    uploadExamScheduleBtn.addEventListener('click', async e => {
         e.preventDefault();
         uploadScheduleStatus.textContent = '';
 
@@ -681,56 +477,55 @@ if (uploadExamScheduleBtn) {
         // remember file name for later persistence
         scheduleFileName = file.name;
 
-        const reader = new FileReader();
-        reader.onload = () => {
-            try {
-                let rows;
-                if (file.name.toLowerCase().endsWith('.xlsx')) {
-                    const workbook = XLSX.read(reader.result, { type: 'array' });
-                    const sheetName = workbook.SheetNames[0];
-                    const worksheet = workbook.Sheets[sheetName];
-                    rows = XLSX.utils.sheet_to_json(worksheet, { header: 1 });
-                } else {
-                    // CSV
-                    const text = reader.result;
-                    rows = parseCsv(text);
-                }
-                const payload = loadExamScheduleFromCsv(rows);
-                selectedDepartments = Object.keys(payload.departments);
-                departmentExams = payload.departments;
-
-                updateDepartmentSelectionUI();
-                renderExamInputs();
-
-                // Hide manual department selection once schedule is loaded
-                const deptInstructions = document.getElementById('departmentInstructions');
-                const deptContainer = document.getElementById('departmentContainer');
-                if (deptInstructions) deptInstructions.style.display = 'none';
-                if (deptContainer) deptContainer.style.display = 'none';
-
-                const deptCount = selectedDepartments.length;
-                const examCount = Object.values(departmentExams).reduce((sum, exs) => sum + exs.length, 0);
-                uploadScheduleStatus.style.color = '#2e7d32';
-                uploadScheduleStatus.textContent = `Loaded ${examCount} exam(s) across ${deptCount} department(s) from '${scheduleFileName}'.`;
-
-                if (payload.errors.length) {
-                    uploadScheduleStatus.style.color = '#c62828';
-                    uploadScheduleStatus.textContent += ' Some rows were skipped: ' + payload.errors.join(' ');
-                }
-            } catch (err) {
-                console.error('Failed to parse schedule file:', err);
+        // The server parses and validates the whole timetable (dates, times,
+        // duplicate papers, clashes) and saves it in one go.
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('exam_id', examId);
+
+        try {
+            const resp = await fetch('/upload-schedule-file/', {
+                method: 'POST',
+                headers: { 'X-CSRFToken': csrftoken },
+                body: formData
+            });
+            const data = await resp.json();
+            if (data.status !== 'success') {
                 uploadScheduleStatus.style.color = '#c62828';
-                uploadScheduleStatus.textContent = 'Failed to parse file: ' + err.message;
+                uploadScheduleStatus.textContent = 'Upload failed: ' + (data.message || 'Unknown error');
+                if (data.errors && data.errors.length) {
+                    uploadScheduleStatus.textContent += ' ' + data.errors
+                        .map(err => `Row ${err.row}: ${err.errors.join(', ')}.`)
+                        .join(' ');
+                }
+                return;
             }
-        };
-        reader.onerror = () => {
+
+            const newDepartments = {};
+            Object.entries(data.departments || {}).forEach(([rawName, exams]) => {
+                const dept = matchDepartmentName(rawName);
+                if (!newDepartments[dept]) newDepartments[dept] = [];
+                newDepartments[dept].push(...exams);
+            });
+            selectedDepartments = Object.keys(newDepartments);
+            departmentExams = newDepartments;
+
+            updateDepartmentSelectionUI();
+            renderExamInputs();
+
+            // Hide manual department selection once schedule is loaded
+            const deptInstructions = document.getElementById('departmentInstructions');
+            const deptContainer = document.getElementById('departmentContainer');
+            if (deptInstructions) deptInstructions.style.display = 'none';
+            if (deptContainer) deptContainer.style.display = 'none';
+
+            const deptCount = selectedDepartments.length;
+            uploadScheduleStatus.style.color = '#2e7d32';
+            uploadScheduleStatus.textContent = `Loaded ${data.created} exam(s) across ${deptCount} department(s) from '${scheduleFileName}'.`;
+        } catch (err) {
+            console.error('Failed to upload schedule file:', err);
             uploadScheduleStatus.style.color = '#c62828';
-            uploadScheduleStatus.textContent = 'Failed to read file.';
-        };
-        if (file.name.toLowerCase().endsWith('.xlsx')) {
-            reader.readAsArrayBuffer(file);
-        } else {
-            reader.readAsText(file);
+            uploadScheduleStatus.textContent = 'Failed to upload file: ' + err.message;
         }
     });
 }
@@ -969,6 +764,7 @@ function checkDeptInputs() {
 const roomFileInput = document.getElementById('roomFileInput');
 const uploadRoomsBtn = document.getElementById('uploadRoomsBtn');
 const uploadRoomsStatus = document.getElementById('uploadRoomsStatus');
+const loadCatalogueRoomsBtn = document.getElementById('loadCatalogueRoomsBtn');
 const roomList = document.getElementById('roomList');
 const backStep3Btn = document.getElementById('backStep3Btn');
 const proceedStep3Btn = document.getElementById('proceedStep3Btn');
@@ -980,9 +776,14 @@ function escapeHtml(str) {
     });
 }
 
-function getBuildingOptionsHtml() {
+function getBuildingOptionsHtml(current) {
     // Fixed building list - only used for room rendering after upload.
-    return '<option value="">Select Building</option><option value="Main Building">Main Building</option><option value="CMS">CMS</option>';
+    let html = '<option value="">Select Building</option><option value="Main Building">Main Building</option><option value="CMS">CMS</option>';
+    // Catalogue rooms may belong to other buildings; keep them selectable.
+    if (current && current !== 'Main Building' && current !== 'CMS') {
+        html += `<option value="${escapeHtml(current)}">${escapeHtml(current)}</option>`;
+    }
+    return html;
 }
 
 function renderRooms() {
@@ -994,7 +795,7 @@ function renderRooms() {
             roomList.innerHTML += `
                 <div class="room-item" data-idx="${idx}">
                     <label>Building</label>
-                    <select class="room-building">${getBuildingOptionsHtml()}</select>
+                    <select class="room-building">${getBuildingOptionsHtml(r.building)}</select>
                     <label>Room Number</label>
                     <input type="text" class="room-number" value="${escapeHtml(r.room_number)}" placeholder="e.g., 303" />
                     <label>Capacity</label>
@@ -1092,6 +893,29 @@ if (uploadRoomsBtn) {
     };
 }
 
+if (loadCatalogueRoomsBtn) {
+    loadCatalogueRoomsBtn.onclick = async e => {
+        e.preventDefault();
+        try {
+            const resp = await fetch('/room-catalogue/');
+            const data = await resp.json();
+            if (data.status !== 'success') {
+                uploadRoomsStatus.style.color = '#c62828';
+                uploadRoomsStatus.textContent = 'Could not load saved rooms: ' + (data.message || 'Unknown error');
+                return;
+            }
+            roomsList = data.rooms || [];
+            renderRooms();
+            uploadRoomsStatus.style.color = '#2e7d32';
+            uploadRoomsStatus.textContent = `Loaded ${roomsList.length} saved room(s). Remove any that are not used for this exam.`;
+        } catch (err) {
+            console.error('Load room catalogue failed', err);
+            uploadRoomsStatus.style.color = '#c62828';
+            uploadRoomsStatus.textContent = 'Could not load saved rooms: ' + err.message;
+        }
+    };
+}
+
 if (backStep3Btn) {
     backStep3Btn.onclick = e => {
         e.preventDefault();
@@ -1150,6 +974,14 @@ function setStudentUploadStatus(message, isError = false) {
     uploadStudentFileStatus.style.color = isError ? '#c62828' : '#2e7d32';
 }
 
+function appendStudentErrorReportLink(url) {
+    if (!uploadStudentFileStatus || !url) return;
+    const link = document.createElement('a');
+    link.href = url;
+    link.textContent = ' Download skipped rows (CSV)';
+    uploadStudentFileStatus.appendChild(link);
+}
+
 function renderUploadedStudentFile() {
     if (!filesTableBody) return;
 
@@ -1228,6 +1060,7 @@ if (uploadStudentFileBtn) {
 
             if (!response.ok || data.status !== 'success') {
                 setStudentUploadStatus(data.message || 'Upload failed.', true);
+                appendStudentErrorReportLink(data.error_report_url);
                 return;
             }
 
@@ -1235,10 +1068,15 @@ if (uploadStudentFileBtn) {
             renderUploadedStudentFile();
 
             let summary = `Uploaded ${data.file.file_name} with ${data.file.student_count} student rows.`;
+            if (data.file.diff) {
+                const diff = data.file.diff;
+                summary = `Updated ${data.file.file_name}: ${diff.inserted} added, ${diff.updated} changed, ${diff.deleted} removed, ${diff.unchanged} unchanged.`;
+            }
             if (data.file.skipped > 0) {
                 summary += ` ${data.file.skipped} row(s) were skipped.`;
             }
             setStudentUploadStatus(summary, false);
+            appendStudentErrorReportLink(data.file.error_report_url);
         } catch (err) {
             console.error('[STEP 4] Student upload failed:', err);
             setStudentUploadStatus('Upload failed. Please try again.', true);
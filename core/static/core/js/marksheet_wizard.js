@@ -102,6 +102,14 @@ function setUploadStatus(message, isError) {
   wizardUploadStatus.className = isError ? 'wizard-upload-status error' : 'wizard-upload-status success';
 }
 
+function appendErrorReportLink(url) {
+  if (!wizardUploadStatus || !url) return;
+  const link = document.createElement('a');
+  link.href = url;
+  link.textContent = ' Download skipped rows (CSV)';
+  wizardUploadStatus.appendChild(link);
+}
+
 function renderTempFileTable() {
   if (!tempUploadedFile) {
     filesTableBody.innerHTML = '<tr><td colspan="3" style="text-align: center; padding: 30px; color: #999;">No temporary file uploaded yet.</td></tr>';
@@ -159,6 +167,7 @@ if (uploadWizardFileBtn) {
       } else {
         setUploadStatus(summary, false);
       }
+      appendErrorReportLink(data.file.error_report_url);
       generateBtn.disabled = false;
     } catch (error) {
       console.error('wizard upload failed', error);
@@ -1,32 +1,9 @@
-﻿// Fetch exam seating via get_exam_summary and render per-room grids
+﻿// List exam rooms via the room index and render each room's seat grid as it is loaded
 // This redraws the UI with Step 5 seat formatting, eligible/blocked/empty states.
 document.addEventListener('DOMContentLoaded', function(){
     const examId = window.EXAM_ID || null;
     const container = document.getElementById('roomsContainer');
     const downloadExamPdfBtn = document.getElementById('downloadExamPdfBtn');
-    const getSessionSortKey = (session) => {
-        const normalized = String(session || '').trim().toLowerCase();
-        if (['1st half', '1sthalf', 'first half', 'morning'].includes(normalized)) return 0;
-        if (['2nd half', '2ndhalf', 'second half', 'afternoon'].includes(normalized)) return 1;
-        return 2;
-    };
-    const getDominantSemester = (seats) => {
-        const counts = {};
-        (seats || []).forEach(seat => {
-            const reg = String(seat?.registration || '').trim().toUpperCase();
-            if (!reg || reg === 'EMPTY') return;
-            const semester = String(seat?.semester || seat?.student_semester || '').trim();
-            if (!semester) return;
-            counts[semester] = (counts[semester] || 0) + 1;
-        });
-        const entries = Object.entries(counts);
-        if (!entries.length) return '';
-        entries.sort((a, b) => {
-            if (b[1] !== a[1]) return b[1] - a[1];
-            return String(a[0]).localeCompare(String(b[0]));
-        });
-        return entries[0][0];
-    };
 
     if (downloadExamPdfBtn) {
         downloadExamPdfBtn.addEventListener('click', () => {
@@ -43,7 +20,13 @@ document.addEventListener('DOMContentLoaded', function(){
         return;
     }
 
-    fetch(`/get_exam_summary/?exam_id=${examId}`)
+    // Rooms come from a light index; each room's seats are fetched when its
+    // card nears the viewport, together with the next few rooms.
+    const SEAT_PREFETCH = 2;
+    const roomCards = new Map();   // position -> { card, room }
+    const requested = new Set();   // positions whose seats are loaded or in flight
+
+    fetch(`/exam-room-index/?exam_id=${examId}`)
         .then(r => r.json())
         .then(data => {
             if (data.status !== 'success') {
@@ -51,98 +34,30 @@ document.addEventListener('DOMContentLoaded', function(){
                 return;
             }
 
-            const rooms = [];
-            (data.rooms || []).forEach(room => {
-                if (!room || !Array.isArray(room.seats) || room.seats.length === 0) {
-                    rooms.push(room);
-                    return;
-                }
-
-                const seatsBySlot = {};
-                room.seats.forEach(seat => {
-                    const slotKey = `${seat.exam_date || ''}||${seat.start_time || ''}||${seat.end_time || ''}||${seat.session || ''}`;
-                    if (!seatsBySlot[slotKey]) {
-                        seatsBySlot[slotKey] = [];
-                    }
-                    seatsBySlot[slotKey].push(seat);
-                });
-
-                const slotKeys = Object.keys(seatsBySlot).sort();
-                if (slotKeys.length <= 1) {
-                    rooms.push(room);
-                    return;
-                }
-
-                slotKeys.forEach(slotKey => {
-                    const [slotDate, slotStartTime, slotEndTime, slotSession] = slotKey.split('||');
-                    rooms.push({
-                        ...room,
-                        slot_date: slotDate,
-                        slot_start_time: slotStartTime,
-                        slot_end_time: slotEndTime,
-                        slot_session: slotSession,
-                        department_details: Array.isArray(room.department_details)
-                            ? room.department_details.filter(item =>
-                                String(item.exam_date || '') === slotDate &&
-                                String(item.start_time || '') === slotStartTime &&
-                                String(item.end_time || '') === slotEndTime &&
-                                String(item.session || '') === slotSession
-                            )
-                            : [],
-                        seats: seatsBySlot[slotKey]
-                    });
-                });
-            });
-
-            rooms.sort((a, b) => {
-                const aDate = String(a?.slot_date || a?.seats?.[0]?.exam_date || '');
-                const bDate = String(b?.slot_date || b?.seats?.[0]?.exam_date || '');
-                if (aDate !== bDate) return aDate.localeCompare(bDate);
-
-                const aStart = String(a?.slot_start_time || a?.seats?.[0]?.start_time || '');
-                const bStart = String(b?.slot_start_time || b?.seats?.[0]?.start_time || '');
-                if (aStart !== bStart) return aStart.localeCompare(bStart);
-
-                const aEnd = String(a?.slot_end_time || a?.seats?.[0]?.end_time || '');
-                const bEnd = String(b?.slot_end_time || b?.seats?.[0]?.end_time || '');
-                if (aEnd !== bEnd) return aEnd.localeCompare(bEnd);
-
-                const aSession = getSessionSortKey(a?.slot_session || a?.seats?.[0]?.session || '');
-                const bSession = getSessionSortKey(b?.slot_session || b?.seats?.[0]?.session || '');
-                if (aSession !== bSession) return aSession - bSession;
-
-                const aFilled = (a?.seats || []).filter(seat => seat.registration && seat.registration.trim() && seat.registration.trim().toUpperCase() !== 'EMPTY').length;
-                const bFilled = (b?.seats || []).filter(seat => seat.registration && seat.registration.trim() && seat.registration.trim().toUpperCase() !== 'EMPTY').length;
-                if (aFilled !== bFilled) return bFilled - aFilled;
-
-                const aDeptCount = new Set((a?.department_details || []).map(item => String(item.department || '').trim().toUpperCase()).filter(Boolean)).size;
-                const bDeptCount = new Set((b?.department_details || []).map(item => String(item.department || '').trim().toUpperCase()).filter(Boolean)).size;
-                if (aDeptCount !== bDeptCount) return bDeptCount - aDeptCount;
-
-                const aRoom = `${a?.building || ''}-${a?.room_number || ''}`;
-                const bRoom = `${b?.building || ''}-${b?.room_number || ''}`;
-                return aRoom.localeCompare(bRoom);
-            });
-
+            const rooms = data.rooms || [];
             if (!rooms.length) {
                 container.innerHTML = '<p style="color:#666;">No rooms with allocated seats available.</p>';
                 return;
             }
 
             container.innerHTML = '';
+            const observer = 'IntersectionObserver' in window
+                ? new IntersectionObserver(entries => {
+                    entries.forEach(entry => {
+                        if (!entry.isIntersecting) return;
+                        observer.unobserve(entry.target);
+                        loadSeats(Number(entry.target.dataset.position));
+                    });
+                }, { rootMargin: '600px 0px' })
+                : null;
 
             rooms.forEach(room => {
                 const roomCard = document.createElement('div');
                 roomCard.className = 'room-card';
+                roomCard.dataset.position = room.position;
 
-                const roomStudents = (room.seats || []).filter(seat => seat.registration && seat.registration.trim() && seat.registration.trim().toUpperCase() !== 'EMPTY');
-                const roomSemester = getDominantSemester(roomStudents);
-                const roomDepartments = new Set();
-                roomStudents.forEach(seat => {
-                    if (seat.department && seat.department.trim()) {
-                        roomDepartments.add(seat.department.trim().toUpperCase());
-                    }
-                });
+                const roomDepartments = new Set(room.departments || []);
+                const roomSemester = room.semester || '';
                 const semesterText = roomSemester || 'N/A';
 
                 const header = document.createElement('div');
@@ -160,25 +75,64 @@ document.addEventListener('DOMContentLoaded', function(){
                 deptDiv.innerHTML = renderDepartmentInfo(room, roomDepartments, roomSemester);
                 roomCard.appendChild(deptDiv);
 
-                const seatGrid = renderSeatGrid(room);
-                roomCard.appendChild(seatGrid);
+                const placeholder = document.createElement('div');
+                placeholder.className = 'seat-grid';
+                placeholder.innerHTML = '<div style="color:#666; padding:10px;">Loading seats...</div>';
+                roomCard.appendChild(placeholder);
 
                 container.appendChild(roomCard);
+                roomCards.set(room.position, { card: roomCard, room });
+                if (observer) {
+                    observer.observe(roomCard);
+                }
             });
 
-            console.log('[VIEW_EXAM] Rendered', rooms.length, 'rooms');
+            if (!observer) {
+                rooms.forEach(room => loadSeats(room.position));
+            }
+            console.log('[VIEW_EXAM] Listed', rooms.length, 'rooms');
         })
         .catch(err => {
             console.error('[VIEW_EXAM] Fetch error:', err);
             container.innerHTML = `<p style="color:red;">Error loading seating data: ${err.message || err}</p>`;
         });
 
-    function renderDepartmentInfo(room, roomDepartments, roomSemester) {
-        const roomStudents = (room.seats || []).filter(seat => seat.registration && seat.registration.trim() && seat.registration.trim().toUpperCase() !== 'EMPTY');
+    function loadSeats(position) {
+        if (requested.has(position)) return;
+        let prefetch = 0;
+        while (prefetch < SEAT_PREFETCH && roomCards.has(position + prefetch + 1) && !requested.has(position + prefetch + 1)) {
+            prefetch += 1;
+        }
+        for (let p = position; p <= position + prefetch; p++) requested.add(p);
 
-        const firstSeat = roomStudents.length > 0 ? roomStudents[0] : null;
-        const targetDate = firstSeat ? firstSeat.exam_date : '';
-        const targetSession = firstSeat ? firstSeat.session : '';
+        fetch(`/exam-room-seats/?exam_id=${examId}&position=${position}&prefetch=${prefetch}`)
+            .then(r => r.json())
+            .then(data => {
+                if (data.status !== 'success') {
+                    throw new Error(data.message || 'Failed to load seats');
+                }
+                (data.rooms || []).forEach(item => {
+                    const entry = roomCards.get(item.position);
+                    if (!entry) return;
+                    entry.room.seats = item.seats || [];
+                    entry.card.replaceChild(renderSeatGrid(entry.room), entry.card.querySelector('.seat-grid'));
+                });
+            })
+            .catch(err => {
+                console.error('[VIEW_EXAM] Seat fetch error:', err);
+                for (let p = position; p <= position + prefetch; p++) {
+                    requested.delete(p);
+                    const entry = roomCards.get(p);
+                    if (entry && !entry.room.seats) {
+                        entry.card.querySelector('.seat-grid').innerHTML = `<div style="color:red; padding:10px;">Error loading seats: ${err.message || err}</div>`;
+                    }
+                }
+            });
+    }
+
+    function renderDepartmentInfo(room, roomDepartments, roomSemester) {
+        const targetDate = room.student_date || '';
+        const targetSession = room.student_session || '';
 
         let filteredDetails = (room.department_details || []).filter(item => {
             const dept = (item.department || '').trim().toUpperCase();
@@ -253,6 +207,12 @@ document.addEventListener('DOMContentLoaded', function(){
             return grid;
         }
 
+        const seatsByPosition = new Map();
+        (room.seats || []).forEach(s => {
+            const key = `${s.row}|${Number(s.column)}`;
+            if (!seatsByPosition.has(key)) seatsByPosition.set(key, s);
+        });
+
         rows.forEach((row, rowIdx) => {
             const rowDiv = document.createElement('div');
             rowDiv.className = 'seat-row';
@@ -269,7 +229,7 @@ document.addEventListener('DOMContentLoaded', function(){
                 const seatDiv = document.createElement('div');
                 seatDiv.className = 'seat';
 
-                const seat = (room.seats || []).find(s => s.row === row && Number(s.column) === col);
+                const seat = seatsByPosition.get(`${row}|${col}`);
                 const displaySeatLabel = getDisplaySeatLabel(col, rowIdx);
 
                 if (seat && seat.registration && seat.registration !== 'Empty') {
@@ -0,0 +1,79 @@
+"""
+Versioned, materialized exam summaries.
+
+The summary of an exam (rooms, department details, seats, counts) is built
+once and kept in `ExamSummarySnapshot`. Writes that can change it call
+`invalidate_exam_summaries`, which marks the snapshot stale and bumps its
+version; the next read rebuilds it. Each snapshot version is served with its
+own ETag, so a client revalidating an unchanged exam gets a 304 after a
+single primary-key lookup. Alongside the snapshot, its rooms are stored one
+row per room slot (`ExamRoomSlot`) so the exam viewer can page through them.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ExamRoomSlot, ExamStudent, ExamSummarySnapshot
+
+
+def summary_etag(exam_id, version):
+    return f'"exam-{exam_id}-v{version}"'
+
+
+def invalidate_exam_summaries(exam_ids=None, student_ids=None):
+    """
+    Mark stale the snapshots of `exam_ids` and of the exams containing
+    `student_ids`. Either may be a list or a `values_list` queryset.
+    """
+    snapshots = ExamSummarySnapshot.objects.none()
+    if exam_ids is not None:
+        snapshots = ExamSummarySnapshot.objects.filter(exam_id__in=exam_ids)
+    if student_ids is not None:
+        affected = ExamStudent.objects.filter(student_id__in=student_ids).values('exam_id')
+        snapshots = snapshots | ExamSummarySnapshot.objects.filter(exam_id__in=affected)
+    return snapshots.update(is_stale=True, version=F('version') + 1)
+
+
+def current_summary_etag(exam_id):
+    """ETag of the exam's up-to-date snapshot, or None when it must be (re)built. One query."""
+    version = (
+        ExamSummarySnapshot.objects
+        .filter(exam_id=exam_id, is_stale=False, exam__deleted_at__isnull=True)
+        .values_list('version', flat=True)
+        .first()
+    )
+    return None if version is None else summary_etag(exam_id, version)
+
+
+def load_exam_summary(exam, build, split_rooms):
+    """
+    Return `(payload, etag)` for the exam, rebuilding with `build(exam)` when
+    the snapshot is missing or stale; `split_rooms(payload)` gives the
+    `(summary, seats)` room slots stored with it.
+
+    The rebuilt payload is stored only if no invalidation happened while it
+    was being built (the version is compared and bumped in one UPDATE); in
+    that case it is still returned, but without an ETag.
+    """
+    snapshot, _ = ExamSummarySnapshot.objects.get_or_create(exam=exam)
+    if not snapshot.is_stale:
+        return snapshot.payload, summary_etag(exam.id, snapshot.version)
+
+    payload = build(exam)
+    with transaction.atomic():
+        stored = ExamSummarySnapshot.objects.filter(exam=exam, version=snapshot.version).update(
+            payload=payload, is_stale=False, version=snapshot.version + 1, built_at=timezone.now()
+        )
+        if stored:
+            ExamRoomSlot.objects.filter(exam=exam).delete()
+            ExamRoomSlot.objects.bulk_create(
+                ExamRoomSlot(exam=exam, position=position, summary=summary, seats=seats)
+                for position, (summary, seats) in enumerate(split_rooms(payload))
+            )
+    return payload, summary_etag(exam.id, snapshot.version + 1) if stored else None
+
+
+def refresh_exam_summary(exam, build, split_rooms):
+    """Rebuild the exam's snapshot now (after seating is locked or the setup completed)."""
+    invalidate_exam_summaries([exam.id])
+    return load_exam_summary(exam, build, split_rooms)
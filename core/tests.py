@@ -0,0 +1,640 @@
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import pdf_cache, seating_pdf
+from .models import AttendanceSheet, CampusRoom, DepartmentExam, Exam, ExamStudent, Room, SeatAllocation, Student, StudentDataFile
+from .rooms import room_key, sync_exam_rooms, upsert_catalogue_rooms
+from .search import find_students
+from .views import _build_exam_seat_view, _exam_summary_payload
+
+
+DEPARTMENTS = ("CSE", "ECE", "ME")
+STUDENT_CSV_HEADER = "COURSE,SEM,BRANCH,STUDENT NAME,ROLLNO,REG NO,STD ID,ACADEMIC_STATUS"
+
+
+def student_csv(rows, branches=("CSE", "ECE", "ME")):
+    lines = [STUDENT_CSV_HEADER]
+    for index in range(rows):
+        branch = branches[index % len(branches)]
+        lines.append(f"BTECH,3,{branch},Student {index},R{index},REG{index:05d},S{index},Eligible")
+    return "\n".join(lines)
+
+
+class AdminTestCase(TestCase):
+    """Logged in as admin, with MEDIA_ROOT (parsed upload cache, error reports) in a temp dir."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        session = self.client.session
+        session["admin_logged_in"] = True
+        session.save()
+
+    def upload(self, url, content, name="students.csv", **data):
+        data["file"] = SimpleUploadedFile(name, content.encode(), "text/csv")
+        return self.client.post(url, data)
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type="application/json")
+
+    def seated_exam(self, students, rooms):
+        self.upload("/upload-data/", student_csv(students, branches=DEPARTMENTS))
+        student_file = StudentDataFile.objects.order_by("-id").first()
+        exam_id = self.client.get("/init-temp-exam/").json()["exam_id"]
+        self.post_json("/create_exam/", {"exam_id": exam_id, "name": "Mid", "start_date": "2030-01-01", "end_date": "2030-01-03"})
+        self.post_json("/add_departments/", {"exam_id": exam_id, "departments": [
+            {"department": department, "exams": [{
+                "name": f"{department} paper", "code": f"{department}101", "date": "2030-01-01",
+                "session": "Morning", "start_time": "10:00", "end_time": "13:00", "semester": "3",
+            }]}
+            for department in DEPARTMENTS
+        ]})
+        self.post_json("/add_rooms/", {"exam_id": exam_id, "rooms": [
+            {"building": "Main", "room_number": str(100 + index), "capacity": 30} for index in range(rooms)
+        ]})
+        self.post_json("/save_selected_files/", {"exam_id": exam_id, "selected_files": [student_file.id]})
+        seating = self.post_json("/generate_seating/", {"exam_id": exam_id}).json()
+        self.post_json("/lock_seating/", {"exam_id": exam_id, "seating_data": seating["rooms"]})
+        self.post_json("/complete-exam-setup/", {"exam_id": exam_id})
+        return Exam.objects.get(id=exam_id)
+
+
+class StudentUploadTests(AdminTestCase):
+    def test_upload_without_invalid_rows(self):
+        response = self.upload("/upload-data/", student_csv(6))
+
+        self.assertEqual(response.status_code, 302)
+        student_file = StudentDataFile.objects.get()
+        self.assertEqual(Student.objects.filter(student_file=student_file).count(), 6)
+        self.assertNotIn("last_upload_error_report", self.client.session)
+
+    def test_exam_upload_without_invalid_rows(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+
+        response = self.upload("/upload-exam-student-file/", student_csv(4), exam_id=exam.id)
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()["file"]
+        self.assertEqual((payload["total"], payload["student_count"], payload["skipped"]), (4, 4, 0))
+        self.assertIsNone(payload["error_report_url"])
+
+    def test_identical_reupload_reports_rejected_rows(self):
+        first_exam = Exam.objects.create(name="Mid", is_temporary=True)
+        second_exam = Exam.objects.create(name="End", is_temporary=True)
+        content = student_csv(3) + "\nBTECH,3,CSE,Broken,,,,Eligible"
+
+        # The wizard upload parses the file; the exam upload replays it from the parsed cache.
+        first = self.upload("/upload-attendance-wizard-file/", content, exam_id=first_exam.id).json()["file"]
+        second = self.upload("/upload-exam-student-file/", content, exam_id=second_exam.id).json()["file"]
+        third = self.upload("/upload-exam-student-file/", content, exam_id=second_exam.id).json()["file"]
+
+        for payload in (first, second, third):
+            self.assertEqual((payload["total"], payload["student_count"], payload["skipped"]), (4, 3, 1))
+            self.assertIsNotNone(payload["error_report_url"])
+        report = self.client.get(third["error_report_url"])
+        self.assertIn(b"Missing", report.content)
+
+    def test_line_with_too_many_fields_is_reported(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        lines = student_csv(3).split("\n")
+        lines.insert(2, "BTECH,3,CSE,Extra,R9,REG9,S9,Eligible,surplus")
+
+        payload = self.upload("/upload-exam-student-file/", "\n".join(lines), exam_id=exam.id).json()["file"]
+
+        self.assertEqual((payload["total"], payload["student_count"], payload["skipped"]), (4, 3, 1))
+        report = self.client.get(payload["error_report_url"]).content.decode()
+        self.assertIn("Expected 8 fields, found 9", report)
+        self.assertIn("surplus", report)
+        self.assertTrue(report.splitlines()[1].startswith("1,,3,"))  # chunk 1, file row 3 (the header is row 1)
+
+    def test_wizard_upload_with_expired_cache_asks_for_reupload(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        self.upload("/upload-attendance-wizard-file/", student_csv(3), exam_id=exam.id)
+        for cached in Path(settings.MEDIA_ROOT, "parsed_uploads").iterdir():
+            cached.unlink()
+
+        response = self.client.post(
+            "/generate-sheets/", json.dumps({"exam_id": exam.id}), content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("upload it again", response.json()["message"])
+
+    def test_identical_uploads_get_their_own_files(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        self.upload("/upload-data/", student_csv(3))
+        payload = self.upload("/upload-exam-student-file/", student_csv(3), exam_id=exam.id).json()["file"]
+
+        dashboard_file = StudentDataFile.objects.get(exam__isnull=True)
+        exam_file = StudentDataFile.objects.get(id=payload["id"])
+        self.assertNotEqual(exam_file.id, dashboard_file.id)
+        self.assertEqual(exam_file.exam_id, exam.id)
+
+        student = Student.objects.filter(student_file=exam_file).order_by("id").first()
+        self.client.post(
+            "/update-students/", json.dumps({"students": [{"id": student.id, "name": "Renamed"}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(Student.objects.get(id=student.id).name, "Renamed")
+        self.assertEqual(
+            list(Student.objects.filter(student_file=dashboard_file).order_by("id").values_list("name", flat=True)),
+            ["Student 0", "Student 1", "Student 2"],
+        )
+
+    def test_file_used_by_an_exam_is_not_deleted(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        self.upload("/upload-data/", student_csv(3))
+        student_file = StudentDataFile.objects.get()
+        AttendanceSheet.objects.create(exam=exam, student_file=student_file, sheet_data=[])
+
+        self.client.post(f"/delete-file/{student_file.id}/")
+
+        self.assertTrue(StudentDataFile.objects.filter(id=student_file.id).exists())
+        self.assertEqual(Student.objects.filter(student_file=student_file).count(), 3)
+
+    def test_unused_file_is_deleted(self):
+        self.upload("/upload-data/", student_csv(3))
+        student_file = StudentDataFile.objects.get()
+
+        self.client.post(f"/delete-file/{student_file.id}/")
+
+        self.assertFalse(StudentDataFile.objects.filter(id=student_file.id).exists())
+
+
+class ReplaceStudentFileTests(AdminTestCase):
+    def select_files(self, exam, *files):
+        return self.client.post(
+            "/save_selected_files/", json.dumps({"exam_id": exam.id, "selected_files": [f.id for f in files]}),
+            content_type="application/json",
+        )
+
+    def replace(self, exam, student_file, content):
+        return self.upload(
+            "/upload-exam-student-file/", content, name="v2.csv", exam_id=exam.id, replace_file_id=student_file.id
+        ).json()["file"]
+
+    def exam_registrations(self, exam):
+        return sorted(ExamStudent.objects.filter(exam=exam).values_list("student__registration_number", flat=True))
+
+    def test_own_file_is_replaced_in_place(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        first = self.upload("/upload-exam-student-file/", student_csv(3), exam_id=exam.id).json()["file"]
+        student_file = StudentDataFile.objects.get(id=first["id"])
+        self.select_files(exam, student_file)
+
+        payload = self.replace(exam, student_file, student_csv(4))
+
+        self.assertEqual(payload["id"], student_file.id)
+        self.assertEqual(payload["diff"]["inserted"], 1)
+        self.assertEqual(len(self.exam_registrations(exam)), 4)
+
+    def test_shared_file_is_copied_before_the_diff(self):
+        self.upload("/upload-data/", student_csv(3))
+        shared = StudentDataFile.objects.get()
+        other_exam = Exam.objects.create(name="Completed", is_temporary=False, is_completed=True)
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        self.select_files(other_exam, shared)
+        self.select_files(exam, shared)
+        AttendanceSheet.objects.create(exam=exam, student_file=shared, sheet_data=[])
+
+        lines = student_csv(4).split("\n")
+        del lines[1]  # Student 0 leaves, Student 3 joins
+        payload = self.replace(exam, shared, "\n".join(lines))
+
+        self.assertNotEqual(payload["id"], shared.id)
+        self.assertEqual((payload["diff"]["inserted"], payload["diff"]["deleted"]), (1, 1))
+        copy = StudentDataFile.objects.get(id=payload["id"])
+        self.assertEqual(copy.exam_id, exam.id)
+        self.assertEqual(self.exam_registrations(exam), ["REG00001", "REG00002", "REG00003"])
+        self.assertEqual(AttendanceSheet.objects.get(exam=exam).student_file_id, copy.id)
+        # The dashboard file and the other exam are untouched.
+        self.assertEqual(self.exam_registrations(other_exam), ["REG00000", "REG00001", "REG00002"])
+        self.assertEqual(Student.objects.filter(student_file=shared).count(), 3)
+        self.assertEqual(StudentDataFile.objects.get(id=shared.id).file_name, "students.csv")
+
+    def test_dashboard_file_is_copied_even_when_only_this_exam_uses_it(self):
+        self.upload("/upload-data/", student_csv(3))
+        dashboard_file = StudentDataFile.objects.get()
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        self.select_files(exam, dashboard_file)
+
+        payload = self.replace(exam, dashboard_file, student_csv(4))
+
+        self.assertNotEqual(payload["id"], dashboard_file.id)
+        self.assertEqual(len(self.exam_registrations(exam)), 4)
+        self.assertEqual(Student.objects.filter(student_file=dashboard_file).count(), 3)
+
+
+class UpdateStudentsTests(AdminTestCase):
+    def test_duplicate_ids_reject_the_batch(self):
+        self.upload("/upload-data/", student_csv(2))
+        first, second = Student.objects.order_by("id")
+        rows = [
+            {"id": first.id, "name": "Renamed"},
+            {"id": second.id, "name": "Other"},
+            {"id": first.id, "name": "Renamed again"},
+        ]
+
+        response = self.client.post("/update-students/", json.dumps({"students": rows}), content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r["index"] for r in response.json()["results"] if r["status"] == "invalid"], [2])
+        self.assertEqual(Student.objects.get(id=first.id).name, "Student 0")
+
+
+class ExamSummaryQueryTests(AdminTestCase):
+    """The summary and the seating PDF rooms are built in a fixed number of queries, however large the exam."""
+
+    def test_summary_queries_do_not_grow_with_the_exam(self):
+        for students, rooms in ((60, 4), (240, 10)):
+            with self.subTest(students=students, rooms=rooms):
+                exam = self.seated_exam(students, rooms)
+
+                with self.assertNumQueries(4):
+                    payload = _exam_summary_payload(exam)
+                self.assertEqual(payload["total_students"], students)
+                self.assertGreater(len(payload["rooms"]), 1)
+                self.assertEqual({seat["department"] for seat in payload["seating"]} - {""}, set(DEPARTMENTS))
+
+                with self.assertNumQueries(3):
+                    rooms_data, exam_student_count = _build_exam_seat_view(exam)
+                self.assertEqual(len(rooms_data), len(payload["rooms"]))
+                self.assertEqual(exam_student_count, students)
+
+                # Served from the snapshot stored when the setup was completed.
+                with self.assertNumQueries(3):
+                    response = self.client.get(f"/get_exam_summary/?exam_id={exam.id}")
+                self.assertEqual(len(response.json()["rooms"]), len(payload["rooms"]))
+
+    def test_seating_pdf_queries_do_not_grow_with_the_exam(self):
+        pdf_cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pdf_cache_dir, ignore_errors=True)
+        for students, rooms in ((60, 4), (240, 10)):
+            with self.subTest(students=students, rooms=rooms), \
+                    mock.patch.object(pdf_cache, "PDF_CACHE_DIR", Path(pdf_cache_dir)):
+                exam = self.seated_exam(students, rooms)
+
+                # Rendering reads the rooms from the snapshot; a cache hit reads no seats at all.
+                with self.assertNumQueries(5):
+                    response = self.client.get(f"/download-seating-pdf/?exam_id={exam.id}")
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+                with self.assertNumQueries(4):
+                    response = self.client.get(f"/download-seating-pdf/?exam_id={exam.id}")
+                self.assertEqual(response.status_code, 200)
+                response.close()
+
+
+class ExpiredExamTests(AdminTestCase):
+    def test_listing_hides_expired_exams_and_queues_their_purge(self):
+        expired = Exam.objects.create(
+            name="Old", is_temporary=False, is_completed=True,
+            start_date=date(2020, 1, 1), end_date=date(2020, 1, 2),
+        )
+        current = Exam.objects.create(
+            name="New", is_temporary=False, is_completed=True,
+            start_date=date(2099, 1, 1), end_date=date(2099, 1, 2),
+        )
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get("/get-all-exams/")
+
+        self.assertEqual([exam["id"] for exam in response.json()["exams"]], [current.id])
+        self.assertFalse(Exam.objects.filter(id=expired.id).exists())
+        self.assertTrue(Exam.all_objects.filter(id=expired.id, deleted_at__isnull=False).exists())
+        self.assertEqual(len(callbacks), 1)
+
+
+class SeatingPdfTests(TestCase):
+    def test_chunked_rendering_matches_the_rooms(self):
+        from pypdf import PdfReader
+
+        from .management.commands.benchmark_seating_pdf import _synthetic_rooms
+        from .views import _draw_seating_pdf_page
+
+        chunk_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, chunk_dir, ignore_errors=True)
+        output = io.BytesIO()
+        with mock.patch.object(seating_pdf, "PDF_PARALLEL_MIN_PAGES", 2):
+            seating_pdf.render_seating_pdf(
+                _draw_seating_pdf_page, "Mid", _synthetic_rooms(7), output, workers=2, chunk_pages=3, chunk_dir=chunk_dir
+            )
+
+        self.assertEqual(len(PdfReader(output).pages), 7)
+        self.assertEqual(list(Path(chunk_dir).iterdir()), [])
+
+    def test_raster_writer_output_opens_with_pypdf(self):
+        from PIL import Image
+        from pypdf import PdfReader
+
+        from .raster_pdf import RasterPdfWriter
+
+        output = io.BytesIO()
+        writer = RasterPdfWriter(output, resolution=144, title="Mid – Hall A")
+        for mode in ("RGB", "L", "RGBA"):
+            writer.add_page(Image.new(mode, (288, 144)))
+        writer.close()
+
+        reader = PdfReader(io.BytesIO(output.getvalue()), strict=True)
+        self.assertEqual(len(reader.pages), 3)
+        self.assertEqual([(float(p.mediabox.width), float(p.mediabox.height)) for p in reader.pages], [(144.0, 72.0)] * 3)
+        self.assertEqual(reader.metadata.title, "Mid – Hall A")
+        self.assertEqual(reader.pages[0].images[0].image.size, (288, 144))
+
+
+class RoomTests(AdminTestCase):
+    def test_fractional_capacity_is_rejected(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        content = "Building,Room Number,Capacity\nMain,101,30\nMain,102,30.5\nMain,103,thirty"
+
+        response = self.upload("/upload-rooms-file/", content, name="rooms.csv", exam_id=exam.id)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [
+            {"row": 3, "errors": ["Invalid capacity value: '30.5'"]},
+            {"row": 4, "errors": ["Invalid capacity value: 'thirty'"]},
+        ])
+        self.assertFalse(CampusRoom.objects.exists())
+
+    def test_upsert_keeps_catalogue_spelling_and_refreshes_capacity(self):
+        existing = CampusRoom.objects.create(building="Main Block", room_number="A-101", capacity=30)
+
+        index = upsert_catalogue_rooms([("main  block", "a-101", 40), ("Annex", "7", 20), ("ANNEX", "7", 25)])
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.building, existing.room_number, existing.capacity), ("Main Block", "A-101", 40))
+        annex = CampusRoom.objects.get(building="Annex")
+        self.assertEqual(annex.capacity, 20)
+        self.assertEqual(CampusRoom.objects.count(), 2)
+        self.assertEqual(index[room_key("annex", "7")].id, annex.id)
+
+        upsert_catalogue_rooms([("Main Block", "A-101", 10)], update_capacity=False)
+        existing.refresh_from_db()
+        self.assertEqual(existing.capacity, 40)
+
+    def test_sync_keeps_matching_rooms_and_removes_the_rest(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=True)
+        sync_exam_rooms(exam, [
+            {"building": "Main", "room_number": "101", "capacity": 30},
+            {"building": "Main", "room_number": "102", "capacity": 30},
+        ])
+        kept, dropped = Room.objects.filter(exam=exam).order_by("room_number")
+        for room in (kept, dropped):
+            SeatAllocation.objects.create(
+                exam=exam, room=room, registration_number=f"REG{room.room_number}", department="CSE",
+                seat_code="A1", row="A", column=1,
+            )
+
+        counts = sync_exam_rooms(exam, [
+            {"building": "MAIN", "room_number": "101", "capacity": 35},
+            {"building": "Annex", "room_number": "1", "capacity": 20},
+        ])
+
+        self.assertEqual(counts, {"added": 1, "updated": 1, "removed": 1, "unchanged": 0})
+        self.assertFalse(Room.objects.filter(id=dropped.id).exists())
+        self.assertEqual(list(SeatAllocation.objects.filter(exam=exam).values_list("room_id", flat=True)), [kept.id])
+        kept.refresh_from_db()
+        self.assertEqual(kept.capacity, 35)
+        self.assertEqual(
+            sorted(Room.objects.filter(exam=exam).values_list("room_number", flat=True)), ["1", "101"]
+        )
+
+
+class ScheduleImportTests(AdminTestCase):
+    HEADER = "Dept Name,Exam Name,Paper Code,Date,Session,Start Time,End Time,Semester"
+
+    def setUp(self):
+        super().setUp()
+        self.exam = Exam.objects.create(name="Mid", is_temporary=True)
+
+    def import_schedule(self, *lines):
+        content = "\n".join([self.HEADER, *lines])
+        return self.upload("/upload-schedule-file/", content, name="schedule.csv", exam_id=self.exam.id)
+
+    def assert_rejected(self, response, expected_errors):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], expected_errors)
+        self.assertFalse(DepartmentExam.objects.exists())
+
+    def test_valid_schedule_is_imported(self):
+        response = self.import_schedule(
+            "CSE,Maths,MA101,2026-11-02,Morning,10:00 AM,1:00 PM,3",
+            "CSE,Physics,PH101,03/11/2026,afternoon,14:00,17:00,3",
+            "ECE,Maths,MA101,02-11-2026,1st Half,10:00,13:00,3",
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["created"], 3)
+        papers = DepartmentExam.objects.filter(exam=self.exam).order_by("exam_date", "department")
+        self.assertEqual(
+            [(p.department, p.paper_code, p.exam_date, p.session, p.start_time, p.end_time) for p in papers],
+            [
+                ("CSE", "MA101", date(2026, 11, 2), "1st Half", time(10), time(13)),
+                ("ECE", "MA101", date(2026, 11, 2), "1st Half", time(10), time(13)),
+                ("CSE", "PH101", date(2026, 11, 3), "2nd Half", time(14), time(17)),
+            ],
+        )
+
+    def test_duplicate_paper_is_rejected(self):
+        response = self.import_schedule(
+            "CSE,Maths,MA101,2026-11-02,Morning,10:00,13:00,3",
+            "CSE,Maths again,ma101,2026-11-05,Morning,10:00,13:00,3",
+            "CSE,Maths,MA101,2026-11-02,Morning,10:00,13:00,5",
+        )
+
+        message = "Paper {} is listed more than once for this department/semester"
+        self.assert_rejected(response, [
+            {"row": 2, "errors": [message.format("MA101")]},
+            {"row": 3, "errors": [message.format("ma101")]},
+        ])
+
+    def test_session_clash_is_rejected(self):
+        response = self.import_schedule(
+            "CSE,Maths,MA101,2026-11-02,Morning,09:00,12:00,3",
+            "CSE,Physics,PH101,2026-11-02,Morning,11:30,13:00,3",
+            "CSE,Chemistry,CH101,2026-11-02,Afternoon,14:00,17:00,3",
+            "ECE,Physics,PH101,2026-11-02,Morning,11:30,13:00,3",
+        )
+
+        self.assert_rejected(response, [
+            {"row": 3, "errors": ["Clashes with another paper for this department/semester on the same date"]},
+        ])
+
+    def test_bad_date_is_rejected(self):
+        response = self.import_schedule(
+            "CSE,Maths,MA101,2026-11-02,Morning,10:00,13:00,3",
+            "CSE,Physics,PH101,31/02/2026,Morning,10:00,13:00,3",
+        )
+
+        self.assert_rejected(response, [{"row": 3, "errors": ["Date is not a valid date"]}])
+
+
+def make_student(student_file, name, registration_number, roll_number="", student_id="", **fields):
+    return Student.objects.create(
+        student_file=student_file, name=name, registration_number=registration_number,
+        roll_number=roll_number or f"R-{registration_number}", student_id=student_id or f"S-{registration_number}",
+        course="BTech", semester="3", branch="CSE", academic_status="Regular", **fields
+    )
+
+
+class StudentSearchTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = StudentDataFile.objects.create(file_name="students.csv")
+        self.asha = make_student(self.file, "Asha Rao", "REG100", roll_number="ROLL7", student_id="SID42")
+        self.ravi = make_student(self.file, "Ravi Kumar", "REG200")
+
+    def found(self, term, limit=20):
+        return [student["id"] for student in find_students(term, limit)]
+
+    def test_prefix_matches_each_column_case_insensitively(self):
+        for term in ("reg1", "roll7", "sid4", "asha r"):
+            with self.subTest(term=term):
+                self.assertEqual(self.found(term), [self.asha.id])
+        self.assertEqual(self.found("reg"), [self.asha.id, self.ravi.id])
+        self.assertEqual(self.found("100"), [])  # prefix, not substring
+
+    def test_like_wildcards_are_matched_literally(self):
+        percent = make_student(self.file, "50% Quota", "QTA1")
+        underscore = make_student(self.file, "A_B", "QTA2")
+
+        self.assertEqual(self.found("50%"), [percent.id])
+        self.assertEqual(self.found("5%"), [])
+        self.assertEqual(self.found("A_"), [underscore.id])
+        self.assertEqual(self.found("R_G"), [])
+
+    def test_limit_counts_students_not_seats(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=False)
+        for student in (self.asha, self.ravi):
+            ExamStudent.objects.create(exam=exam, student_file=self.file, student=student)
+
+        results = find_students("reg", 1)
+
+        self.assertEqual([student["id"] for student in results], [self.asha.id])
+        self.assertEqual([e["exam_id"] for e in results[0]["exams"]], [exam.id])
+
+        response = self.client.get("/search-students/", {"q": "reg", "limit": 1})
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_deleted_files_and_exams_are_hidden(self):
+        exam = Exam.objects.create(name="Mid", is_temporary=False)
+        ExamStudent.objects.create(exam=exam, student_file=self.file, student=self.asha)
+        Exam.all_objects.filter(id=exam.id).update(deleted_at=timezone.now())
+
+        self.assertEqual(find_students("asha")[0]["exams"], [])
+
+        StudentDataFile.all_objects.filter(id=self.file.id).update(deleted_at=timezone.now())
+        self.assertEqual(self.found("reg"), [])
+
+
+class FileStudentsPaginationTests(AdminTestCase):
+    NAMES = ["Meena", "Arjun", "Zoya", "Arjun", "Kiran", "Meena", "Bela", "Arjun", "Dev", "Kiran"]
+
+    def setUp(self):
+        super().setUp()
+        self.file = StudentDataFile.objects.create(file_name="students.csv", row_count=len(self.NAMES))
+        self.students = [
+            make_student(self.file, name, f"REG{index:03d}") for index, name in enumerate(self.NAMES)
+        ]
+
+    def pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            query = {"file_id": self.file.id, "limit": 3, **params}
+            if cursor:
+                query["cursor"] = cursor
+            response = self.client.get("/get-file-students/", query)
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            self.assertLessEqual(len(data["students"]), 3)
+            ids.extend(student["id"] for student in data["students"])
+            cursor = data["next_cursor"]
+            self.assertEqual(data["has_more"], cursor is not None)
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_student_once(self):
+        by_name = sorted(self.students, key=lambda s: (s.name, s.id))
+        cases = {
+            "id": [s.id for s in self.students],
+            "-id": [s.id for s in reversed(self.students)],
+            "name": [s.id for s in by_name],
+            "-name": [s.id for s in reversed(by_name)],
+        }
+        for sort, expected in cases.items():
+            with self.subTest(sort=sort):
+                self.assertEqual(self.pages(sort=sort), expected)
+
+    def test_filters_apply_across_pages(self):
+        expected = [s.id for s in self.students if s.name in ("Arjun", "Meena")]
+
+        self.assertEqual(sorted(self.pages(q="arjun") + self.pages(q="MEE", sort="-name")), sorted(expected))
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get("/get-file-students/", {"file_id": self.file.id, "cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class SeatPayloadTests(AdminTestCase):
+    def decode_compact(self, room):
+        """Rebuild the verbose seat list of a `format=compact` room, empty seats left out."""
+        columns = {key: values for key, values in room["seats"].items() if key != "slot"}
+        seats = []
+        for index in range(room["seat_count"]):
+            seat = {"room_id": room["id"], "room_building": room["building"], "room_number": room["room_number"]}
+            seat.update({key: values[index] for key, values in columns.items()})
+            if "slot" in room["seats"]:
+                seat.update(room["slots"][room["seats"]["slot"][index]])
+            seats.append(seat)
+        return seats
+
+    def test_compact_rooms_decode_to_the_full_seats(self):
+        exam = self.seated_exam(40, 3)
+        full = self.client.get(f"/get_exam_summary/?exam_id={exam.id}").json()["rooms"]
+        compact = self.client.get(f"/get_exam_summary/?exam_id={exam.id}&format=compact").json()["rooms"]
+
+        self.assertEqual(len(compact), len(full))
+        for verbose, encoded in zip(full, compact):
+            filled = [seat for seat in verbose["seats"] if seat["registration"] != "Empty"]
+            self.assertEqual(self.decode_compact(encoded), filled)
+            self.assertEqual(encoded["empty_seats"], len(verbose["seats"]) - len(filled))
+        self.assertEqual(sum(room["seat_count"] for room in compact), 40)
+
+    def test_selected_fields_in_both_formats(self):
+        exam = self.seated_exam(10, 1)
+        url = f"/get_exam_summary/?exam_id={exam.id}"
+        full = self.client.get(url).json()["rooms"][0]["seats"]
+
+        sparse = self.client.get(url + "&fields=seat,registration").json()["rooms"][0]["seats"]
+        self.assertEqual(sparse, [{"seat": s["seat"], "registration": s["registration"]} for s in full])
+
+        compact = self.client.get(url + "&format=compact&fields=seat,exam_name").json()["rooms"][0]
+        self.assertEqual(list(compact["seats"]), ["seat", "slot"])
+        self.assertEqual(
+            [{"seat": seat, **compact["slots"][slot]} for seat, slot in zip(compact["seats"]["seat"], compact["seats"]["slot"])],
+            [{"seat": s["seat"], "exam_name": s["exam_name"]} for s in full if s["registration"] != "Empty"],
+        )
+
+    def test_unknown_field_or_format_is_rejected(self):
+        exam = self.seated_exam(10, 1)
+
+        for query in ("fields=seat,bogus", "format=compact&fields=bogus", "format=tiny"):
+            with self.subTest(query=query):
+                response = self.client.get(f"/get_exam_summary/?exam_id={exam.id}&{query}")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["status"], "error")
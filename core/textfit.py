@@ -0,0 +1,81 @@
+"""
+Fitting text into table cells of the ReportLab PDFs.
+
+Text that is too wide for its cell is first drawn smaller, in `step`-point
+steps down to a minimum size, and if it still does not fit it is cut short
+with "...". Measuring with `canvas.stringWidth` at every step and after
+every removed character costs dozens of measurements per long name.
+Here each font's glyph widths are looked up once per character. The size
+then follows from one division, because a string's width grows linearly
+with its size, and the cut is found by binary search over prefix widths.
+Results are memoized per (text, width, font, sizes), as the same names
+recur across sheets.
+"""
+import math
+from functools import lru_cache
+from itertools import accumulate
+
+try:
+    from reportlab.pdfbase import pdfmetrics
+except Exception:
+    pdfmetrics = None
+
+
+ELLIPSIS = "..."
+
+_glyph_widths = {}
+
+
+def glyph_width(char, font_name):
+    """Width of `char` in `font_name` at 1000 points (ReportLab's glyph units)."""
+    widths = _glyph_widths.setdefault(font_name, {})
+    width = widths.get(char)
+    if width is None:
+        width = widths[char] = pdfmetrics.stringWidth(char, font_name, 1000)
+    return width
+
+
+def text_width(text, font_name, size):
+    """Same as `canvas.stringWidth(text, font_name, size)` for fonts without kerning."""
+    return sum(glyph_width(char, font_name) for char in text) * size / 1000
+
+
+@lru_cache(maxsize=65536)
+def fit_text(text, width, font_name, size, min_size=None, step=0.5):
+    """
+    `(text, size)` to draw `text` within `width` points: the largest of
+    `size`, `size - step`, ... that fits, stopping at `min_size` (no
+    shrinking when None), then the longest prefix that fits with "..."
+    appended, or "" when not even that does.
+    """
+    width = max(0, width)
+    units = [glyph_width(char, font_name) for char in text]
+    per_point = sum(units) / 1000
+
+    if min_size is not None and per_point * size > width:
+        # The loop this replaces stops at the first step at or below min_size.
+        last_step = math.ceil((size - min_size) / step)
+        fitting_step = math.ceil((size - width / per_point) / step)
+        steps = max(0, min(fitting_step, last_step))
+        # Undo float rounding in the division above.
+        while steps > 0 and per_point * (size - (steps - 1) * step) <= width:
+            steps -= 1
+        size = size - steps * step
+
+    if per_point * size <= width:
+        return text, size
+
+    ellipsis_units = sum(glyph_width(char, font_name) for char in ELLIPSIS)
+    limit = width * 1000 / size - ellipsis_units
+    prefix_units = list(accumulate(units, initial=0))
+    low, high = 0, len(text)
+    # Largest n with prefix_units[n] <= limit.
+    while low < high:
+        middle = (low + high + 1) // 2
+        if prefix_units[middle] <= limit:
+            low = middle
+        else:
+            high = middle - 1
+    if limit < 0 or low == 0:
+        return "", size
+    return text[:low] + ELLIPSIS, size
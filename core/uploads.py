@@ -0,0 +1,190 @@
+"""
+Shared reader for spreadsheet uploads.
+
+The format is detected once from the leading bytes (ZIP container -> XLSX,
+OLE2 compound document -> legacy XLS, otherwise delimited text) with the file
+extension only used as a tie-breaker, and the upload is handed to exactly one
+parser. CSV delimiters are sniffed from a sample of the text. Chunked CSV
+reading reports lines with more fields than the header as `BadLine`s instead
+of dropping them.
+"""
+import csv
+import hashlib
+import io
+from collections import namedtuple
+
+import pandas as pd
+
+
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+FORMAT_XLS = "xls"
+
+ZIP_MAGIC = b"PK\x03\x04"
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+SNIFF_BYTES = 16 * 1024
+CSV_DELIMITERS = ",;\t|"
+
+UploadFormat = namedtuple("UploadFormat", ["kind", "delimiter"])
+# `bad_lines` rows stay in `frame` as blank rows, so row numbers still line up.
+UploadChunk = namedtuple("UploadChunk", ["sheet", "first_row", "frame", "bad_lines"], defaults=[()])
+BadLine = namedtuple("BadLine", ["row", "fields", "expected"])
+
+
+def _peek(uploaded_file, size):
+    uploaded_file.seek(0)
+    head = uploaded_file.read(size)
+    uploaded_file.seek(0)
+    return head or b""
+
+
+def _sniff_delimiter(sample):
+    text = sample.decode("utf-8-sig", errors="replace")
+    # Only sniff complete lines; a truncated last line skews the counts.
+    if "\n" in text:
+        text = text[:text.rfind("\n")]
+    try:
+        return csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def sniff_upload_format(uploaded_file):
+    """Return the `UploadFormat` of an upload, or raise ValueError for unsupported binaries."""
+    head = _peek(uploaded_file, SNIFF_BYTES)
+    name = (getattr(uploaded_file, "name", "") or "").lower()
+
+    if head.startswith(ZIP_MAGIC):
+        return UploadFormat(FORMAT_XLSX, None)
+    if head.startswith(OLE2_MAGIC):
+        return UploadFormat(FORMAT_XLS, None)
+    if not head.strip():
+        if name.endswith((".xlsx", ".xlsm", ".xls")):
+            raise ValueError("File is empty. Please check your file.")
+        return UploadFormat(FORMAT_CSV, ",")
+    if b"\x00" in head:
+        raise ValueError("Unsupported file format. Please upload a CSV, XLS or XLSX file.")
+    return UploadFormat(FORMAT_CSV, _sniff_delimiter(head))
+
+
+def upload_content_hash(uploaded_file):
+    """sha256 hex digest of the uploaded bytes, read in the upload's own chunks."""
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    if hasattr(uploaded_file, "chunks"):
+        blocks = uploaded_file.chunks()
+    else:
+        blocks = iter(lambda: uploaded_file.read(1024 * 1024), b"")
+    for block in blocks:
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+# =========================
+# Whole-file reader
+# =========================
+def read_upload_frame(uploaded_file):
+    """Parse the first sheet (or the whole CSV) of an upload into a string DataFrame."""
+    upload_format = sniff_upload_format(uploaded_file)
+    if upload_format.kind == FORMAT_XLSX:
+        return pd.read_excel(uploaded_file, dtype=str, engine="openpyxl")
+    if upload_format.kind == FORMAT_XLS:
+        return pd.read_excel(uploaded_file, dtype=str, engine="xlrd")
+    # A malformed line raises pandas' ParserError (a ValueError) naming the line.
+    return pd.read_csv(uploaded_file, dtype=str, sep=upload_format.delimiter)
+
+
+# =========================
+# Chunked readers
+# =========================
+def _unique_headers(header):
+    """Mirror pandas' duplicate-column mangling (`name`, `name.1`, ...) for openpyxl headers."""
+    seen = {}
+    columns = []
+    for index, value in enumerate(header):
+        name = str(value).strip() if value is not None else f"unnamed: {index}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _iter_csv_chunks(uploaded_file, chunk_rows, delimiter):
+    uploaded_file.seek(0)
+    text = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+    try:
+        rows = csv.reader(text, delimiter=delimiter)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _unique_headers([value if value.strip() else None for value in header])
+        width = len(columns)
+        first_row = 2  # row 1 is the header
+        buffer = []
+        bad_lines = []
+        for values in rows:
+            if len(values) > width:
+                bad_lines.append(BadLine(first_row + len(buffer), values, width))
+                values = []
+            # Empty cells are missing values, as pandas would read them.
+            buffer.append([value or None for value in values])
+            if len(buffer) >= chunk_rows:
+                yield UploadChunk("", first_row, pd.DataFrame(buffer, columns=columns, dtype=object), bad_lines)
+                first_row += len(buffer)
+                buffer = []
+                bad_lines = []
+        if buffer:
+            yield UploadChunk("", first_row, pd.DataFrame(buffer, columns=columns, dtype=object), bad_lines)
+    finally:
+        # Leave the upload open for whoever reads it next.
+        text.detach()
+
+
+def _iter_xlsx_chunks(uploaded_file, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            columns = None
+            first_row = 0
+            buffer = []
+            for row_number, values in enumerate(rows, start=1):
+                if columns is None:
+                    if any(v is not None and str(v).strip() for v in values):
+                        columns = _unique_headers(values)
+                        first_row = row_number + 1
+                    continue
+                buffer.append(values[:len(columns)])
+                if len(buffer) >= chunk_rows:
+                    yield UploadChunk(sheet.title, first_row, pd.DataFrame(buffer, columns=columns, dtype=object))
+                    first_row += len(buffer)
+                    buffer = []
+            if columns is not None and buffer:
+                yield UploadChunk(sheet.title, first_row, pd.DataFrame(buffer, columns=columns, dtype=object))
+    finally:
+        workbook.close()
+
+
+def _iter_xls_chunks(uploaded_file, chunk_rows):
+    # Legacy .xls has no streaming reader; parse each sheet once and slice it.
+    sheets = pd.read_excel(uploaded_file, sheet_name=None, dtype=str, engine="xlrd")
+    for sheet_name, frame in sheets.items():
+        for start in range(0, len(frame), chunk_rows):
+            yield UploadChunk(sheet_name, start + 2, frame.iloc[start:start + chunk_rows])
+
+
+def iter_upload_chunks(uploaded_file, chunk_rows):
+    """Yield `UploadChunk`s of at most `chunk_rows` rows from every sheet of an upload."""
+    upload_format = sniff_upload_format(uploaded_file)
+    if upload_format.kind == FORMAT_XLSX:
+        return _iter_xlsx_chunks(uploaded_file, chunk_rows)
+    if upload_format.kind == FORMAT_XLS:
+        return _iter_xls_chunks(uploaded_file, chunk_rows)
+    return _iter_csv_chunks(uploaded_file, chunk_rows, upload_format.delimiter)
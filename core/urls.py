@@ -30,11 +30,14 @@ from .views import (
     upload_student_data,
     upload_attendance_wizard_file,
     upload_exam_student_file,
+    download_upload_error_report,
     delete_student_file,
     get_file_students,
+    search_students,
     update_students,
     add_file_students,
     add_departments,
+    upload_schedule_file,
     add_rooms,
     add_room_single,
     get_uploaded_files,
@@ -43,7 +46,10 @@ from .views import (
     get_seating_data,
     lock_seating,
     get_exam_summary,
+    get_exam_room_index,
+    get_exam_room_seats,
     upload_rooms_file,
+    get_room_catalogue,
     student_portal,
     get_student_info,
     get_student_seat,
@@ -96,13 +102,17 @@ urlpatterns = [
     path('upload-data/', upload_student_data, name='upload_data'),
     path('upload-attendance-wizard-file/', upload_attendance_wizard_file, name='upload_attendance_wizard_file'),
     path('upload-exam-student-file/', upload_exam_student_file, name='upload_exam_student_file'),
+    path('upload-error-report/', download_upload_error_report, name='download_upload_error_report'),
     path('delete-file/<int:file_id>/', delete_student_file, name='delete_student_file'),
     path('get-file-students/', get_file_students, name='get_file_students'),
+    path('search-students/', search_students, name='search_students'),
     path('update-students/', update_students, name='update_students'),
     path('add-file-students/', add_file_students, name='add_file_students'),
     path('add_departments/', add_departments, name='add_departments'),
+    path('upload-schedule-file/', upload_schedule_file, name='upload_schedule_file'),
     path('add_rooms/', add_rooms, name='add_rooms'),
     path('upload-rooms-file/', upload_rooms_file, name='upload_rooms_file'),
+    path('room-catalogue/', get_room_catalogue, name='get_room_catalogue'),
     path('add_room/', add_room_single, name='add_room_single'),
     path('get_uploaded_files/', get_uploaded_files, name='get_uploaded_files'),
     path('save_selected_files/', save_selected_files, name='save_selected_files'),
@@ -111,6 +121,8 @@ urlpatterns = [
     path('lock_seating/', lock_seating, name='lock_seating'),
     path('lock-seating/', lock_seating, name='lock_seating_hyphen'),
     path('get_exam_summary/', get_exam_summary, name='get_exam_summary'),
+    path('exam-room-index/', get_exam_room_index, name='get_exam_room_index'),
+    path('exam-room-seats/', get_exam_room_seats, name='get_exam_room_seats'),
     path('view-exam/<int:exam_id>/', view_exam, name='view_exam'),
     path('student-portal/', student_portal, name='student_portal'),
     path('get-student-info/', get_student_info, name='get_student_info'),
@@ -2,36 +2,41 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.gzip import gzip_page
 from django.contrib.auth.decorators import login_required
 from datetime import datetime, timedelta, date, time
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Case, CharField, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 import secrets
 import string
 import logging
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, JsonResponse, StreamingHttpResponse,
+)
+from django.utils.http import content_disposition_header, http_date, parse_etags
 from django.shortcuts import render, redirect
 
 import pandas as pd
+import base64
+import hashlib
 import json
+import os
 import re
 from django.contrib.auth.hashers import make_password, check_password
 import traceback
-from pathlib import Path
-from django.db import transaction, IntegrityError
+from django.db import connection, transaction, IntegrityError
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 try:
     from reportlab.lib.pagesizes import A4
     from reportlab.pdfgen import canvas as reportlab_canvas
-    from reportlab.lib.utils import ImageReader
     REPORTLAB_AVAILABLE = True
 except Exception:
     A4 = None
     reportlab_canvas = None
-    ImageReader = None
     REPORTLAB_AVAILABLE = False
 
 # Setup logging for security events
@@ -40,30 +45,13 @@ logger = logging.getLogger('exam_system')
 ATTENDANCE_SHEET_STUDENTS_PER_PAGE = 20
 MARKS_SHEET_STUDENTS_PER_PAGE = 20
 
+# Bump an entry when that PDF's drawing code changes, so cached copies are redrawn.
+PDF_TEMPLATE_VERSIONS = {"attendance": 3, "marks": 4, "seating": 2}
+
 PDF_DPI = 150
 MM_TO_PX = PDF_DPI / 25.4
 A4_WIDTH_PX = int(round(210 * MM_TO_PX))
 A4_HEIGHT_PX = int(round(297 * MM_TO_PX))
-LOGO_PATH_CANDIDATES = (
-    settings.BASE_DIR / "static" / "core" / "img" / "logo.png",
-    settings.BASE_DIR / "staticfiles" / "core" / "img" / "logo.png",
-)
-FONT_CANDIDATES = {
-    "regular": (
-        Path("/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf"),
-        Path("/usr/share/fonts/truetype/liberation2/LiberationSerif-Regular.ttf"),
-        Path("C:/Windows/Fonts/times.ttf"),
-        Path("C:/Windows/Fonts/georgia.ttf"),
-        Path("C:/Windows/Fonts/arial.ttf"),
-    ),
-    "bold": (
-        Path("/usr/share/fonts/truetype/dejavu/DejaVuSerif-Bold.ttf"),
-        Path("/usr/share/fonts/truetype/liberation2/LiberationSerif-Bold.ttf"),
-        Path("C:/Windows/Fonts/timesbd.ttf"),
-        Path("C:/Windows/Fonts/georgiab.ttf"),
-        Path("C:/Windows/Fonts/arialbd.ttf"),
-    ),
-}
 
 from .forms import StudentDataUploadForm, ForgotPasswordForm, ResetPasswordForm, AdminEmailUploadForm
 from .models import (
@@ -71,8 +59,10 @@ from .models import (
     Student,
     DepartmentExam,
     Exam,
+    CampusRoom,
     Room,
     ExamStudent,
+    ExamRoomSlot,
     SeatAllocation,
     AttendanceSheet,
     MarksSheet,
@@ -82,6 +72,36 @@ from .models import (
     PasswordResetToken,
 )
 from .config import AppConfig
+from .departments import DepartmentResolver
+from .bulk import bulk_insert
+from .uploads import read_upload_frame, upload_content_hash
+from .schedule import department_exam_objects, parse_schedule_frame, schedule_by_department
+from .rooms import parse_room_frame, room_key, sync_exam_rooms, upsert_catalogue_rooms
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_MIN_LENGTH, find_students
+from .purge import delete_exams, delete_expired_exams, delete_student_files
+from .payloads import encode_rooms, representation_key, seat_options
+from .seating_pdf import render_seating_pdf
+from .pdf_cache import PDF_CACHE_DIR, cache_key as pdf_cache_key, open_pdf as open_cached_pdf
+from .raster_pdf import RasterPdfWriter
+from . import sheet_assets
+from .textfit import fit_text
+from .summaries import current_summary_etag, invalidate_exam_summaries, load_exam_summary, refresh_exam_summary
+from .ingest import (
+    REQUIRED_STUDENT_FIELDS,
+    STUDENT_FIELDS,
+    STUDENT_LOAD_FIELDS,
+    ParsedUploadCacheWriter,
+    StudentFileWriter,
+    StudentFrameCollector,
+    StudentIngestor,
+    StudentRecordCollector,
+    apply_student_file_diff,
+    refresh_student_file_stats,
+    error_report_path,
+    load_parsed_rejects,
+    load_parsed_upload,
+    save_error_report,
+)
 
 # =========================
 # Admin Credentials (from OOP config)
@@ -110,20 +130,7 @@ def _session_sort_key(session_value):
     return 2
 
 
-def _resolve_department_exam_meta(dept_exam_lookup, department, exam_date, exam_session, semester=""):
-    dept_key = str(department or "").strip().upper()
-    date_key = str(exam_date or "")
-    session_key = str(exam_session or "")
-    semester_key = str(semester or "").strip()
-
-    candidates = []
-    for key, value in dept_exam_lookup.items():
-        key_dept, key_date, key_session, key_sem = key
-        if key_dept != dept_key or key_date != date_key or key_session != session_key:
-            continue
-        has_time = bool(value.get("start_time") or value.get("end_time"))
-        candidates.append((key_sem, value, has_time))
-
+def _pick_department_exam_meta(candidates, semester_key):
     if not candidates:
         return {"start_time": "", "end_time": "", "semester": semester_key}
 
@@ -160,6 +167,46 @@ def _resolve_department_exam_meta(dept_exam_lookup, department, exam_date, exam_
     }
 
 
+def _compile_department_exam_lookup(department_exams):
+    """
+    Precompile DepartmentExam rows (dicts with canonical_department_id,
+    exam_date, session, semester, start_time, end_time) into a memoized
+    `resolve(department_id, exam_date, exam_session, semester)` that returns
+    the paper's start_time, end_time and semester for a seat.
+
+    Papers are bucketed by (department, date, session) once, so resolving a
+    seat no longer scans every paper of the exam.
+    """
+    papers = {}
+    for de in department_exams:
+        key = (
+            de['canonical_department_id'],
+            str(de['exam_date'] or ''),
+            str(de['session'] or ''),
+            str(de['semester'] or '').strip()
+        )
+        papers[key] = {
+            'start_time': str(de['start_time']) if de['start_time'] else '',
+            'end_time': str(de['end_time']) if de['end_time'] else '',
+            'semester': str(de['semester']).strip() if de['semester'] else ''
+        }
+
+    buckets = {}
+    for (dept_id, exam_date, session, semester), value in papers.items():
+        has_time = bool(value['start_time'] or value['end_time'])
+        buckets.setdefault((dept_id, exam_date, session), []).append((semester, value, has_time))
+
+    resolved = {}
+
+    def resolve(department_id, exam_date, exam_session, semester=""):
+        key = (department_id, str(exam_date or ""), str(exam_session or ""), str(semester or "").strip())
+        if key not in resolved:
+            resolved[key] = _pick_department_exam_meta(buckets.get(key[:3], []), key[3])
+        return resolved[key]
+
+    return resolve
+
+
 def _dominant_room_semester(room_seats):
     semester_counts = {}
     for seat in room_seats or []:
@@ -176,21 +223,6 @@ def _dominant_room_semester(room_seats):
     return max(semester_counts.items(), key=lambda item: (item[1], item[0]))[0]
 
 
-def _load_attendance_font(size, bold=False):
-    key = "bold" if bold else "regular"
-    for font_path in FONT_CANDIDATES[key]:
-        if font_path.exists():
-            return ImageFont.truetype(str(font_path), size=size)
-    return ImageFont.load_default()
-
-
-def _attendance_logo_image():
-    for logo_path in LOGO_PATH_CANDIDATES:
-        if logo_path.exists():
-            return Image.open(logo_path).convert("RGBA")
-    return None
-
-
 def _draw_centered_text(draw, box, text, font, fill="black"):
     left, top, right, bottom = box
     try:
@@ -216,7 +248,7 @@ def _draw_text(draw, xy, text, font, fill="black", anchor=None):
         draw.text(xy, text, font=font, fill=fill)
 
 
-def _draw_attendance_sheet_page(page_meta, exam_name, fonts, logo):
+def _draw_attendance_sheet_page(page_meta, exam_name, fonts):
     image = Image.new("RGB", (A4_WIDTH_PX, A4_HEIGHT_PX), "white")
     draw = ImageDraw.Draw(image)
 
@@ -242,12 +274,9 @@ def _draw_attendance_sheet_page(page_meta, exam_name, fonts, logo):
         draw.rectangle(room_box, outline="black", width=2)
         _draw_centered_text(draw, room_box, f"Room {str(page_meta['room_number']).upper()}", bold_38)
 
+    logo = sheet_assets.logo_resized(_mm(24))
     if logo:
-        logo_size = _mm(24)
-        logo_left = content_left + _mm(8)
-        logo_top = top_margin + _mm(2)
-        logo_resized = logo.resize((logo_size, logo_size))
-        image.paste(logo_resized, (logo_left, logo_top), logo_resized)
+        image.paste(logo, (content_left + _mm(8), top_margin + _mm(2)), logo)
 
     header_center_x = (content_left + content_right) // 2
     _draw_text(draw, (header_center_x, top_margin + _mm(6)), "CONTROLLER OF EXAMINATIONS", bold_64, anchor="ma")
@@ -290,11 +319,10 @@ def _draw_attendance_sheet_page(page_meta, exam_name, fonts, logo):
     booklet_width = _mm(32)
     signature_width = table_width - (sl_width + name_width + reg_width + roll_width + booklet_width)
 
-    col_widths = [sl_width, name_width, reg_width, roll_width, booklet_width, signature_width]
-    col_lefts = [content_left]
-    for width in col_widths[:-1]:
-        col_lefts.append(col_lefts[-1] + width)
-    col_rights = [left + width for left, width in zip(col_lefts, col_widths)]
+    col_edges = sheet_assets.column_edges(
+        content_left, (sl_width, name_width, reg_width, roll_width, booklet_width, signature_width)
+    )
+    col_lefts, col_rights = col_edges[:-1], col_edges[1:]
 
     header_height = _mm(8)
     row_height = int((table_bottom - table_top - header_height) / ATTENDANCE_SHEET_STUDENTS_PER_PAGE)
@@ -387,38 +415,24 @@ def _draw_attendance_sheet_page(page_meta, exam_name, fonts, logo):
     return image
 
 
-def _build_attendance_pdf_response(sheets, exam_name):
+def _render_attendance_pdf(sheets, exam_name, output):
+    """Write the attendance sheets PDF into the binary file `output`."""
     if REPORTLAB_AVAILABLE:
-        return _build_attendance_pdf_response_reportlab(sheets, exam_name)
+        return _render_attendance_pdf_reportlab(sheets, exam_name, output)
 
     fonts = {
-        "regular_30": _load_attendance_font(30),
-        "regular_34": _load_attendance_font(34),
-        "regular_36": _load_attendance_font(36),
-        "regular_40": _load_attendance_font(40),
-        "bold_34": _load_attendance_font(34, bold=True),
-        "bold_38": _load_attendance_font(38, bold=True),
-        "bold_42": _load_attendance_font(42, bold=True),
-        "bold_46": _load_attendance_font(46, bold=True),
-        "bold_48": _load_attendance_font(48, bold=True),
-        "bold_54": _load_attendance_font(54, bold=True),
-        "bold_64": _load_attendance_font(64, bold=True),
+        f"{face}_{size}": sheet_assets.font(face, size)
+        for face, sizes in (("regular", (30, 34, 36, 40)), ("bold", (34, 38, 42, 46, 48, 54, 64)))
+        for size in sizes
     }
-    logo = _attendance_logo_image()
-    pages = [_draw_attendance_sheet_page(page, exam_name, fonts, logo).convert("RGB") for page in (sheets or [{}])]
+    # One page raster (about 6 MB at 150 DPI) in memory at a time.
+    writer = RasterPdfWriter(output, resolution=PDF_DPI, title=exam_name)
+    for page in (sheets or [{}]):
+        writer.add_page(_draw_attendance_sheet_page(page, exam_name, fonts).convert("RGB"))
+    writer.close()
 
-    pdf_buffer = BytesIO()
-    first_page, rest_pages = pages[0], pages[1:]
-    first_page.save(pdf_buffer, format="PDF", resolution=PDF_DPI, save_all=True, append_images=rest_pages)
-    pdf_buffer.seek(0)
 
-    filename = f"{_sanitize_download_filename(exam_name)}.pdf"
-    response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
-
-
-def _build_attendance_pdf_response_reportlab(sheets, exam_name):
+def _render_attendance_pdf_reportlab(sheets, exam_name, output):
     page_width, page_height = A4
     left_margin = 18
     right_margin = 18
@@ -428,9 +442,7 @@ def _build_attendance_pdf_response_reportlab(sheets, exam_name):
     row_height = 28
     header_height = 24
 
-    buffer = BytesIO()
-    pdf = reportlab_canvas.Canvas(buffer, pagesize=A4)
-    filename = f"{_sanitize_download_filename(exam_name)}.pdf"
+    pdf = reportlab_canvas.Canvas(output, pagesize=A4)
 
     def draw_center(text, x, y, font_name="Times-Roman", font_size=10):
         pdf.setFont(font_name, font_size)
@@ -456,49 +468,139 @@ def _build_attendance_pdf_response_reportlab(sheets, exam_name):
     def draw_fit_text_left(text, left, right, y, base_font=10, min_font=7):
         if not text:
             return
-        available_width = max(0, right - left)
-        font_size = base_font
-        while font_size > min_font and pdf.stringWidth(text, "Times-Roman", font_size) > available_width:
-            font_size -= 0.5
-        final_text = text
-        if pdf.stringWidth(final_text, "Times-Roman", font_size) > available_width:
-            while final_text and pdf.stringWidth(final_text + "...", "Times-Roman", font_size) > available_width:
-                final_text = final_text[:-1]
-            final_text = (final_text + "...") if final_text else ""
+        final_text, font_size = fit_text(text, right - left, "Times-Roman", base_font, min_font)
         pdf.setFont("Times-Roman", font_size)
         pdf.drawString(left, y, final_text)
 
     def draw_fit_text_center(text, left, right, y, base_font=10, min_font=7):
         if not text:
             return
-        available_width = max(0, right - left)
-        font_size = base_font
-        while font_size > min_font and pdf.stringWidth(text, "Times-Roman", font_size) > available_width:
-            font_size -= 0.5
-        final_text = text
-        if pdf.stringWidth(final_text, "Times-Roman", font_size) > available_width:
-            while final_text and pdf.stringWidth(final_text + "...", "Times-Roman", font_size) > available_width:
-                final_text = final_text[:-1]
-            final_text = (final_text + "...") if final_text else ""
+        final_text, font_size = fit_text(text, right - left, "Times-Roman", base_font, min_font)
         pdf.setFont("Times-Roman", font_size)
         pdf.drawCentredString((left + right) / 2, y, final_text)
 
-    logo = _attendance_logo_image()
-    logo_reader = ImageReader(logo) if (logo and ImageReader) else None
+    logo_size = 74
+    logo_reader = sheet_assets.logo_reader(logo_size)
+
+    sl_width = 24
+    name_width = 148
+    reg_width = 80
+    roll_width = 78
+    booklet_width = 92
+    signature_width = content_width - (sl_width + name_width + reg_width + roll_width + booklet_width)
+    x_positions = sheet_assets.column_edges(
+        left_margin, (sl_width, name_width, reg_width, roll_width, booklet_width, signature_width)
+    )
+    left_box_w = max(
+        pdf.stringWidth("Paper Name", "Times-Roman", 10),
+        pdf.stringWidth("Paper Code", "Times-Roman", 10),
+    ) + 18
+
+    y_top = page_height - top_margin
+    meta_y_top = y_top - 74
+    table_top = meta_y_top - 54
+    table_bottom = table_top - header_height - (ATTENDANCE_SHEET_STUDENTS_PER_PAGE * row_height)
+    header_y = table_top - header_height
+
+    # Everything but the room, the students and the footer text is the same on
+    # every page: draw it once as a form XObject that each page references.
+    pdf.beginForm("attendance_page")
+    pdf.setLineWidth(1)
+    if logo_reader:
+        pdf.drawImage(
+            logo_reader,
+            left_margin + 28,
+            y_top - 66,
+            width=logo_size,
+            height=logo_size,
+            preserveAspectRatio=True,
+            mask='auto',
+        )
+
+    draw_center("CONTROLLER OF EXAMINATIONS", page_width / 2, y_top - 18, "Times-Bold", 17)
+    draw_center("JIS COLLEGE OF ENGINEERING", page_width / 2, y_top - 34, "Times-Bold", 13)
+    draw_center("AN AUTONOMOUS INSTITUTE UNDER MAKAUT, W.B.", page_width / 2, y_top - 46, "Times-Roman", 9)
+    draw_center(f"Attendance Sheet for {exam_name}", page_width / 2, y_top - 66, "Times-Bold", 11)
+
+    box_h = 22
+    right_box_w = 108
+    draw_box(left_margin, meta_y_top - box_h, left_box_w, box_h, "Paper Name", 10)
+    draw_box(left_margin, meta_y_top - (box_h * 2) - 6, left_box_w, box_h, "Paper Code", 10)
+    right_x = page_width - right_margin - right_box_w - 152
+    draw_box(right_x, meta_y_top - box_h, right_box_w, box_h, "Date of Examination", 10)
+    draw_box(right_x, meta_y_top - (box_h * 2) - 6, right_box_w, box_h, "Time", 10)
+
+    pdf.rect(left_margin, table_bottom, content_width, table_top - table_bottom, stroke=1, fill=0)
+    for x in x_positions[1:-1]:
+        pdf.line(x, table_bottom, x, table_top)
+    pdf.line(left_margin, header_y, left_margin + content_width, header_y)
+
+    headers = [
+        "SL.",
+        "NAME OF STUDENT",
+        "UNIVERSITY\nREG. NUMBER",
+        "COLLEGE\nROLL NUMBER",
+        "ANSWER\nBOOKLET NUMBER",
+        "FULL SIGNATURE\nOF STUDENT",
+    ]
+    for idx, header in enumerate(headers):
+        draw_multiline_center_box(
+            header,
+            x_positions[idx],
+            header_y,
+            x_positions[idx + 1],
+            table_top,
+            "Times-Bold",
+            8.8,
+            8,
+        )
+
+    for row_index in range(ATTENDANCE_SHEET_STUDENTS_PER_PAGE):
+        next_y = header_y - ((row_index + 1) * row_height)
+        pdf.line(left_margin, next_y, left_margin + content_width, next_y)
+
+    footer_row_1_y = table_bottom - 18
+    pdf.setFont("Times-Roman", 11)
+    present_box_x = left_margin
+    present_box_y = footer_row_1_y - 10
+    label_box_w = 116
+    count_box_w = 58
+    box_h = 24
+    gap_w = 12
+    pdf.rect(present_box_x, present_box_y, label_box_w, box_h, stroke=1, fill=0)
+    pdf.drawCentredString(present_box_x + (label_box_w / 2), present_box_y + 8, "No of Student Present")
+    pdf.rect(present_box_x + label_box_w + gap_w, present_box_y, count_box_w, box_h, stroke=1, fill=0)
+
+    absent_box_y = present_box_y - 28
+    pdf.rect(present_box_x, absent_box_y, label_box_w, box_h, stroke=1, fill=0)
+    pdf.drawCentredString(present_box_x + (label_box_w / 2), absent_box_y + 8, "No of Student Absent")
+    pdf.rect(present_box_x + label_box_w + gap_w, absent_box_y, count_box_w, box_h, stroke=1, fill=0)
+
+    internal_line_left = page_width - right_margin - 268
+    internal_line_right = page_width - right_margin - 6
+    internal_line_y = footer_row_1_y - 11
+    pdf.line(internal_line_left, internal_line_y, internal_line_right, internal_line_y)
+    draw_line_label("Signature of Examiner (Internal)", (internal_line_left + internal_line_right) / 2, internal_line_y - 12, 10)
+    draw_line_label("Name (in CAPITAL):", ((internal_line_left + internal_line_right) / 2) - 118, internal_line_y - 25, 10)
+
+    footer_row_2_line_y = bottom_margin + 15
+    hod_left = left_margin + 2
+    hod_right = hod_left + 150
+    pdf.line(hod_left, footer_row_2_line_y, hod_right, footer_row_2_line_y)
+    draw_line_label("Signature of HoD", (hod_left + hod_right) / 2, footer_row_2_line_y - 13, 11)
+
+    external_left = page_width - right_margin - 268
+    external_right = page_width - right_margin - 6
+    pdf.line(external_left, footer_row_2_line_y, external_right, footer_row_2_line_y)
+    draw_line_label("Signature of Examiner (External)", (external_left + external_right) / 2, footer_row_2_line_y - 12, 10)
+    draw_line_label("Name (in CAPITAL):", ((external_left + external_right) / 2) - 118, footer_row_2_line_y - 25, 10)
+    pdf.endForm()
 
     for page_meta in (sheets or [{}]):
         pdf.setLineWidth(1)
-        y_top = page_height - top_margin
+        pdf.doForm("attendance_page")
         students = (page_meta.get("students") or [])[:ATTENDANCE_SHEET_STUDENTS_PER_PAGE]
 
-        sl_width = 24
-        name_width = 148
-        reg_width = 80
-        roll_width = 78
-        booklet_width = 92
-        signature_width = content_width - (sl_width + name_width + reg_width + roll_width + booklet_width)
-        col_widths = [sl_width, name_width, reg_width, roll_width, booklet_width, signature_width]
-
         room_number = page_meta.get("room_number")
         if room_number:
             room_w = 100
@@ -508,134 +610,27 @@ def _build_attendance_pdf_response_reportlab(sheets, exam_name):
             pdf.rect(room_x, room_y, room_w, room_h, stroke=1, fill=0)
             draw_center(f"Room {str(room_number).upper()}", room_x + (room_w / 2), room_y + 8, "Times-Bold", 10)
 
-        if logo_reader:
-            logo_size = 74
-            pdf.drawImage(
-                logo_reader,
-                left_margin + 28,
-                y_top - 66,
-                width=logo_size,
-                height=logo_size,
-                preserveAspectRatio=True,
-                mask='auto',
-            )
-
-        draw_center("CONTROLLER OF EXAMINATIONS", page_width / 2, y_top - 18, "Times-Bold", 17)
-        draw_center("JIS COLLEGE OF ENGINEERING", page_width / 2, y_top - 34, "Times-Bold", 13)
-        draw_center("AN AUTONOMOUS INSTITUTE UNDER MAKAUT, W.B.", page_width / 2, y_top - 46, "Times-Roman", 9)
-        draw_center(f"Attendance Sheet for {exam_name}", page_width / 2, y_top - 66, "Times-Bold", 11)
-
-        meta_y_top = y_top - 74
-        box_h = 22
-        left_box_w = max(
-            pdf.stringWidth("Paper Name", "Times-Roman", 10),
-            pdf.stringWidth("Paper Code", "Times-Roman", 10),
-        ) + 18
-        right_box_w = 108
-        draw_box(left_margin, meta_y_top - box_h, left_box_w, box_h, "Paper Name", 10)
-        draw_box(left_margin, meta_y_top - (box_h * 2) - 6, left_box_w, box_h, "Paper Code", 10)
-        right_x = page_width - right_margin - right_box_w - 152
-        draw_box(right_x, meta_y_top - box_h, right_box_w, box_h, "Date of Examination", 10)
-        draw_box(right_x, meta_y_top - (box_h * 2) - 6, right_box_w, box_h, "Time", 10)
-
-        table_top = meta_y_top - 54
-        table_bottom = table_top - header_height - (ATTENDANCE_SHEET_STUDENTS_PER_PAGE * row_height)
-        pdf.rect(left_margin, table_bottom, content_width, table_top - table_bottom, stroke=1, fill=0)
-
-        x_positions = [left_margin]
-        for width in col_widths:
-            x_positions.append(x_positions[-1] + width)
-        for x in x_positions[1:-1]:
-            pdf.line(x, table_bottom, x, table_top)
-
-        header_y = table_top - header_height
-        pdf.line(left_margin, header_y, left_margin + content_width, header_y)
-
-        headers = [
-            "SL.",
-            "NAME OF STUDENT",
-            "UNIVERSITY\nREG. NUMBER",
-            "COLLEGE\nROLL NUMBER",
-            "ANSWER\nBOOKLET NUMBER",
-            "FULL SIGNATURE\nOF STUDENT",
-        ]
-        for idx, header in enumerate(headers):
-            draw_multiline_center_box(
-                header,
-                x_positions[idx],
-                header_y,
-                x_positions[idx + 1],
-                table_top,
-                "Times-Bold",
-                8.8,
-                8,
-            )
-
-        current_y = header_y
-        for row_index in range(ATTENDANCE_SHEET_STUDENTS_PER_PAGE):
-            next_y = current_y - row_height
-            pdf.line(left_margin, next_y, left_margin + content_width, next_y)
-
-            student = students[row_index] if row_index < len(students) else {}
+        for row_index, student in enumerate(students):
             has_student = any((student or {}).get(key) for key in ("name", "registration_number", "roll_number"))
             values = [
                 f"{row_index + 1}." if has_student else "",
                 (student.get("name") or "").upper(),
                 (student.get("registration_number") or "").upper(),
                 (student.get("roll_number") or "").upper(),
-                "",
-                "",
             ]
 
+            cell_mid_y = header_y - ((row_index + 1) * row_height) + 10
             for col_index, value in enumerate(values):
                 if not value:
                     continue
                 cell_left = x_positions[col_index]
                 cell_right = x_positions[col_index + 1]
-                cell_mid_y = next_y + 10
                 if col_index == 1:
                     draw_fit_text_left(value, cell_left + 6, cell_right - 8, cell_mid_y, 10, 6.5)
                 elif col_index == 3:
                     draw_fit_text_center(value, cell_left + 6, cell_right - 6, cell_mid_y, 10, 7)
                 else:
                     draw_fit_text_center(value, cell_left + 4, cell_right - 4, cell_mid_y, 10, 7)
-            current_y = next_y
-
-        footer_row_1_y = table_bottom - 18
-        pdf.setFont("Times-Roman", 11)
-        present_box_x = left_margin
-        present_box_y = footer_row_1_y - 10
-        label_box_w = 116
-        count_box_w = 58
-        box_h = 24
-        gap_w = 12
-        pdf.rect(present_box_x, present_box_y, label_box_w, box_h, stroke=1, fill=0)
-        pdf.drawCentredString(present_box_x + (label_box_w / 2), present_box_y + 8, "No of Student Present")
-        pdf.rect(present_box_x + label_box_w + gap_w, present_box_y, count_box_w, box_h, stroke=1, fill=0)
-
-        absent_box_y = present_box_y - 28
-        pdf.rect(present_box_x, absent_box_y, label_box_w, box_h, stroke=1, fill=0)
-        pdf.drawCentredString(present_box_x + (label_box_w / 2), absent_box_y + 8, "No of Student Absent")
-        pdf.rect(present_box_x + label_box_w + gap_w, absent_box_y, count_box_w, box_h, stroke=1, fill=0)
-
-        internal_line_left = page_width - right_margin - 268
-        internal_line_right = page_width - right_margin - 6
-        internal_line_y = footer_row_1_y - 11
-        pdf.line(internal_line_left, internal_line_y, internal_line_right, internal_line_y)
-        draw_line_label("Signature of Examiner (Internal)", (internal_line_left + internal_line_right) / 2, internal_line_y - 12, 10)
-        draw_line_label("Name (in CAPITAL):", ((internal_line_left + internal_line_right) / 2) - 118, internal_line_y - 25, 10)
-
-        footer_row_2_line_y = bottom_margin + 15
-        hod_left = left_margin + 2
-        hod_right = hod_left + 150
-        pdf.line(hod_left, footer_row_2_line_y, hod_right, footer_row_2_line_y)
-        draw_line_label("Signature of HoD", (hod_left + hod_right) / 2, footer_row_2_line_y - 13, 11)
-
-        external_left = page_width - right_margin - 268
-        external_right = page_width - right_margin - 6
-        pdf.line(external_left, footer_row_2_line_y, external_right, footer_row_2_line_y)
-        draw_line_label("Signature of Examiner (External)", (external_left + external_right) / 2, footer_row_2_line_y - 12, 10)
-        draw_line_label("Name (in CAPITAL):", ((external_left + external_right) / 2) - 118, footer_row_2_line_y - 25, 10)
 
         footer_label = page_meta.get("footer_label") or (
             f"{str(page_meta.get('branch', '')).upper()}_Sem {page_meta.get('semester', '')}".strip("_ ").strip()
@@ -648,33 +643,28 @@ def _build_attendance_pdf_response_reportlab(sheets, exam_name):
         pdf.showPage()
 
     pdf.save()
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
 
 
-def _build_marks_pdf_response(sheets, exam_name):
+def _render_marks_pdf(sheets, exam_name, output):
+    """Write the marks sheets PDF into the binary file `output`."""
     if REPORTLAB_AVAILABLE:
-        return _build_marks_pdf_response_reportlab(sheets, exam_name)
-    return _build_attendance_pdf_response(sheets, exam_name)
+        return _render_marks_pdf_reportlab(sheets, exam_name, output)
+    return _render_attendance_pdf(sheets, exam_name, output)
 
 
-def _build_marks_pdf_response_reportlab(sheets, exam_name):
+def _render_marks_pdf_reportlab(sheets, exam_name, output):
     page_width, page_height = A4
     left_margin = 18
     right_margin = 18
     top_margin = 12
     bottom_margin = 18
     content_width = page_width - left_margin - right_margin
-    col_widths = [22, 120, 95, 82, 100]
-    col_widths.append(content_width - sum(col_widths))
+    col_widths = (22, 120, 95, 82, 100)
+    x_positions = sheet_assets.column_edges(left_margin, col_widths + (content_width - sum(col_widths),))
     row_height = 28
     header_height = 28
 
-    buffer = BytesIO()
-    pdf = reportlab_canvas.Canvas(buffer, pagesize=A4)
-    filename = f"{_sanitize_download_filename(exam_name)}.pdf"
+    pdf = reportlab_canvas.Canvas(output, pagesize=A4)
 
     def draw_center(text, x, y, font_name="Times-Roman", font_size=10):
         pdf.setFont(font_name, font_size)
@@ -687,133 +677,130 @@ def _build_marks_pdf_response_reportlab(sheets, exam_name):
     def draw_line_label(text, x_center, y_base, font_size=8):
         draw_center(text, x_center, y_base, "Times-Roman", font_size)
 
-    logo = _attendance_logo_image()
-    logo_reader = ImageReader(logo) if (logo and ImageReader) else None
+    logo_size = 74
+    logo_reader = sheet_assets.logo_reader(logo_size)
+
+    y_top = page_height - top_margin
+    meta_y_top = y_top - 74
+    table_top = meta_y_top - 54
+    table_bottom = table_top - header_height - (MARKS_SHEET_STUDENTS_PER_PAGE * row_height)
+    header_y = table_top - header_height
+
+    # The page skeleton is drawn once as a form XObject; pages add only the students and the footer text.
+    pdf.beginForm("marks_page")
+    pdf.setLineWidth(1)
+    if logo_reader:
+        pdf.drawImage(
+            logo_reader,
+            left_margin + 28,
+            y_top - 66,
+            width=logo_size,
+            height=logo_size,
+            preserveAspectRatio=True,
+            mask='auto',
+        )
+
+    draw_center("CONTROLLER OF EXAMINATIONS", page_width / 2, y_top - 18, "Times-Bold", 17)
+    draw_center("JIS COLLEGE OF ENGINEERING", page_width / 2, y_top - 34, "Times-Bold", 13)
+    draw_center("AN AUTONOMOUS INSTITUTE UNDER MAKAUT, W.B.", page_width / 2, y_top - 46, "Times-Roman", 9)
+    draw_center(f"Marks Sheet for {exam_name}", page_width / 2, y_top - 66, "Times-Bold", 11)
+
+    box_h = 22
+    left_box_w = 92
+    right_box_w = 108
+    draw_box(left_margin, meta_y_top - box_h, left_box_w, box_h, "Paper Name", 10)
+    draw_box(left_margin, meta_y_top - (box_h * 2) - 6, left_box_w, box_h, "Paper Code", 10)
+    right_x = page_width - right_margin - right_box_w - 152
+    draw_box(right_x, meta_y_top - box_h, right_box_w, box_h, "Date of Examination", 10)
+    draw_box(right_x, meta_y_top - (box_h * 2) - 6, right_box_w, box_h, "Time", 10)
+
+    pdf.rect(left_margin, table_bottom, content_width, table_top - table_bottom, stroke=1, fill=0)
+    for x in x_positions[1:-1]:
+        pdf.line(x, table_bottom, x, table_top)
+    pdf.line(left_margin, header_y, left_margin + content_width, header_y)
+
+    headers = [
+        "SL.",
+        "STUDENT NAME",
+        "UNIVERSITY REG.\nNUMBER",
+        "COLLEGE ROLL\nNUMBER",
+        "INTERNAL MARKS",
+        "EXTERNAL MARKS",
+    ]
+    for idx, header in enumerate(headers):
+        center_x = (x_positions[idx] + x_positions[idx + 1]) / 2
+        lines = header.split("\n")
+        if len(lines) == 1:
+            draw_center(lines[0], center_x, table_top - 19, "Times-Bold", 8)
+        else:
+            draw_center(lines[0], center_x, table_top - 15, "Times-Bold", 8)
+            draw_center(lines[1], center_x, table_top - 23, "Times-Bold", 8)
+
+    for row_index in range(MARKS_SHEET_STUDENTS_PER_PAGE):
+        next_y = header_y - ((row_index + 1) * row_height)
+        pdf.line(left_margin, next_y, left_margin + content_width, next_y)
+
+    footer_row_1_y = table_bottom - 18
+    pdf.setFont("Times-Roman", 11)
+    present_box_x = left_margin
+    present_box_y = footer_row_1_y - 10
+    label_box_w = 116
+    count_box_w = 58
+    box_h = 24
+    gap_w = 12
+    pdf.rect(present_box_x, present_box_y, label_box_w, box_h, stroke=1, fill=0)
+    pdf.drawCentredString(present_box_x + (label_box_w / 2), present_box_y + 8, "No of Student Present")
+    pdf.rect(present_box_x + label_box_w + gap_w, present_box_y, count_box_w, box_h, stroke=1, fill=0)
+    absent_box_y = present_box_y - 28
+    pdf.rect(present_box_x, absent_box_y, label_box_w, box_h, stroke=1, fill=0)
+    pdf.drawCentredString(present_box_x + (label_box_w / 2), absent_box_y + 8, "No of Student Absent")
+    pdf.rect(present_box_x + label_box_w + gap_w, absent_box_y, count_box_w, box_h, stroke=1, fill=0)
+
+    internal_line_left = page_width - right_margin - 268
+    internal_line_right = page_width - right_margin - 6
+    internal_line_y = footer_row_1_y - 1
+    pdf.line(internal_line_left, internal_line_y, internal_line_right, internal_line_y)
+    draw_line_label("Signature of Examiner (Internal)", (internal_line_left + internal_line_right) / 2, internal_line_y - 12, 10)
+    draw_line_label("Name (in CAPITAL):", ((internal_line_left + internal_line_right) / 2) - 118, internal_line_y - 25, 10)
+
+    footer_row_2_line_y = bottom_margin + 15
+    hod_left = left_margin + 2
+    hod_right = hod_left + 150
+    pdf.line(hod_left, footer_row_2_line_y, hod_right, footer_row_2_line_y)
+    draw_line_label("Signature of HoD", (hod_left + hod_right) / 2, footer_row_2_line_y - 13, 11)
+
+    external_left = page_width - right_margin - 268
+    external_right = page_width - right_margin - 6
+    pdf.line(external_left, footer_row_2_line_y, external_right, footer_row_2_line_y)
+    draw_line_label("Signature of Examiner (External)", (external_left + external_right) / 2, footer_row_2_line_y - 12, 10)
+    draw_line_label("Name (in CAPITAL):", ((external_left + external_right) / 2) - 118, footer_row_2_line_y - 25, 10)
+    pdf.endForm()
 
     for page_meta in (sheets or [{}]):
         pdf.setLineWidth(1)
-        y_top = page_height - top_margin
-
-        if logo_reader:
-            logo_size = 74
-            pdf.drawImage(
-                logo_reader,
-                left_margin + 28,
-                y_top - 66,
-                width=logo_size,
-                height=logo_size,
-                preserveAspectRatio=True,
-                mask='auto',
-            )
-
-        draw_center("CONTROLLER OF EXAMINATIONS", page_width / 2, y_top - 18, "Times-Bold", 17)
-        draw_center("JIS COLLEGE OF ENGINEERING", page_width / 2, y_top - 34, "Times-Bold", 13)
-        draw_center("AN AUTONOMOUS INSTITUTE UNDER MAKAUT, W.B.", page_width / 2, y_top - 46, "Times-Roman", 9)
-        draw_center(f"Marks Sheet for {exam_name}", page_width / 2, y_top - 66, "Times-Bold", 11)
-
-        meta_y_top = y_top - 74
-        box_h = 22
-        left_box_w = 92
-        right_box_w = 108
-        draw_box(left_margin, meta_y_top - box_h, left_box_w, box_h, "Paper Name", 10)
-        draw_box(left_margin, meta_y_top - (box_h * 2) - 6, left_box_w, box_h, "Paper Code", 10)
-        right_x = page_width - right_margin - right_box_w - 152
-        draw_box(right_x, meta_y_top - box_h, right_box_w, box_h, "Date of Examination", 10)
-        draw_box(right_x, meta_y_top - (box_h * 2) - 6, right_box_w, box_h, "Time", 10)
-
-        table_top = meta_y_top - 54
-        table_bottom = table_top - header_height - (MARKS_SHEET_STUDENTS_PER_PAGE * row_height)
-        pdf.rect(left_margin, table_bottom, content_width, table_top - table_bottom, stroke=1, fill=0)
-
-        x_positions = [left_margin]
-        for width in col_widths:
-            x_positions.append(x_positions[-1] + width)
-        for x in x_positions[1:-1]:
-            pdf.line(x, table_bottom, x, table_top)
-
-        header_y = table_top - header_height
-        pdf.line(left_margin, header_y, left_margin + content_width, header_y)
-
-        headers = [
-            "SL.",
-            "STUDENT NAME",
-            "UNIVERSITY REG.\nNUMBER",
-            "COLLEGE ROLL\nNUMBER",
-            "INTERNAL MARKS",
-            "EXTERNAL MARKS",
-        ]
-        for idx, header in enumerate(headers):
-            center_x = (x_positions[idx] + x_positions[idx + 1]) / 2
-            lines = header.split("\n")
-            if len(lines) == 1:
-                draw_center(lines[0], center_x, table_top - 19, "Times-Bold", 8)
-            else:
-                draw_center(lines[0], center_x, table_top - 15, "Times-Bold", 8)
-                draw_center(lines[1], center_x, table_top - 23, "Times-Bold", 8)
+        pdf.doForm("marks_page")
 
         students = (page_meta.get("students") or [])[:MARKS_SHEET_STUDENTS_PER_PAGE]
-        current_y = header_y
-        for row_index in range(MARKS_SHEET_STUDENTS_PER_PAGE):
-            next_y = current_y - row_height
-            pdf.line(left_margin, next_y, left_margin + content_width, next_y)
-
-            student = students[row_index] if row_index < len(students) else {}
+        for row_index, student in enumerate(students):
             has_student = any((student or {}).get(key) for key in ("name", "registration_number", "roll_number"))
             values = [
                 f"{row_index + 1}." if has_student else "",
                 (student.get("name") or "").upper(),
                 (student.get("registration_number") or "").upper(),
                 (student.get("roll_number") or "").upper(),
-                "",
-                "",
             ]
+            cell_mid_y = header_y - ((row_index + 1) * row_height) + 10
             for col_index, value in enumerate(values):
                 if not value:
                     continue
                 cell_left = x_positions[col_index]
                 cell_right = x_positions[col_index + 1]
-                cell_mid_y = next_y + 10
+                text, _ = fit_text(value, cell_right - cell_left - 8, "Times-Roman", 8)
                 pdf.setFont("Times-Roman", 8)
                 if col_index == 1:
-                    pdf.drawString(cell_left + 4, cell_mid_y, value[:24])
+                    pdf.drawString(cell_left + 4, cell_mid_y, text)
                 else:
-                    pdf.drawCentredString((cell_left + cell_right) / 2, cell_mid_y, value[:24])
-            current_y = next_y
-
-        footer_row_1_y = table_bottom - 18
-        pdf.setFont("Times-Roman", 11)
-        present_box_x = left_margin
-        present_box_y = footer_row_1_y - 10
-        label_box_w = 116
-        count_box_w = 58
-        box_h = 24
-        gap_w = 12
-        pdf.rect(present_box_x, present_box_y, label_box_w, box_h, stroke=1, fill=0)
-        pdf.drawCentredString(present_box_x + (label_box_w / 2), present_box_y + 8, "No of Student Present")
-        pdf.rect(present_box_x + label_box_w + gap_w, present_box_y, count_box_w, box_h, stroke=1, fill=0)
-        absent_box_y = present_box_y - 28
-        pdf.rect(present_box_x, absent_box_y, label_box_w, box_h, stroke=1, fill=0)
-        pdf.drawCentredString(present_box_x + (label_box_w / 2), absent_box_y + 8, "No of Student Absent")
-        pdf.rect(present_box_x + label_box_w + gap_w, absent_box_y, count_box_w, box_h, stroke=1, fill=0)
-
-        internal_line_left = page_width - right_margin - 268
-        internal_line_right = page_width - right_margin - 6
-        internal_line_y = footer_row_1_y - 1
-        pdf.line(internal_line_left, internal_line_y, internal_line_right, internal_line_y)
-        draw_line_label("Signature of Examiner (Internal)", (internal_line_left + internal_line_right) / 2, internal_line_y - 12, 10)
-        draw_line_label("Name (in CAPITAL):", ((internal_line_left + internal_line_right) / 2) - 118, internal_line_y - 25, 10)
-
-        footer_row_2_line_y = bottom_margin + 15
-        hod_left = left_margin + 2
-        hod_right = hod_left + 150
-        pdf.line(hod_left, footer_row_2_line_y, hod_right, footer_row_2_line_y)
-        draw_line_label("Signature of HoD", (hod_left + hod_right) / 2, footer_row_2_line_y - 13, 11)
-
-        external_left = page_width - right_margin - 268
-        external_right = page_width - right_margin - 6
-        pdf.line(external_left, footer_row_2_line_y, external_right, footer_row_2_line_y)
-        draw_line_label("Signature of Examiner (External)", (external_left + external_right) / 2, footer_row_2_line_y - 12, 10)
-        draw_line_label("Name (in CAPITAL):", ((external_left + external_right) / 2) - 118, footer_row_2_line_y - 25, 10)
+                    pdf.drawCentredString((cell_left + cell_right) / 2, cell_mid_y, text)
 
         footer_label = page_meta.get("footer_label") or (
             f"{str(page_meta.get('branch', '')).upper()}_Sem {page_meta.get('semester', '')}".strip("_ ").strip()
@@ -825,9 +812,77 @@ def _build_marks_pdf_response_reportlab(sheets, exam_name):
         pdf.showPage()
 
     pdf.save()
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+
+def _byte_range(request, size, etag):
+    """
+    The `(start, end)` (inclusive) of a single `Range: bytes=...` request
+    against a `size`-byte body, None to send the whole body (no usable Range,
+    or an If-Range for another version), or False when unsatisfiable.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", request.headers.get('Range', '').strip())
+    if not match or not any(match.groups()):
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_file_range(handle, start, length, chunk_size=FileResponse.block_size):
+    with handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _cached_pdf_response(request, kind, data, render, filename):
+    """
+    Serve the PDF of `kind` drawn from `data` through the PDF cache (see
+    core.pdf_cache), calling `render(output)` to write it only on a miss.
+    The file is streamed from disk, and a `Range` request (a resumed
+    download) gets just the bytes it asks for.
+    """
+    renderer = "reportlab" if REPORTLAB_AVAILABLE else "pillow"
+    key = pdf_cache_key(kind, [PDF_TEMPLATE_VERSIONS[kind], renderer], data)
+    etag = f'"{kind}-{key[:40]}"'
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    handle, hit = open_cached_pdf(key, render)
+    logger.debug(f"{kind} PDF cache {'hit' if hit else 'miss'}: {key[:12]}")
+    stat = os.fstat(handle.fileno())
+    byte_range = _byte_range(request, stat.st_size, etag)
+    if byte_range is False:
+        handle.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{stat.st_size}"
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_file_range(handle, start, end - start + 1), status=206, content_type="application/pdf"
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    else:
+        response = FileResponse(handle, as_attachment=True, filename=filename, content_type="application/pdf")
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = 'private, no-cache'
     return response
 
 
@@ -838,132 +893,170 @@ def _get_client_ip(request):
     return request.META.get('REMOTE_ADDR')
 
 
-def _read_student_dataframe(uploaded_file):
-    """Parse a CSV/XLS/XLSX student upload into a dataframe."""
-    print(f"[DEBUG] Reading file: {uploaded_file.name}")
-    try:
-        df = pd.read_csv(uploaded_file, dtype=str)
-        print(f"[DEBUG] Parsed as CSV (default engine), shape: {df.shape}")
-    except Exception as csv_err:
-        print(f"[DEBUG] CSV parse error {csv_err}, trying python engine")
-        try:
-            uploaded_file.seek(0)
-            df = pd.read_csv(uploaded_file, dtype=str, on_bad_lines='skip', engine='python')
-            print(f"[DEBUG] Parsed as CSV (python engine), shape: {df.shape}")
-        except Exception as csv_err2:
-            print(f"[DEBUG] second CSV attempt failed {csv_err2}, falling back to Excel")
-            try:
-                uploaded_file.seek(0)
-                xls = pd.ExcelFile(uploaded_file, engine='openpyxl')
-                sheets = xls.sheet_names
-                print(f"[DEBUG] Excel contains sheets: {sheets}")
-                df_list = []
-                for sn in sheets:
-                    part = pd.read_excel(xls, sheet_name=sn, dtype=str)
-                    print(f"[DEBUG] sheet {sn} shape {part.shape}")
-                    df_list.append(part)
-                df = pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
-                print(f"[DEBUG] Combined Excel shape: {df.shape}")
-            except Exception as excel_err:
-                print(f"[DEBUG] multi-sheet Excel failed {excel_err}, single-sheet read")
-                uploaded_file.seek(0)
-                df = pd.read_excel(uploaded_file, dtype=str, engine='openpyxl')
-                print(f"[DEBUG] Parsed as Excel single sheet, shape: {df.shape}")
-    return df
-
-
-def _extract_student_records_from_dataframe(df):
-    df = df.dropna(how='all').reset_index(drop=True)
-    if df.empty:
-        raise ValueError("File is empty. Please check your file.")
-
-    df.columns = df.columns.str.strip().str.lower()
-    print(f"[DEBUG] Columns: {list(df.columns)}")
-    print(f"[DEBUG] Total rows: {len(df)}")
-
-    avail = set(df.columns)
-    has_roll = any(c in avail for c in ['rollno', 'roll_no', 'roll number', 'roll no'])
-    has_reg = any(c in avail for c in ['reg no', 'registration number', 'reg_no'])
-    has_std_id = any(c in avail for c in ['std id', 'student id', 'student_id'])
-    if not (has_roll and has_reg and has_std_id):
-        raise ValueError("File missing required columns: ROLL NO, REG NO, STD ID")
-
-    col_map = {
-        "course": ["course"],
-        "semester": ["sem", "semester"],
-        "branch": ["branch"],
-        "room_number": ["room number", "room_number", "room no", "roomno"],
-        "name": ["student name", "name"],
-        "roll_number": ["rollno", "roll_no", "roll number", "roll no"],
-        "registration_number": ["reg no", "registration number", "reg_no"],
-        "student_id": ["std id", "student id", "student_id"],
-        "academic_status": ["academic_status", "academic status", "status"],
-    }
-
-    def get_value(row, keys, default=""):
-        for key in keys:
-            if key in row and pd.notna(row[key]):
-                return str(row[key]).strip()
-        return default
+def _create_student_file_with_students(file_name, student_records, resolver=None, content_hash="", exam=None):
+    """Persist already-parsed records (e.g. a wizard upload kept in the session)
+    as a new file owned by `exam`. Branches are resolved to canonical
+    departments by the writer; pass a `DepartmentResolver` to read back
+    `resolver.registered` afterwards."""
+    resolver = resolver or DepartmentResolver()
 
-    records = df.to_dict(orient='records')
-    students = []
-    skipped = 0
+    with transaction.atomic():
+        student_file_obj = StudentDataFile.objects.create(
+            file_name=file_name,
+            content_hash=content_hash,
+            exam=exam,
+        )
+        logger.debug(f"StudentDataFile created id={student_file_obj.id}")
+        if len(student_records):
+            frame = pd.DataFrame(student_records).reindex(columns=STUDENT_FIELDS).fillna("")
+            StudentFileWriter(student_file_obj, resolver)(frame)
+        refresh_student_file_stats([student_file_obj.id])
+        student_file_obj.refresh_from_db(fields=["row_count", "department_summary"])
 
-    for row in records:
-        roll = get_value(row, col_map["roll_number"])
-        reg = get_value(row, col_map["registration_number"])
-        std_id = get_value(row, col_map["student_id"])
+    return student_file_obj
 
-        if not roll or not reg or not std_id:
-            skipped += 1
-            continue
 
-        students.append({
-            "roll_number": roll,
-            "registration_number": reg,
-            "student_id": std_id,
-            "course": get_value(row, col_map["course"]),
-            "semester": get_value(row, col_map["semester"]),
-            "branch": get_value(row, col_map["branch"]),
-            "room_number": get_value(row, col_map["room_number"]),
-            "name": get_value(row, col_map["name"]),
-            "academic_status": get_value(row, col_map["academic_status"]),
-        })
+def _ingest_student_file(uploaded_file, resolver, exam=None):
+    """Stream an upload chunk by chunk into a new StudentDataFile owned by
+    `exam` (None for dashboard uploads).
 
-    return {
-        "records": students,
-        "total": len(records),
-        "inserted": len(students),
-        "skipped": skipped,
-    }
+    Every upload gets its own file, so edits to one never reach the exams
+    of another; bytes parsed before are replayed from the parsed cache
+    instead of being read again. Returns `(student_file, ingestor)`;
+    `student_file` is None (and nothing is kept) when the upload has no
+    valid rows."""
+    content_hash = upload_content_hash(uploaded_file)
 
+    with transaction.atomic():
+        student_file = StudentDataFile.objects.create(
+            file_name=uploaded_file.name, content_hash=content_hash, exam=exam
+        )
+        writer = StudentFileWriter(student_file, resolver)
+        cached = load_parsed_upload(content_hash)
+        if cached is not None:
+            ingestor = StudentIngestor(writer).replay(cached, load_parsed_rejects(content_hash))
+        else:
+            cache_writer = ParsedUploadCacheWriter.for_hash(content_hash)
+            ingestor = StudentIngestor(writer, cache_writer=cache_writer).run(uploaded_file)
+        logger.debug(f"{uploaded_file.name}: total rows {ingestor.total}, inserted {ingestor.inserted}, skipped {ingestor.skipped}")
+        if not ingestor.inserted:
+            transaction.set_rollback(True)
+            student_file = None
+        else:
+            refresh_student_file_stats([student_file.id])
+            student_file.refresh_from_db(fields=["row_count", "department_summary"])
+    return student_file, ingestor
+
+
+def _copy_student_file(student_file, exam):
+    """Copy `student_file` and its students into a new file owned by `exam`,
+    and move the exam's sheets over to the copy. The exam's ExamStudent rows
+    for the original are dropped; the caller merges the copy in their place."""
+    copy = StudentDataFile.objects.create(
+        file_name=student_file.file_name,
+        content_hash=student_file.content_hash,
+        exam=exam,
+        row_count=student_file.row_count,
+        department_summary=student_file.department_summary,
+    )
 
-def _create_student_file_with_students(file_name, student_records):
-    student_file_obj = StudentDataFile.objects.create(file_name=file_name)
-    print(f"[DEBUG] StudentDataFile created id={student_file_obj.id}")
-
-    objects_to_create = [
-        Student(
-            student_file=student_file_obj,
-            roll_number=row["roll_number"],
-            registration_number=row["registration_number"],
-            student_id=row["student_id"],
-            course=row.get("course", ""),
-            semester=row.get("semester", ""),
-            branch=row.get("branch", ""),
-            room_number=row.get("room_number", ""),
-            name=row.get("name", ""),
-            academic_status=row.get("academic_status", ""),
+    qn = connection.ops.quote_name
+    columns = ", ".join(
+        qn(field.column) for field in Student._meta.concrete_fields
+        if not field.primary_key and field.name != 'student_file'
+    )
+    student_table = qn(Student._meta.db_table)
+    file_column = qn(Student._meta.get_field('student_file').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {student_table} ({columns}, {file_column}) "
+            f"SELECT {columns}, %s FROM {student_table} WHERE {file_column} = %s ORDER BY id",
+            [copy.id, student_file.id],
         )
-        for row in student_records
-    ]
+
+    ExamStudent.objects.filter(exam=exam, student_file=student_file).delete()
+    for model in (AttendanceSheet, MarksSheet):
+        model.objects.filter(exam=exam, student_file=student_file).update(student_file=copy)
+    return copy
+
+
+def _student_file_exam_ids(student_file):
+    """Ids of the live exams whose students, attendance or marks sheets come from `student_file`."""
+    exam_ids = set()
+    for model in (ExamStudent, AttendanceSheet, MarksSheet):
+        exam_ids.update(model.objects.filter(student_file=student_file).values_list('exam_id', flat=True).distinct())
+    return set(Exam.objects.filter(id__in=exam_ids).values_list('id', flat=True))
+
+
+def _replace_student_file(student_file, uploaded_file, resolver, exam):
+    """Apply a re-uploaded version of `student_file` for `exam`, as a diff.
+
+    The file is changed in place only when `exam` uploaded it and no other
+    exam uses it; otherwise (a dashboard file, or one shared with other
+    exams) the exam gets its own copy first and only the copy is changed.
+    Students matched by registration number keep their ids, so ExamStudent
+    links (and the exams' merges) survive; only changed rows are written.
+    New students are merged into the exam.
+    Returns `(diff, ingestor, file)`, `file` being the one now holding the
+    exam's students; `diff` is None when the upload has no valid rows."""
+    content_hash = upload_content_hash(uploaded_file)
+    if content_hash == student_file.content_hash:
+        ingestor = StudentIngestor.for_existing_file(student_file)
+        return {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": student_file.row_count}, ingestor, student_file
+
+    collector = StudentFrameCollector()
+    cached = load_parsed_upload(content_hash)
+    if cached is not None:
+        ingestor = StudentIngestor(collector).replay(cached, load_parsed_rejects(content_hash))
+    else:
+        cache_writer = ParsedUploadCacheWriter.for_hash(content_hash)
+        ingestor = StudentIngestor(collector, cache_writer=cache_writer).run(uploaded_file)
+    if not ingestor.inserted:
+        return None, ingestor, student_file
 
     with transaction.atomic():
-        if objects_to_create:
-            Student.objects.bulk_create(objects_to_create, batch_size=500)
+        copied = False
+        if student_file.exam_id != exam.id or _student_file_exam_ids(student_file) - {exam.id}:
+            merged = ExamStudent.objects.filter(exam=exam, student_file=student_file).exists()
+            student_file = _copy_student_file(student_file, exam)
+            copied = True
+        invalidate_exam_summaries(
+            ExamStudent.objects.filter(student_file=student_file).values_list('exam_id', flat=True)
+        )
+        diff = apply_student_file_diff(student_file, collector.frame(), resolver)
+        student_file.file_name = uploaded_file.name
+        student_file.content_hash = content_hash
+        student_file.save(update_fields=["file_name", "content_hash"])
+        refresh_student_file_stats([student_file.id])
+
+        if copied:
+            if merged:
+                _merge_exam_students(exam, [student_file.id])
+            invalidate_exam_summaries([exam.id])
+        elif diff["inserted"]:
+            for linked_exam in Exam.objects.filter(exam_students__student_file=student_file).distinct():
+                _merge_exam_students(linked_exam, [student_file.id])
+
+    logger.debug(f"replaced file id={student_file.id}: {diff}")
+    return diff, ingestor, student_file
+
+
+def _mark_student_files_edited(file_ids):
+    """Edited files no longer match their uploaded bytes, so stop deduplicating against them."""
+    StudentDataFile.objects.filter(id__in=file_ids).exclude(content_hash="").update(content_hash="")
 
-    return student_file_obj
+
+def _remember_error_report(request, ingestor):
+    """Save the ingestor's rejected rows and return a download URL scoped to this session."""
+    from django.urls import reverse
+
+    token = save_error_report(ingestor)
+    if not token:
+        return None
+    tokens = request.session.get("upload_error_reports", [])[-9:] + [token]
+    request.session["upload_error_reports"] = tokens
+    request.session.modified = True
+    return reverse('download_upload_error_report') + f'?report={token}'
 
 
 def _get_temp_attendance_uploads(request):
@@ -989,7 +1082,17 @@ def _get_temp_attendance_upload(request, exam_id):
     return _get_temp_attendance_uploads(request).get(str(exam_id))
 
 
+def _temp_upload_student_records(temp_upload):
+    """Rows of a wizard upload: kept in the session, or read back from the parsed cache.
 
+    Raises ValueError when the cached rows have expired, so callers ask for a
+    re-upload instead of working with an empty student list."""
+    if temp_upload.get("students") or temp_upload.get("inserted") == 0:
+        return temp_upload.get("students", [])
+    frame = load_parsed_upload(temp_upload.get("content_hash"))
+    if frame is None:
+        raise ValueError("The uploaded student file has expired. Please upload it again.")
+    return frame.to_dict(orient="records")
 
 
 def ensure_default_admin():
@@ -1073,6 +1176,7 @@ def admin_login(request):
 @admin_required
 def dashboard(request):
     uploaded_files = StudentDataFile.objects.all().order_by('-uploaded_at')
+    upload_error_report_url = request.session.pop('last_upload_error_report', None)
     years = range(2020, 2036)
     eligible_emails = EligibleAdminEmail.objects.all().order_by('-added_at')
 
@@ -1087,6 +1191,7 @@ def dashboard(request):
         'eligible_emails': eligible_emails,
         'qr_url': qr_url,
         'student_portal_url': student_portal_url,
+        'upload_error_report_url': upload_error_report_url,
     })
 
 
@@ -1386,20 +1491,15 @@ def upload_student_data(request):
                 messages.error(request, "No file uploaded")
                 return redirect(reverse('dashboard') + '?tab=upload-data')
 
-            max_size = 10 * 1024 * 1024
-            if uploaded_file.size > max_size:
-                messages.error(request, "File size too large. Maximum allowed is 10MB.")
-                return redirect(reverse('dashboard') + '?tab=upload-data')
-
-            df = _read_student_dataframe(uploaded_file)
-            parse_result = _extract_student_records_from_dataframe(df)
-            total = parse_result["total"]
-            inserted = parse_result["inserted"]
-            skipped = parse_result["skipped"]
-
-            _create_student_file_with_students(uploaded_file.name, parse_result["records"])
+            resolver = DepartmentResolver()
+            student_file, ingestor = _ingest_student_file(uploaded_file, resolver)
+            total = ingestor.total
+            inserted = ingestor.inserted
+            skipped = ingestor.skipped
 
-            print(f"[DEBUG] total rows {total}, inserted {inserted}, skipped {skipped}")
+            report_url = _remember_error_report(request, ingestor)
+            if report_url:
+                request.session["last_upload_error_report"] = report_url
 
             # prepare user feedback
             if inserted == 0 and skipped:
@@ -1411,9 +1511,18 @@ def upload_student_data(request):
                 if skipped:
                     msg += f" ({skipped} skipped)"
                 messages.success(request, msg)
+            if resolver.registered:
+                messages.warning(
+                    request,
+                    "New department names registered: " + ", ".join(resolver.registered)
+                    + ". If any of these should match an existing department, add it as an alias."
+                )
 
             return redirect(reverse('dashboard') + '?tab=upload-data')
 
+        except ValueError as ve:
+            messages.error(request, str(ve))
+            return redirect(reverse('dashboard') + '?tab=upload-data')
         except IntegrityError as ie:
             logger.error(f"upload_student_data integrity error: {ie}")
             messages.error(request, "Database integrity error during upload. Please ensure the file has no duplicate rows.")
@@ -1456,19 +1565,26 @@ def upload_attendance_wizard_file(request):
         if not uploaded_file:
             return JsonResponse({"status": "error", "message": "No file uploaded"}, status=400)
 
-        max_size = 10 * 1024 * 1024
-        if uploaded_file.size > max_size:
-            return JsonResponse({"status": "error", "message": "File size too large. Maximum allowed is 10MB."}, status=400)
-
-        df = _read_student_dataframe(uploaded_file)
-        parse_result = _extract_student_records_from_dataframe(df)
+        # With the parsed cache available the session only keeps the content
+        # hash; the rows are read back from disk when sheets are generated.
+        content_hash = upload_content_hash(uploaded_file)
+        collector = StudentRecordCollector()
+        cached = load_parsed_upload(content_hash)
+        if cached is not None:
+            ingestor = StudentIngestor(lambda frame: None).replay(cached, load_parsed_rejects(content_hash))
+        else:
+            cache_writer = ParsedUploadCacheWriter.for_hash(content_hash)
+            sink = collector if cache_writer is None else (lambda frame: None)
+            ingestor = StudentIngestor(sink, cache_writer=cache_writer).run(uploaded_file)
+        report_url = _remember_error_report(request, ingestor)
 
         _set_temp_attendance_upload(request, exam.id, {
             "file_name": uploaded_file.name,
-            "students": parse_result["records"],
-            "total": parse_result["total"],
-            "inserted": parse_result["inserted"],
-            "skipped": parse_result["skipped"],
+            "content_hash": content_hash,
+            "students": collector.records,
+            "total": ingestor.total,
+            "inserted": ingestor.inserted,
+            "skipped": ingestor.skipped,
             "uploaded_at": timezone.now().strftime('%Y-%m-%d %H:%M'),
         })
 
@@ -1476,10 +1592,11 @@ def upload_attendance_wizard_file(request):
             "status": "success",
             "file": {
                 "file_name": uploaded_file.name,
-                "student_count": parse_result["inserted"],
+                "student_count": ingestor.inserted,
                 "uploaded_at": timezone.now().strftime('%Y-%m-%d %H:%M'),
-                "total": parse_result["total"],
-                "skipped": parse_result["skipped"],
+                "total": ingestor.total,
+                "skipped": ingestor.skipped,
+                "error_report_url": report_url,
             }
         })
     except Exam.DoesNotExist:
@@ -1507,36 +1624,41 @@ def upload_exam_student_file(request):
         if not uploaded_file:
             return JsonResponse({"status": "error", "message": "No file uploaded"}, status=400)
 
-        max_size = 10 * 1024 * 1024
-        if uploaded_file.size > max_size:
-            return JsonResponse({"status": "error", "message": "File size too large. Maximum allowed is 10MB."}, status=400)
+        resolver = DepartmentResolver()
+        replace_file_id = request.POST.get("replace_file_id")
+        replace_target = None
+        if replace_file_id and str(replace_file_id).isdigit():
+            replace_target = StudentDataFile.objects.filter(id=int(replace_file_id)).first()
 
-        df = _read_student_dataframe(uploaded_file)
-        parse_result = _extract_student_records_from_dataframe(df)
+        diff = None
+        if replace_target is not None:
+            diff, ingestor, new_file = _replace_student_file(replace_target, uploaded_file, resolver, exam)
+            if diff is None:
+                new_file = None
+        else:
+            new_file, ingestor = _ingest_student_file(uploaded_file, resolver, exam=exam)
+        report_url = _remember_error_report(request, ingestor)
 
-        if parse_result["inserted"] == 0:
+        if new_file is None:
             return JsonResponse({
                 "status": "error",
-                "message": "No valid student rows found in the uploaded file."
+                "message": "No valid student rows found in the uploaded file.",
+                "error_report_url": report_url,
             }, status=400)
 
-        new_file = _create_student_file_with_students(uploaded_file.name, parse_result["records"])
-
-        replace_file_id = request.POST.get("replace_file_id")
-        if replace_file_id and str(replace_file_id).isdigit():
-            StudentDataFile.objects.filter(id=int(replace_file_id)).exclude(id=new_file.id).delete()
-
-        student_count = Student.objects.filter(student_file=new_file).count()
         return JsonResponse({
             "status": "success",
             "file": {
                 "id": new_file.id,
                 "file_name": new_file.file_name,
-                "student_count": student_count,
+                "student_count": ingestor.inserted,
                 "uploaded_at": new_file.uploaded_at.strftime('%Y-%m-%d %H:%M') if new_file.uploaded_at else timezone.now().strftime('%Y-%m-%d %H:%M'),
-                "total": parse_result["total"],
-                "skipped": parse_result["skipped"],
+                "total": ingestor.total,
+                "skipped": ingestor.skipped,
                 "exam_id": exam.id,
+                "new_departments": resolver.registered,
+                "error_report_url": report_url,
+                "diff": diff,
             }
         })
     except Exam.DoesNotExist:
@@ -1548,28 +1670,128 @@ def upload_exam_student_file(request):
         return JsonResponse({"status": "error", "message": "Internal server error during upload. Please try again."}, status=500)
 
 
+@admin_required
+def download_upload_error_report(request):
+    """Download the rejected-row report of an upload made in this session."""
+    token = request.GET.get("report", "")
+    path = error_report_path(token)
+    if not path or token not in request.session.get("upload_error_reports", []):
+        return HttpResponse("Report not found or expired", status=404)
+
+    response = HttpResponse(path.read_bytes(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="upload-errors-{token[:8]}.csv"'
+    return response
+
+
 # =========================
 # Delete Student File (DB only)
 # =========================
+def _exams_using_student_file(student_file):
+    """Names of the live exams whose students, attendance or marks sheets come from `student_file`."""
+    exam_ids = _student_file_exam_ids(student_file)
+    return list(Exam.objects.filter(id__in=exam_ids).order_by('id').values_list('name', flat=True))
+
+
 @admin_required
 def delete_student_file(request, file_id):
     student_file = get_object_or_404(StudentDataFile, id=file_id)
-    student_file.delete()  # cascades to Student table
+    # Dashboard files are selected into exams, so one file can feed several.
+    exam_names = _exams_using_student_file(student_file)
+    if exam_names:
+        messages.error(
+            request,
+            f"{student_file.file_name} is used by exam(s) {', '.join(exam_names)}. "
+            "Delete those exams first."
+        )
+        return redirect("dashboard")
+    # Hidden now; its students and sheets are purged in the background.
+    delete_student_files([student_file.id])
     messages.success(request, "File and related student data deleted successfully!")
     return redirect("dashboard")
 
 
+FILE_STUDENTS_PAGE_SIZE = 200
+FILE_STUDENTS_MAX_PAGE_SIZE = 1000
+FILE_STUDENTS_SORT_FIELDS = ('id', 'name', 'registration_number')
+
+
+def _encode_students_cursor(value, student_id):
+    return base64.urlsafe_b64encode(json.dumps([value, student_id]).encode('utf-8')).decode('ascii')
+
+
+def _decode_students_cursor(cursor):
+    try:
+        value, student_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return value, int(student_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
 @admin_required_json
 def get_file_students(request):
-    """Fetch all students from a file. Query: file_id=int"""
+    """Browse the students of a file one page at a time.
+
+    Query: file_id=int, optional limit (default 200, max 1000), cursor (the
+    `next_cursor` of the previous page), sort (id, name or registration_number,
+    prefix '-' for descending), and filters branch, semester, status (exact)
+    and q (case-insensitive prefix of name or registration number).
+
+    Pages are keyset-paginated on (sort value, id), so every page is one
+    bounded query over the (student_file, ..., id) indexes however deep the
+    client pages. `total_students` is the file's stored row count."""
     try:
         file_id = request.GET.get('file_id')
         if not file_id:
             return JsonResponse({'status': 'error', 'message': 'file_id required'}, status=400)
         file_obj = StudentDataFile.objects.get(id=file_id)
-        students = list(Student.objects.filter(student_file=file_obj).values(
+
+        try:
+            limit = min(max(int(request.GET.get('limit') or FILE_STUDENTS_PAGE_SIZE), 1), FILE_STUDENTS_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'limit must be an integer'}, status=400)
+
+        sort = request.GET.get('sort') or 'id'
+        descending = sort.startswith('-')
+        sort_field = sort.lstrip('-')
+        if sort_field not in FILE_STUDENTS_SORT_FIELDS:
+            return JsonResponse({'status': 'error', 'message': f"sort must be one of {', '.join(FILE_STUDENTS_SORT_FIELDS)}"}, status=400)
+
+        qs = Student.objects.filter(student_file=file_obj)
+        for param, field in (('branch', 'branch'), ('semester', 'semester'), ('status', 'academic_status')):
+            value = (request.GET.get(param) or '').strip()
+            if value:
+                qs = qs.filter(**{field: value})
+        prefix = (request.GET.get('q') or '').strip()
+        if prefix:
+            qs = qs.filter(Q(name__istartswith=prefix) | Q(registration_number__istartswith=prefix))
+
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                last_value, last_id = _decode_students_cursor(cursor)
+            except ValueError:
+                return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
+            after = 'lt' if descending else 'gt'
+            if sort_field == 'id':
+                qs = qs.filter(**{f'id__{after}': last_id})
+            else:
+                qs = qs.filter(
+                    Q(**{f'{sort_field}__{after}': last_value}) | Q(**{sort_field: last_value, f'id__{after}': last_id})
+                )
+
+        direction = '-' if descending else ''
+        ordering = [f'{direction}id'] if sort_field == 'id' else [f'{direction}{sort_field}', f'{direction}id']
+        students = list(qs.order_by(*ordering).values(
             'id', 'name', 'roll_number', 'registration_number', 'student_id', 'course', 'semester', 'branch', 'room_number', 'academic_status'
-        ))
+        )[:limit + 1])
+
+        has_more = len(students) > limit
+        students = students[:limit]
+        next_cursor = None
+        if has_more:
+            last = students[-1]
+            next_cursor = _encode_students_cursor(last[sort_field], last['id'])
+
         return JsonResponse({
             'status': 'success',
             'file': {
@@ -1578,7 +1800,9 @@ def get_file_students(request):
                 'uploaded_at': file_obj.uploaded_at.strftime('%Y-%m-%d %H:%M') if file_obj.uploaded_at else 'Unknown'
             },
             'students': students,
-            'total_students': len(students)
+            'total_students': file_obj.row_count,
+            'has_more': has_more,
+            'next_cursor': next_cursor,
         })
     except StudentDataFile.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'File not found'}, status=404)
@@ -1586,30 +1810,121 @@ def get_file_students(request):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
 
+@admin_required_json
+def search_students(request):
+    """Find students across all uploaded files. Query: q (prefix of registration
+    number, roll number, student id or name; at least 2 characters), limit
+    (default 20, max 100). Each hit carries its file, exams and seats."""
+    term = (request.GET.get('q') or '').strip()
+    if len(term) < SEARCH_MIN_LENGTH:
+        return JsonResponse({'status': 'error', 'message': f'Enter at least {SEARCH_MIN_LENGTH} characters'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit') or SEARCH_DEFAULT_LIMIT), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'limit must be an integer'}, status=400)
+
+    results = find_students(term, limit)
+    return JsonResponse({'status': 'success', 'query': term, 'results': results})
+
+
 @admin_required_json
 def update_students(request):
-    """Update multiple students. POST JSON: { students: [ {id, name, roll_number, registration_number, student_id, course, semester, branch, room_number, academic_status}, ... ] }"""
+    """Bulk-patch students. POST JSON: { students: [ {id, name, roll_number, registration_number, student_id, course, semester, branch, room_number, academic_status}, ... ] }
+
+    Every row is validated first; if any row is invalid nothing is written and
+    the per-row `results` explain why. Otherwise the students are loaded with
+    one `id__in` query and only the changed fields are written with a single
+    `bulk_update` inside one transaction. An id given twice makes the later
+    rows invalid. Ids that no longer exist are reported as `not_found`
+    without blocking the rest."""
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'POST required'}, status=400)
     try:
         payload = json.loads(request.body.decode('utf-8') or '{}')
-        students = payload.get('students') or []
-        updated = 0
-        for s in students:
-            sid = s.get('id')
-            if not sid:
-                continue
+        rows = payload.get('students') or []
+
+        results = []
+        patches = {}
+        seen_ids = set()
+        for index, row in enumerate(rows):
             try:
-                st = Student.objects.get(id=sid)
-                for field in ['name', 'roll_number', 'registration_number', 'student_id', 'course', 'semester', 'branch', 'room_number', 'academic_status']:
-                    if field in s:
-                        setattr(st, field, s.get(field))
-                st.save()
-                updated += 1
-            except Student.DoesNotExist:
+                sid = int(row.get('id'))
+            except (TypeError, ValueError):
+                results.append({'index': index, 'id': row.get('id'), 'status': 'invalid', 'errors': ['id must be an integer']})
                 continue
 
-        return JsonResponse({'status': 'success', 'updated': updated})
+            values = {}
+            errors = []
+            for field in STUDENT_FIELDS:
+                if field not in row:
+                    continue
+                value = '' if row[field] is None else str(row[field]).strip()
+                max_length = Student._meta.get_field(field).max_length
+                if len(value) > max_length:
+                    errors.append(f"{field} is longer than {max_length} characters")
+                if field in REQUIRED_STUDENT_FIELDS and not value:
+                    errors.append(f"{REQUIRED_STUDENT_FIELDS[field]} is required")
+                values[field] = value
+            if sid in seen_ids:
+                errors.append(f"id {sid} appears more than once")
+            seen_ids.add(sid)
+
+            if errors:
+                results.append({'index': index, 'id': sid, 'status': 'invalid', 'errors': errors})
+            else:
+                patches[sid] = (index, values)
+
+        invalid = [r for r in results if r['status'] == 'invalid']
+        if invalid:
+            return JsonResponse({
+                'status': 'error',
+                'message': f"{len(invalid)} row(s) failed validation; nothing was saved.",
+                'results': results,
+            }, status=400)
+
+        students = Student.objects.in_bulk(list(patches))
+        changed_objects = []
+        changed_fields = set()
+        branch_changes = []
+        for sid, (index, values) in patches.items():
+            student = students.get(sid)
+            if student is None:
+                results.append({'index': index, 'id': sid, 'status': 'not_found', 'errors': []})
+                continue
+            changed = [field for field, value in values.items() if getattr(student, field) != value]
+            for field in changed:
+                setattr(student, field, values[field])
+            if 'branch' in changed:
+                branch_changes.append(student)
+            if changed:
+                changed_objects.append(student)
+                changed_fields.update(changed)
+            results.append({'index': index, 'id': sid, 'status': 'updated' if changed else 'unchanged', 'changed': changed})
+
+        resolver = None
+        if branch_changes:
+            resolver = DepartmentResolver()
+            branches = list({student.branch for student in branch_changes})
+            department_ids = dict(zip(branches, resolver.resolve_all(branches)))
+            for student in branch_changes:
+                student.canonical_department_id = department_ids.get(student.branch)
+            changed_fields.add('canonical_department_id')
+
+        if changed_objects:
+            with transaction.atomic():
+                Student.objects.bulk_update(changed_objects, sorted(changed_fields), batch_size=500)
+                invalidate_exam_summaries(student_ids=[student.id for student in changed_objects])
+                edited_file_ids = {student.student_file_id for student in changed_objects}
+                _mark_student_files_edited(edited_file_ids)
+                refresh_student_file_stats(edited_file_ids)
+
+        results.sort(key=lambda r: r['index'])
+        return JsonResponse({
+            'status': 'success',
+            'updated': len(changed_objects),
+            'results': results,
+            'new_departments': resolver.registered if resolver else [],
+        })
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
@@ -1626,33 +1941,17 @@ def add_file_students(request):
         if not file_id:
             return JsonResponse({'status': 'error', 'message': 'file_id required'}, status=400)
         file_obj = StudentDataFile.objects.get(id=file_id)
-        to_create = []
-        for s in students:
-            name = s.get('name') or ''
-            roll = s.get('roll_number') or ''
-            reg = s.get('registration_number') or ''
-            std_id = s.get('student_id') or ''
-            course = s.get('course') or ''
-            semester = s.get('semester') or ''
-            branch = s.get('branch') or ''
-            room_number = s.get('room_number') or ''
-            academic_status = s.get('academic_status') or ''
-            
-            to_create.append(Student(
-                student_file=file_obj,
-                name=name,
-                roll_number=roll,
-                registration_number=reg,
-                student_id=std_id,
-                course=course,
-                semester=semester,
-                branch=branch,
-                room_number=room_number,
-                academic_status=academic_status
-            ))
+        resolver = DepartmentResolver()
+        department_ids = resolver.resolve_all(s.get('branch') or '' for s in students)
+        rows = [
+            [file_obj.id, department_id] + [s.get(field) or '' for field in STUDENT_FIELDS]
+            for s, department_id in zip(students, department_ids)
+        ]
 
-        Student.objects.bulk_create(to_create)
-        return JsonResponse({'status': 'success', 'added': len(to_create)})
+        added = bulk_insert(Student, STUDENT_LOAD_FIELDS, rows)
+        StudentDataFile.objects.filter(id=file_obj.id).update(content_hash="")
+        refresh_student_file_stats([file_obj.id])
+        return JsonResponse({'status': 'success', 'added': added, 'new_departments': resolver.registered})
     except StudentDataFile.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'File not found'}, status=404)
     except Exception as e:
@@ -1739,6 +2038,7 @@ def complete_exam_setup(request):
             exam.is_temporary = False
             exam.is_completed = True
             exam.save()
+            _load_exam_summary(exam, refresh=True)
             
             logger.info(f'Exam {exam.id} marked as PERMANENT in database')
             
@@ -1794,7 +2094,10 @@ def add_room_single(request):
         if Room.objects.filter(exam=exam, building__iexact=building, room_number__iexact=room_number).exists():
             return JsonResponse({"status": "error", "message": "Room with same building and room number already exists for this exam"}, status=400)
 
-        room = Room.objects.create(exam=exam, building=building, room_number=room_number, capacity=capacity)
+        catalogue = upsert_catalogue_rooms([(building, room_number, capacity)], update_capacity=False)
+        catalogue_room = catalogue.get(room_key(building, room_number))
+        room = Room.objects.create(exam=exam, catalogue_room=catalogue_room, building=building, room_number=room_number, capacity=capacity)
+        invalidate_exam_summaries([exam.id])
         return JsonResponse({"status": "success", "room": {"id": room.id, "building": room.building, "room_number": room.room_number, "capacity": room.capacity}})
     except Exam.DoesNotExist:
         return JsonResponse({"status": "error", "message": "Exam not found"}, status=404)
@@ -1817,6 +2120,7 @@ def update_temp_exam(request):
             exam = Exam.objects.get(id=exam_id, is_temporary=True, is_completed=False)
             exam.name = name
             exam.save()
+            invalidate_exam_summaries([exam.id])
             return JsonResponse({"status": "success"})
         except Exam.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Temporary exam not found"}, status=404)
@@ -1867,7 +2171,7 @@ def generate_sheets(request):
                         'room_number': row.get('room_number', ''),
                         'academic_status': row.get('academic_status', ''),
                     }
-                    for index, row in enumerate(temp_upload.get("students", []))
+                    for index, row in enumerate(_temp_upload_student_records(temp_upload))
                 ]
 
             from collections import OrderedDict
@@ -1971,7 +2275,9 @@ def save_generated_sheets(request):
                     return JsonResponse({"status": "error", "message": "No temporary student file available to save"}, status=400)
                 student_file = _create_student_file_with_students(
                     temp_upload.get("file_name") or "attendance_wizard_upload.xlsx",
-                    temp_upload.get("students", []),
+                    _temp_upload_student_records(temp_upload),
+                    content_hash=temp_upload.get("content_hash", ""),
+                    exam=exam,
                 )
             # record in AttendanceSheet model
             AttendanceSheet.objects.create(
@@ -1999,7 +2305,7 @@ def get_generated_sheets(request):
     if request.method == "GET":
         try:
             rows = []
-            for sheet in AttendanceSheet.objects.select_related('exam', 'student_file').order_by('-generated_at'):
+            for sheet in AttendanceSheet.objects.select_related('exam', 'student_file').filter(exam__deleted_at__isnull=True, student_file__deleted_at__isnull=True).order_by('-generated_at'):
                 count = 0
                 if sheet.sheet_data:
                     # calculate actual student count
@@ -2100,15 +2406,20 @@ def download_attendance_sheet_pdf(request):
             if not sheet_id:
                 return HttpResponse("Missing id", status=400)
             sheet = AttendanceSheet.objects.select_related("exam").get(id=sheet_id)
-            return _build_attendance_pdf_response(sheet.sheet_data or [], sheet.exam.name or "attendance-sheet")
-
-        if request.method == "POST":
+            exam_name = sheet.exam.name or "attendance-sheet"
+            sheets = sheet.sheet_data or []
+        elif request.method == "POST":
             data = json.loads(request.body or "{}")
             exam_name = data.get("exam_name") or "attendance-sheet"
             sheets = data.get("sheets") or []
-            return _build_attendance_pdf_response(sheets, exam_name)
+        else:
+            return HttpResponse("Method not allowed", status=405)
 
-        return HttpResponse("Method not allowed", status=405)
+        return _cached_pdf_response(
+            request, "attendance", {"exam_name": exam_name, "sheets": sheets},
+            lambda output: _render_attendance_pdf(sheets, exam_name, output),
+            f"{_sanitize_download_filename(exam_name)}.pdf",
+        )
     except AttendanceSheet.DoesNotExist:
         return HttpResponse("Sheet not found", status=404)
     except Exception as exc:
@@ -2156,7 +2467,7 @@ def generate_marks_sheets(request):
                 temp_upload = _get_temp_attendance_upload(request, exam_id)
                 if not temp_upload:
                     return JsonResponse({"status": "error", "message": "Student file not found"}, status=404)
-                students = temp_upload.get("students", [])
+                students = _temp_upload_student_records(temp_upload)
 
             # Group by (branch, semester) while preserving encounter order
             from collections import OrderedDict
@@ -2230,7 +2541,9 @@ def save_generated_marks_sheets(request):
                     return JsonResponse({"status": "error", "message": "No temporary student file available to save"}, status=400)
                 student_file = _create_student_file_with_students(
                     temp_upload.get("file_name") or "marksheet_wizard_upload.xlsx",
-                    temp_upload.get("students", []),
+                    _temp_upload_student_records(temp_upload),
+                    content_hash=temp_upload.get("content_hash", ""),
+                    exam=exam,
                 )
             # record in MarksSheet model
             MarksSheet.objects.create(
@@ -2258,7 +2571,7 @@ def get_generated_marks_sheets(request):
     if request.method == "GET":
         try:
             rows = []
-            for sheet in MarksSheet.objects.select_related('exam', 'student_file').order_by('-generated_at'):
+            for sheet in MarksSheet.objects.select_related('exam', 'student_file').filter(exam__deleted_at__isnull=True, student_file__deleted_at__isnull=True).order_by('-generated_at'):
                 count = 0
                 if sheet.sheet_data:
                     # calculate actual student count
@@ -2355,15 +2668,20 @@ def download_marks_sheet_pdf(request):
             if not sheet_id:
                 return HttpResponse("Missing id", status=400)
             sheet = MarksSheet.objects.select_related("exam").get(id=sheet_id)
-            return _build_marks_pdf_response(sheet.sheet_data or [], sheet.exam.name or "marks-sheet")
-
-        if request.method == "POST":
+            exam_name = sheet.exam.name or "marks-sheet"
+            sheets = sheet.sheet_data or []
+        elif request.method == "POST":
             data = json.loads(request.body or "{}")
             exam_name = data.get("exam_name") or "marks-sheet"
             sheets = data.get("sheets") or []
-            return _build_marks_pdf_response(sheets, exam_name)
+        else:
+            return HttpResponse("Method not allowed", status=405)
 
-        return HttpResponse("Method not allowed", status=405)
+        return _cached_pdf_response(
+            request, "marks", {"exam_name": exam_name, "sheets": sheets},
+            lambda output: _render_marks_pdf(sheets, exam_name, output),
+            f"{_sanitize_download_filename(exam_name)}.pdf",
+        )
     except MarksSheet.DoesNotExist:
         return HttpResponse("Sheet not found", status=404)
     except Exception as exc:
@@ -2391,7 +2709,7 @@ def delete_temp_exam(request):
             
             # Only delete if it's still temporary (not completed)
             if exam.is_temporary and not exam.is_completed:
-                exam.delete()
+                delete_exams([exam.id])
                 return JsonResponse({
                     "status": "success",
                     "message": "Temporary exam deleted"
@@ -2436,6 +2754,7 @@ def create_exam(request):
             exam.start_date = data.get("start_date")
             exam.end_date = data.get("end_date")
             exam.save()
+            invalidate_exam_summaries([exam.id])
 
             return JsonResponse({
                 "status": "success",
@@ -2471,8 +2790,8 @@ def delete_exam(request):
             except Exam.DoesNotExist:
                 return JsonResponse({'status': 'error', 'message': 'Exam not found'}, status=404)
 
-            # Delete the exam (cascade will remove related objects)
-            exam.delete()
+            # Hide the exam now; related rows are purged in the background
+            delete_exams([exam.id])
             logger.info(f"Deleted exam {exam_id} and related data by admin")
             return JsonResponse({'status': 'success', 'message': 'Exam deleted'})
         except json.JSONDecodeError:
@@ -2495,58 +2814,42 @@ def add_departments(request):
             departments = data.get("departments", [])
 
             exam = Exam.objects.get(id=exam_id)
-            print(f"\n[DEBUG add_departments] Creating departments for exam {exam_id}")
-            print(f"[DEBUG] Departments received: {[d.get('department') for d in departments]}")
-            
+
             if not departments:
                 raise ValueError("No departments provided!")
-            
-            total_exams_created = 0
 
-            for dept in departments:
-                department_name = dept.get("department")
-                exams_list = dept.get("exams", [])
-                
-                print(f"[DEBUG] Processing department: '{department_name}'")
-                print(f"[DEBUG]   Total exams for this dept: {len(exams_list)}")
-                
-                if not exams_list:
-                    print(f"[DEBUG]   ⚠ WARNING: No exams for department '{department_name}'")
-                    continue
+            resolver = DepartmentResolver()
+            department_ids = resolver.resolve_all(dept.get("department") for dept in departments)
 
-                for idx, ex in enumerate(exams_list):
-                    try:
-                        de = DepartmentExam.objects.create(
-                            exam=exam,
-                            department=department_name,
-                            exam_name=ex.get("name"),
-                            paper_code=ex.get("code"),
-                            exam_date=ex.get("date"),
-                            session=ex.get("session"),
-                            start_time=ex.get("start_time") or None,
-                            end_time=ex.get("end_time") or None,
-                            semester=ex.get("semester") or None
-                        )
-                        print(f"[DEBUG]   ✓ Exam {idx+1}: dept='{de.department}', date={de.exam_date}, session={de.session}, time={de.start_time}-{de.end_time}, semester={de.semester}")
-                        total_exams_created += 1
-                    except Exception as exam_err:
-                        print(f"[DEBUG]   ✗ ERROR creating exam {idx+1}: {str(exam_err)}")
-                        raise
-
-            # Log all created DepartmentExam records
-            all_depts = DepartmentExam.objects.filter(exam=exam).values_list('department', flat=True).distinct()
-            print(f"[DEBUG] ===== RESULT =====")
-            print(f"[DEBUG] Department exams created: {total_exams_created}")
-            print(f"[DEBUG] Unique departments: {list(all_depts)}")
-            print(f"[DEBUG] ====================\n")
-            
-            return JsonResponse({"status": "success", "message": f"Created {total_exams_created} department exam entries"})
+            department_exams = [
+                DepartmentExam(
+                    exam=exam,
+                    department=dept.get("department"),
+                    canonical_department_id=department_id,
+                    exam_name=ex.get("name"),
+                    paper_code=ex.get("code"),
+                    exam_date=ex.get("date"),
+                    session=ex.get("session"),
+                    start_time=ex.get("start_time") or None,
+                    end_time=ex.get("end_time") or None,
+                    semester=ex.get("semester") or None
+                )
+                for dept, department_id in zip(departments, department_ids)
+                for ex in dept.get("exams") or []
+            ]
+
+            total_exams_created = _replace_department_exams(exam, department_exams)
+            logger.debug(f"add_departments: exam {exam_id}: {total_exams_created} department exam(s) across {len(departments)} department(s)")
+
+            return JsonResponse({
+                "status": "success",
+                "message": f"Created {total_exams_created} department exam entries",
+                "new_departments": resolver.registered,
+            })
 
         except Exception as e:
             error_msg = f"Error in add_departments: {str(e)}"
             print(f"[DEBUG] ✗ {error_msg}")
-            import traceback
-            traceback.print_exc()
             return JsonResponse({
                 "status": "error",
                 "message": error_msg
@@ -2554,13 +2857,82 @@ def add_departments(request):
 
     return JsonResponse({"status": "error", "message": "POST request required"}, status=400)
 
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-import json
-from .models import Exam, Room
+
+def _replace_department_exams(exam, department_exams):
+    """
+    Make `department_exams` the exam's whole schedule: the old rows are deleted
+    and the new ones inserted with one `bulk_create`, atomically, so a failed
+    save never leaves a half-written timetable (and re-submitting step 2 does
+    not duplicate papers).
+    """
+    with transaction.atomic():
+        DepartmentExam.objects.filter(exam=exam).delete()
+        DepartmentExam.objects.bulk_create(department_exams)
+        invalidate_exam_summaries([exam.id])
+    return len(department_exams)
+
+
+@admin_required_json
+def upload_schedule_file(request):
+    """
+    Import an exam timetable (CSV/XLSX) for the exam being set up.
+
+    The whole file is validated first (dates, times, missing fields, papers
+    listed twice and overlapping papers for the same department/semester); if
+    any row is invalid nothing is saved and the per-row errors are returned.
+    Otherwise the schedule replaces the exam's papers in one transaction and
+    is echoed back, grouped by department, for the setup page to display.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "POST request required"}, status=400)
+
+    exam_id = request.POST.get("exam_id")
+    uploaded_file = request.FILES.get("file")
+    if not exam_id or not uploaded_file:
+        return JsonResponse({"status": "error", "message": "exam_id and file are required"}, status=400)
+
+    try:
+        exam = Exam.objects.get(id=exam_id)
+    except (Exam.DoesNotExist, ValueError):
+        return JsonResponse({"status": "error", "message": "Exam not found"}, status=404)
+
+    try:
+        frame = read_upload_frame(uploaded_file)
+        resolver = DepartmentResolver()
+        rows, errors = parse_schedule_frame(frame, resolver)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Failed to read schedule file: {str(e)}")
+        return JsonResponse({"status": "error", "message": f"Failed to read schedule file: {str(e)}"}, status=400)
+
+    if errors:
+        return JsonResponse({
+            "status": "error",
+            "message": f"{len(errors)} row(s) failed validation; nothing was saved.",
+            "errors": errors,
+        }, status=400)
+
+    created = _replace_department_exams(exam, department_exam_objects(exam, rows))
+    logger.debug(f"upload_schedule_file: exam {exam_id}: {created} paper(s) from '{uploaded_file.name}'")
+
+    return JsonResponse({
+        "status": "success",
+        "message": f"Imported {created} exam(s) from '{uploaded_file.name}'",
+        "created": created,
+        "departments": schedule_by_department(rows),
+        "new_departments": resolver.registered,
+    })
 
 @admin_required_json
 def add_rooms(request):
+    """
+    Save the exam's room list from setup step 3.
+
+    Rooms may be given as `{building, room_number, capacity}` or by reference
+    as `{catalogue_room_id}` (optionally with a per-exam capacity). The list
+    is applied as a diff, so rooms that stay keep their seat allocations.
+    """
     if request.method == "POST":
         try:
             data = json.loads(request.body)
@@ -2569,21 +2941,37 @@ def add_rooms(request):
 
             exam = Exam.objects.get(id=exam_id)
 
+            catalogue_ids = [r['catalogue_room_id'] for r in rooms if r.get('catalogue_room_id')]
+            catalogue = CampusRoom.objects.in_bulk(catalogue_ids)
+
             # Validate rooms before saving
+            cleaned = []
             seen_rooms = set()
             for r in rooms:
-                building = r['building']
-                room_number = r['room_number']
-                
+                catalogue_room = catalogue.get(r.get('catalogue_room_id'))
+                if r.get('catalogue_room_id') and catalogue_room is None:
+                    return JsonResponse({"status": "error", "message": f"Catalogue room {r['catalogue_room_id']} not found"}, status=400)
+                building = str(r.get('building') or (catalogue_room.building if catalogue_room else '')).strip()
+                room_number = str(r.get('room_number') or (catalogue_room.room_number if catalogue_room else '')).strip()
+                capacity = r.get('capacity')
+                if capacity in (None, '') and catalogue_room:
+                    capacity = catalogue_room.capacity
+                try:
+                    capacity = int(capacity)
+                except (TypeError, ValueError):
+                    return JsonResponse({"status": "error", "message": f"Invalid capacity for room '{room_number}' in '{building}'"}, status=400)
+                if not building or not room_number or capacity < 0:
+                    return JsonResponse({"status": "error", "message": "Each room needs a building, a room number and a capacity."}, status=400)
+
                 # Check if same building + room number combination exists
-                room_key = (building, room_number)
-                if room_key in seen_rooms:
+                room_key_value = room_key(building, room_number)
+                if room_key_value in seen_rooms:
                     return JsonResponse({
                         "status": "error",
                         "message": f"Duplicate room detected: '{room_number}' in '{building}' appears multiple times. Each room must have a unique building + room number combination."
                     }, status=400)
-                seen_rooms.add(room_key)
-                
+                seen_rooms.add(room_key_value)
+
                 # Check if building and room number are the same (user-friendly check)
                 if building == room_number:
                     return JsonResponse({
@@ -2591,18 +2979,13 @@ def add_rooms(request):
                         "message": f"Invalid room: Building name '{building}' and Room number '{room_number}' cannot be the same. Please use different values (e.g., Building='Main Building', Room='303')."
                     }, status=400)
 
-            # Delete old rooms for exam (optional)
-            Room.objects.filter(exam=exam).delete()
+                cleaned.append({'building': building, 'room_number': room_number, 'capacity': capacity})
 
-            for r in rooms:
-                Room.objects.create(
-                    exam=exam,
-                    building=r['building'],
-                    room_number=r['room_number'],
-                    capacity=r['capacity']
-                )
+            counts = sync_exam_rooms(exam, cleaned)
+            invalidate_exam_summaries([exam.id])
+            logger.debug(f"add_rooms: exam {exam_id}: {counts}")
 
-            return JsonResponse({"status": "success"})
+            return JsonResponse({"status": "success", **counts})
         except Exam.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Exam not found"}, status=400)
         except Exception as e:
@@ -2611,7 +2994,12 @@ def add_rooms(request):
 
 @admin_required_json
 def upload_rooms_file(request):
-    """Upload a CSV/XLS file containing room definitions (Building, Room Number, Capacity)."""
+    """
+    Upload a CSV/XLS file containing room definitions (Building, Room Number, Capacity).
+
+    The rooms are added to (or refresh the capacity of) the campus catalogue
+    and returned with their `catalogue_room_id` for the exam's room list.
+    """
     if request.method != 'POST':
         return JsonResponse({"status": "error", "message": "POST required"}, status=400)
 
@@ -2633,89 +3021,43 @@ def upload_rooms_file(request):
         if uploaded_file.size > max_size:
             return JsonResponse({"status": "error", "message": "File size too large. Maximum allowed is 10MB."}, status=400)
 
-        # Try reading as CSV first, then Excel
-        df = None
-        file_name = uploaded_file.name.lower()
-
         try:
-            df = pd.read_csv(uploaded_file, dtype=str, on_bad_lines='skip', engine='python')
-        except Exception:
-            try:
-                uploaded_file.seek(0)
-            except Exception:
-                pass
-            try:
-                df = pd.read_csv(uploaded_file, dtype=str, on_bad_lines='skip')
-            except Exception:
-                try:
-                    uploaded_file.seek(0)
-                except Exception:
-                    pass
-                # Excel (xls/xlsx)
-                if file_name.endswith('.xlsx'):
-                    try:
-                        df = pd.read_excel(uploaded_file, dtype=str, engine='openpyxl')
-                    except Exception:
-                        return JsonResponse({"status": "error", "message": "Unable to parse XLSX file. Please use CSV or XLS format."}, status=400)
-                else:
-                    try:
-                        df = pd.read_excel(uploaded_file, dtype=str, engine='xlrd')
-                    except Exception as e:
-                        return JsonResponse({"status": "error", "message": f"Unable to parse Excel file: {str(e)}"}, status=400)
-
-        if df is None:
-            return JsonResponse({"status": "error", "message": "Unable to parse file. Please provide a CSV or XLS file."}, status=400)
+            df = read_upload_frame(uploaded_file)
+        except Exception as e:
+            return JsonResponse({"status": "error", "message": f"Unable to parse file: {str(e)}"}, status=400)
 
-        df = df.dropna(how='all').reset_index(drop=True)
-        if df.empty:
+        if df.dropna(how='all').empty:
             return JsonResponse({"status": "error", "message": "File is empty or contains no valid rows."}, status=400)
 
-        df.columns = df.columns.str.strip().str.lower()
-        cols = set(df.columns)
+        try:
+            parsed, errors = parse_room_frame(df)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
-        def find_col(candidates):
-            for c in candidates:
-                if c in cols:
-                    return c
-            return None
+        if errors:
+            return JsonResponse({
+                "status": "error",
+                "message": f"{len(errors)} row(s) have an invalid capacity (first: row {errors[0]['row']}); nothing was saved.",
+                "errors": errors,
+            }, status=400)
 
-        building_col = find_col(['building', 'building name', 'building_name'])
-        room_col = find_col(['room number', 'room_number', 'roomno', 'room no', 'room'])
-        cap_col = find_col(['capacity', 'cap', 'seats', 'seat capacity', 'room capacity'])
+        if parsed.empty:
+            return JsonResponse({"status": "error", "message": "No valid rooms found in file."}, status=400)
 
-        if not (building_col and room_col and cap_col):
-            return JsonResponse({"status": "error", "message": "File must include columns: Building, Room Number, Capacity."}, status=400)
+        triples = list(parsed[['building', 'room_number', 'capacity']].itertuples(index=False, name=None))
+        with transaction.atomic():
+            catalogue = upsert_catalogue_rooms(triples)
 
         rooms = []
-        seen = set()
-        for idx, row in df.iterrows():
-            building = str(row.get(building_col, '')).strip()
-            room_number = str(row.get(room_col, '')).strip()
-            capacity_raw = row.get(cap_col, '')
-            capacity = str(capacity_raw).strip() if pd.notna(capacity_raw) else ''
-
-            if not building or not room_number:
-                continue
-
-            try:
-                capacity_val = int(float(capacity)) if capacity != '' else 0
-            except Exception:
-                return JsonResponse({"status": "error", "message": f"Invalid capacity value on row {idx + 2}: '{capacity}'"}, status=400)
-
-            key = (building, room_number)
-            if key in seen:
-                continue
-            seen.add(key)
-
+        for building, room_number, capacity in triples:
+            catalogue_room = catalogue[room_key(building, room_number)]
             rooms.append({
-                'building': building,
-                'room_number': room_number,
-                'capacity': capacity_val
+                'catalogue_room_id': catalogue_room.id,
+                'building': catalogue_room.building,
+                'room_number': catalogue_room.room_number,
+                'capacity': int(capacity),
             })
 
-        if not rooms:
-            return JsonResponse({"status": "error", "message": "No valid rooms found in file."}, status=400)
-
         return JsonResponse({"status": "success", "rooms": rooms})
 
     except Exception as e:
@@ -2723,6 +3065,24 @@ def upload_rooms_file(request):
         return JsonResponse({"status": "error", "message": "Internal server error"}, status=500)
 
 
+@admin_required_json
+def get_room_catalogue(request):
+    """List the campus room catalogue for attaching rooms to an exam."""
+    rooms = CampusRoom.objects.order_by('building', 'room_number').values('id', 'building', 'room_number', 'capacity')
+    return JsonResponse({
+        "status": "success",
+        "rooms": [
+            {
+                'catalogue_room_id': r['id'],
+                'building': r['building'],
+                'room_number': r['room_number'],
+                'capacity': r['capacity'],
+            }
+            for r in rooms
+        ],
+    })
+
+
 # =========================
 # Delete single Room (API)
 # =========================
@@ -2747,6 +3107,7 @@ def delete_room(request):
         SeatAllocation.objects.filter(room=room).delete()
 
         room.delete()
+        invalidate_exam_summaries([room.exam_id])
         logger.info(f"Deleted room {room_id} by admin")
         return JsonResponse({"status": "success", "message": "Room deleted"})
     except Exception as e:
@@ -2771,7 +3132,7 @@ def get_room_details(request):
 
         # Current allocations for this room
         allocs = SeatAllocation.objects.filter(room=room).values(
-            'registration_number', 'department', 'seat_code', 'row', 'column', 'exam_date', 'exam_session', 'exam_name'
+            'registration_number', 'department', 'canonical_department_id', 'seat_code', 'row', 'column', 'exam_date', 'exam_session', 'exam_name'
         )
         allocs_list = list(allocs)
 
@@ -2780,10 +3141,11 @@ def get_room_details(request):
             a_start = ''
             a_end = ''
             try:
-                if a.get('department'):
+                department_id = a.pop('canonical_department_id', None)
+                if department_id:
                     de = DepartmentExam.objects.filter(
                         exam=room.exam,
-                        department=a.get('department'),
+                        canonical_department_id=department_id,
                         exam_date=a.get('exam_date')
                     ).first()
                     if de:
@@ -2848,6 +3210,7 @@ def update_room_seating(request):
 
         created_count = 0
         updated_count = 0
+        resolver = DepartmentResolver()
 
         # Debug log incoming seats
         logger.debug(f"Received {len(seats)} seats for room {room_id}")
@@ -2867,10 +3230,12 @@ def update_room_seating(request):
 
             # Use update_or_create keyed by room + seat_code
             # This preserves other seats in the room
+            department = (s.get('department') or '').strip()
             defaults = {
                 'exam': exam,
                 'registration_number': reg,
-                'department': (s.get('department') or '').strip(),
+                'department': department,
+                'canonical_department_id': resolver.resolve_or_register(department),
                 'row': row,
                 'column': column,
                 'exam_date': s.get('exam_date') or exam.start_date,
@@ -2887,6 +3252,7 @@ def update_room_seating(request):
             else:
                 updated_count += 1
 
+        invalidate_exam_summaries([room.exam_id])
         logger.info(f"Room {room_id}: Created {created_count}, Updated {updated_count} seats")
 
         return JsonResponse({'status': 'success', 'message': f'Created {created_count}, Updated {updated_count} seats for room {room.room_number}', 'seats_received': len(seats), 'created': created_count, 'updated': updated_count})
@@ -2929,6 +3295,7 @@ def add_student_to_seat(request):
         if not reg or reg.lower() in ['registration no', 'department', 'empty', '(empty)']:
             from .models import SeatAllocation
             deleted_count, _ = SeatAllocation.objects.filter(room_id=room_id, seat_code=seat_code).delete()
+            invalidate_exam_summaries(Room.objects.filter(id=room_id).values_list('exam_id', flat=True))
             return JsonResponse({
                 "status": "success",
                 "action": "removed",
@@ -2947,10 +3314,13 @@ def add_student_to_seat(request):
             column = 0
         
         # Build defaults with exam metadata
+        department = (data.get('department') or '').strip()
+        department_id = DepartmentResolver().resolve_or_register(department)
         defaults = {
             'exam': room.exam,
             'registration_number': reg,
-            'department': (data.get('department') or '').strip(),
+            'department': department,
+            'canonical_department_id': department_id,
             'row': row,
             'column': column,
             'exam_date': data.get('exam_date') or room.exam.start_date,
@@ -3004,7 +3374,7 @@ def add_student_to_seat(request):
                 # Try to update existing DepartmentExam explicitly (if it exists)
                 de_qs = DepartmentExam.objects.filter(
                     exam=room.exam,
-                    department=defaults.get('department') or '',
+                    canonical_department_id=department_id,
                     exam_date=de_exam_date
                 )
                 if de_qs.exists():
@@ -3026,6 +3396,7 @@ def add_student_to_seat(request):
                     de_obj = DepartmentExam.objects.create(
                         exam=room.exam,
                         department=defaults.get('department') or '',
+                        canonical_department_id=department_id,
                         exam_name=defaults.get('exam_name') or room.exam.name,
                         paper_code='',
                         exam_date=de_exam_date,
@@ -3036,6 +3407,7 @@ def add_student_to_seat(request):
                     logger.info(f"Created DepartmentExam for dept={de_obj.department} date={de_obj.exam_date}")
         except Exception as e:
             logger.error(f"Failed to persist DepartmentExam: {str(e)}")
+        invalidate_exam_summaries([room.exam_id])
 
         action = "created" if created else "updated"
         return JsonResponse({
@@ -3064,31 +3436,48 @@ def add_student_to_seat(request):
 # =========================
 # Get Uploaded Student Files (API)
 # ========================="
+UPLOADED_FILES_PAGE_SIZE = 50
+UPLOADED_FILES_MAX_PAGE_SIZE = 500
+
+
 @admin_required_json
 def get_uploaded_files(request):
+    """List uploaded student files, newest first, one page per query.
+
+    Query: limit (default 50, max 500), offset. Counts and the per-department
+    summary are stored on each file, so no students are read."""
     if request.method == "GET":
         try:
-            uploaded_files = StudentDataFile.objects.all().order_by("-uploaded_at")
-            
-            files_data = []
-            for file_obj in uploaded_files:
-                # StudentDataFile does not store department directly. Use first student branch as department fallback.
-                first_student = Student.objects.filter(student_file=file_obj).order_by('id').first()
-                dept = first_student.branch if first_student else ''
+            try:
+                limit = min(max(int(request.GET.get('limit') or UPLOADED_FILES_PAGE_SIZE), 1), UPLOADED_FILES_MAX_PAGE_SIZE)
+                offset = max(int(request.GET.get('offset') or 0), 0)
+            except ValueError:
+                return JsonResponse({"status": "error", "message": "limit and offset must be integers"}, status=400)
 
+            uploaded_files = list(
+                StudentDataFile.objects.order_by("-uploaded_at", "-id")
+                .only("id", "file_name", "uploaded_at", "row_count", "department_summary")[offset:offset + limit + 1]
+            )
+            has_more = len(uploaded_files) > limit
+
+            files_data = []
+            for file_obj in uploaded_files[:limit]:
                 files_data.append({
                     'id': file_obj.id,
                     'file_name': file_obj.file_name,
-                    'department': dept,
+                    'department': file_obj.primary_department,
+                    'departments': file_obj.department_summary,
                     # include timestamp string for UI if needed
                     'uploaded_at': file_obj.uploaded_at.strftime('%Y-%m-%d %H:%M') if file_obj.uploaded_at else None,
                     # number of student records attached to this file
-                    'student_count': Student.objects.filter(student_file=file_obj).count(),
+                    'student_count': file_obj.row_count,
                 })
-            
+
             return JsonResponse({
                 "status": "success",
-                "files": files_data
+                "files": files_data,
+                "has_more": has_more,
+                "next_offset": offset + limit if has_more else None,
             })
         except Exception as e:
             return JsonResponse({
@@ -3100,6 +3489,50 @@ def get_uploaded_files(request):
 # =========================
 # Save Selected Files for Exam 
 # =========================
+def _merge_exam_students(exam, file_ids):
+    """
+    Copy the students of `file_ids` into the exam with one INSERT ... SELECT.
+
+    A student is merged when its (canonical department, semester) matches one of
+    the exam's DepartmentExam rows; a DepartmentExam without a semester matches
+    every semester of its department. When the exam has no department keys yet,
+    every student of the selected files is merged. Returns the inserted row count.
+    """
+    if not file_ids:
+        return 0
+
+    qn = connection.ops.quote_name
+    exam_student_table = qn(ExamStudent._meta.db_table)
+    student_table = qn(Student._meta.db_table)
+    department_exam_table = qn(DepartmentExam._meta.db_table)
+
+    params = [exam.id, timezone.now()] + list(file_ids)
+    file_placeholders = ", ".join(["%s"] * len(file_ids))
+
+    department_filter = ""
+    if DepartmentExam.objects.filter(exam=exam, canonical_department__isnull=False).exists():
+        department_filter = f"""
+            AND EXISTS (
+                SELECT 1 FROM {department_exam_table} de
+                WHERE de.exam_id = %s
+                  AND de.canonical_department_id = s.canonical_department_id
+                  AND (de.semester IS NULL OR de.semester = '' OR de.semester = s.semester)
+            )"""
+        params.append(exam.id)
+
+    sql = f"""
+        INSERT INTO {exam_student_table} (exam_id, student_id, student_file_id, added_at)
+        SELECT %s, s.id, s.student_file_id, %s
+        FROM {student_table} s
+        WHERE s.student_file_id IN ({file_placeholders}){department_filter}
+        ON CONFLICT DO NOTHING
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return max(cursor.rowcount, 0)
+
+
 @admin_required_json
 def save_selected_files(request):
 
@@ -3129,83 +3562,43 @@ def save_selected_files(request):
         # Normalize file IDs
         file_ids = [int(fid) for fid in selected_files if str(fid).isdigit()]
 
-        student_files = StudentDataFile.objects.filter(id__in=file_ids)
+        student_files = list(StudentDataFile.objects.filter(id__in=file_ids).only("id", "file_name", "row_count"))
 
-        if not student_files.exists():
+        if not student_files:
             return JsonResponse({"status": "error", "message": "No valid student files found"}, status=400)
 
-        # ✅ FIX 1 — safer student fetch
-        students = Student.objects.filter(
-            student_file__in=student_files
-        ).select_related("student_file")
+        file_counts = {f.id: f.row_count for f in student_files}
 
-        if not students.exists():
+        if not sum(file_counts.values()):
             return JsonResponse({"status": "error", "message": "No students found in selected files"}, status=400)
 
-        # ✅ FIX 1.5 — Filter students by semester and department/branch from exam
-        from django.db.models import Q
-        
-        # Get all department exams for this exam
-        department_exams = DepartmentExam.objects.filter(exam=exam)
-        
-        if department_exams.exists():
-            # Build filter: student's (semester, branch) must match at least one (semester, department) from exam
-            q_filters = Q()
-            for dept_exam in department_exams:
-                exam_semester = dept_exam.semester
-                exam_department = dept_exam.department
-                
-                if exam_semester:
-                    # Match both semester and department/branch
-                    q_filters |= Q(semester=exam_semester, branch__icontains=exam_department)
-                else:
-                    # If semester is not specified, just match by department/branch
-                    q_filters |= Q(branch__icontains=exam_department)
-            
-            # Apply filter only if we have matching criteria
-            if q_filters:
-                students = students.filter(q_filters)
-                print(f"[DEBUG save_selected_files] Filtered {students.count()} students by semester/department from {len(list(department_exams))} department exams")
-            else:
-                print(f"[DEBUG save_selected_files] No semester/department filters applied")
-        else:
-            print(f"[DEBUG save_selected_files] No department exams found for exam {exam_id}")
-
-        if not students.exists():
-            return JsonResponse({"status": "error", "message": "No students found matching the exam's semester and department criteria. Please check your student data and exam configuration."}, status=400)
+        with transaction.atomic():
+            # Remove old allocations
+            ExamStudent.objects.filter(exam=exam).delete()
 
-        # Remove old allocations
-        ExamStudent.objects.filter(exam=exam).delete()
+            merged_count = _merge_exam_students(exam, [f.id for f in student_files])
+            invalidate_exam_summaries([exam.id])
+            logger.debug(f"save_selected_files: merged {merged_count} students into exam {exam_id}")
 
-        records = [
-            ExamStudent(
-                exam=exam,
-                student=student,
-                student_file=student.student_file
-            )
-            for student in students
-        ]
-
-        # ✅ FIX 2 — safe bulk insert
-        if records:
-            ExamStudent.objects.bulk_create(records, ignore_conflicts=True)
+            if not merged_count:
+                transaction.set_rollback(True)
+                return JsonResponse({"status": "error", "message": "No students found matching the exam's semester and department criteria. Please check your student data and exam configuration."}, status=400)
 
         # Prepare response
-        files_data = []
-        for file_obj in student_files:
-            count = Student.objects.filter(student_file=file_obj).count()
-
-            files_data.append({
+        files_data = [
+            {
                 "file_id": file_obj.id,
                 "file_name": file_obj.file_name,
-                "student_count": count
-            })
+                "student_count": file_counts.get(file_obj.id, 0)
+            }
+            for file_obj in student_files
+        ]
 
         return JsonResponse({
             "status": "success",
-            "message": f"{len(records)} students merged successfully",
+            "message": f"{merged_count} students merged successfully",
             "files": files_data,
-            "total_students": len(records)
+            "total_students": merged_count
         })
 
     except Exception as e:
@@ -3219,15 +3612,25 @@ def save_selected_files(request):
 # =========================
 # Generate Seating Algorithm
 # =========================
+@gzip_page
 @admin_required_json
 def generate_seating(request):
-    """Generate seat allocations based on exam groups and department distribution"""
+    """Generate seat allocations based on exam groups and department distribution
+
+    Optional query parameters `format=compact` and `fields=` shape the
+    returned seats (see core.payloads).
+    """
     from collections import defaultdict
     import random
     import math
     
     if request.method != "POST":
         return JsonResponse({"status": "error", "message": "POST required"}, status=400)
+
+    try:
+        compact, seat_fields = seat_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
     
     try:
         try:
@@ -3284,11 +3687,11 @@ def generate_seating(request):
         exam = Exam.objects.get(id=exam_id)
         
         # Include all students; eligibility is shown in seat metadata
-        exam_students_all = ExamStudent.objects.filter(exam=exam).select_related('student')
+        exam_students_all = ExamStudent.objects.filter(exam=exam).select_related('student', 'student__canonical_department')
         exam_students = exam_students_all
         ineligible_count = exam_students_all.filter(student__academic_status__iexact='eligible').count()
 
-        dept_exams = DepartmentExam.objects.filter(exam=exam)
+        dept_exams = DepartmentExam.objects.filter(exam=exam).select_related('canonical_department')
         rooms = list(Room.objects.filter(exam=exam).order_by('id'))
         
         print(f"\n[DEBUG generate_seating] Exam: {exam_id}")
@@ -3325,13 +3728,15 @@ def generate_seating(request):
                 return 1
             return 2
 
-        # Build dept_exam_map with normalized department names + semester
+        # Build dept_exam_map keyed by canonical department id + semester
         dept_exam_map = {}
+        dept_codes = {}
         for de in dept_exams:
-            dept_key = (de.department or '').strip().upper()
+            dept_key = de.canonical_department_id
             semester_key = str(de.semester or '').strip()
             if not dept_key:
                 continue
+            dept_codes[dept_key] = de.canonical_department.code
             lookup_key = (dept_key, semester_key)
             if lookup_key not in dept_exam_map:
                 dept_exam_map[lookup_key] = []
@@ -3365,14 +3770,15 @@ def generate_seating(request):
             student = exam_student.student
             semester = getattr(student, 'semester', '') or ''
             dept_raw = getattr(student, 'branch', '') or ''
-            dept = dept_raw.strip().upper()
+            dept_id = student.canonical_department_id
+            dept = student.canonical_department.code if dept_id else ''
 
             semester_key = str(semester or '').strip()
-            matching_exam_infos = dept_exam_map.get((dept, semester_key))
+            matching_exam_infos = dept_exam_map.get((dept_id, semester_key))
             if not matching_exam_infos and semester_key:
-                matching_exam_infos = dept_exam_map.get((dept, ''))
+                matching_exam_infos = dept_exam_map.get((dept_id, ''))
 
-            if not dept or not matching_exam_infos:
+            if not dept_id or not matching_exam_infos:
                 skipped_students.append((student.registration_number, dept_raw))
                 print(f"[DEBUG] SKIPPED student {student.registration_number} with dept='{dept_raw}' semester='{semester_key}' (not in dept_exam_map)")
                 continue
@@ -3396,6 +3802,7 @@ def generate_seating(request):
                     'id': exam_student.id,
                     'registration_number': student.registration_number,
                     'department': dept,
+                    'department_id': dept_id,
                     'semester': semester,
                     'exam_date': exam_date,
                     'exam_name': exam_name,
@@ -3510,6 +3917,7 @@ def generate_seating(request):
                             seating_results[room.id].append({
                                 'registration': registration_value,
                                 'department': col_dept or '',
+                                'department_id': sw.get('department_id'),
                                 'seat': f"{chr(ord('A') + row_idx)}{col_index}",
                                 'row': chr(ord('A') + row_idx),
                                 'column': col_index,
@@ -3661,15 +4069,15 @@ def generate_seating(request):
             print(f"[DEBUG] Department mismatch between student file and Step 2 departments")
             student_depts_in_file = list(set(s.student.branch for s in exam_students))
             configured_depts = [
-                f"{dept} (Sem {sem})" if sem else dept
-                for dept, sem in dept_exam_map.keys()
+                f"{dept_codes.get(dept_id, '')} (Sem {sem})" if sem else dept_codes.get(dept_id, '')
+                for dept_id, sem in dept_exam_map.keys()
             ]
             print(f"[DEBUG] Departments in student file: {student_depts_in_file}")
             print(f"[DEBUG] Departments in Step 2: {configured_depts}")
             print(f"[DEBUG] ==========================================\n")
             return JsonResponse({
                 "status": "error",
-                "message": f"DEPARTMENT MISMATCH!\nStudents in file: {student_depts_in_file}\nConfigured in Step 2: {configured_depts}\nMake sure department names match EXACTLY (case-sensitive)!"
+                "message": f"DEPARTMENT MISMATCH!\nStudents in file: {student_depts_in_file}\nConfigured in Step 2: {configured_depts}\nAdd the student branch names as aliases of the Step 2 departments, or correct the file."
             }, status=400)
         
         if len(response_rooms) == 0 and len(skipped_students) > 0:
@@ -3687,10 +4095,11 @@ def generate_seating(request):
                 if r.get('seats'):
                     print(f"[DEBUG] First seat keys: {r['seats'][0].keys()}")
         
+        # Shape the response first: an unknown `fields=` entry must fail before anything is saved
+        encoded_rooms = encode_rooms(response_rooms, compact, seat_fields)
+
         # ===== SAVE SEATING TO DATABASE =====
         print(f"[DEBUG] Saving seating allocations to database...")
-        SeatAllocation.objects.filter(exam=exam).delete()  # Clear previous allocations
-        
         seat_allocations = []
         seen_allocations = set()
         for room in response_rooms:
@@ -3716,6 +4125,7 @@ def generate_seating(request):
                     room_id=room['id'],
                     registration_number=reg,
                     department=seat.get('department', ''),
+                    canonical_department_id=seat.get('department_id'),
                     seat_code=seat.get('seat', ''),
                     row=row,
                     column=column,
@@ -3725,13 +4135,18 @@ def generate_seating(request):
                 )
                 seat_allocations.append(sa)
         
-        SeatAllocation.objects.bulk_create(seat_allocations, ignore_conflicts=True)
+        # Replaced in one transaction and invalidated afterwards, so a summary
+        # rebuilt meanwhile never sees the seats half written.
+        with transaction.atomic():
+            SeatAllocation.objects.filter(exam=exam).delete()  # Clear previous allocations
+            SeatAllocation.objects.bulk_create(seat_allocations, ignore_conflicts=True)
+            invalidate_exam_summaries([exam.id])
         print(f"[DEBUG] Saved {len(seat_allocations)} seat allocations to database (ignore_conflicts=True)")
         
         return JsonResponse({
             "status": "success", 
             "message": "Seating generated", 
-            "rooms": response_rooms,
+            "rooms": encoded_rooms,
             "total_students": exam_students.count(),
             "total_seats_allocated": total_seats,
             "total_rooms": len(response_rooms)
@@ -3793,6 +4208,7 @@ def lock_seating(request):
         
         # Save all seat allocations
         allocations = []
+        resolver = DepartmentResolver()
         for room_data in seating_data:
             room_id = room_data.get('id')
             try:
@@ -3807,6 +4223,7 @@ def lock_seating(request):
                     room=room,
                     registration_number=seat.get('registration', ''),
                     department=seat.get('department', ''),
+                    canonical_department_id=resolver.resolve_or_register(seat.get('department', '')),
                     seat_code=seat.get('seat', ''),
                     row=seat.get('row', ''),
                     column=int(seat.get('column', 0)) if seat.get('column') else 0,
@@ -3818,6 +4235,7 @@ def lock_seating(request):
         
         # Bulk create
         SeatAllocation.objects.bulk_create(allocations, ignore_conflicts=True)
+        _load_exam_summary(exam, refresh=True)
         
         # DO NOT mark exam as completed here!
         # Exam should only be marked as completed when user clicks "Complete Setup" button
@@ -3837,350 +4255,387 @@ def lock_seating(request):
 # =========================
 # STEP 6 - GET EXAM SUMMARY
 # =========================
-# STEP 6 - GET EXAM SUMMARY
-# =========================
-def get_exam_summary(request):
-    """Fetch complete exam summary for Step 6 verification"""
-    try:
-        exam_id = request.GET.get('exam_id')
-        if not exam_id:
-            return JsonResponse({"status": "error", "message": "exam_id required"}, status=400)
-        
-        try:
-            exam = Exam.objects.get(id=exam_id)
-        except Exam.DoesNotExist:
-            return JsonResponse({"status": "error", "message": f"Exam with ID {exam_id} not found"}, status=404)
-        
-        # 1. Exam details
-        exam_data = {
-            "id": exam.id,
-            "name": exam.name or "",
-            "start_date": str(exam.start_date) if exam.start_date else "",
-            "end_date": str(exam.end_date) if exam.end_date else "",
-            "schedule_file_name": getattr(exam, 'schedule_file_name', None) or "",
-            "rooms_file_name": getattr(exam, 'rooms_file_name', None) or ""
-        }
-        
-        # 2. Departments & Exams
-        departments_data = []
-        try:
-            departments = exam.departments.all().values(
-                'department', 'exam_name', 'paper_code', 'exam_date', 'session', 'start_time', 'end_time', 'semester'
-            )
-            departments_data = list(departments)
-        except Exception as e:
-            print(f"[DEBUG] Error loading departments: {e}")
-            departments_data = []
-        
-        # 3. Rooms - keep full rooms list for potential filtering after seat data is read
-        room_data_all = []
-        try:
-            room_data_all = list(exam.rooms.all().values('id', 'building', 'room_number', 'capacity'))
-        except Exception as e:
-            print(f"[DEBUG] Error loading rooms: {e}")
-            room_data_all = []
-
-        # 4. Student Files used
-        student_files_data = []
-        try:
-            exam_students = ExamStudent.objects.filter(exam=exam).select_related('student_file')
-            student_file_ids = set()
-            for es in exam_students:
-                student_file_ids.add(es.student_file_id)
-            
-            for file_id in student_file_ids:
-                try:
-                    student_file = StudentDataFile.objects.get(id=file_id)
-                    student_count = ExamStudent.objects.filter(exam=exam, student_file_id=file_id).count()
-                    student_files_data.append({
-                        'id': student_file.id,
-                        'file_name': student_file.file_name,
-                        'student_count': student_count,
-                        'year': '',
-                        'semester': '',
-                        'department': ''
-                    })
-                except StudentDataFile.DoesNotExist:
-                    continue
-        except Exception as e:
-            print(f"[DEBUG] Error loading student files: {e}")
-            student_files_data = []
-        
-        # 5. Seating arrangement
-        seating_data = []
-        allocated_room_ids = set()
-        # Build student eligibility map from ExamStudent/Student to preserve eligibility status
-        student_eligibility = {}
-        student_semester = {}
-        try:
-            exam_students = ExamStudent.objects.filter(exam=exam).select_related('student')
-            for es in exam_students:
-                reg = (es.student.registration_number or '').strip().upper()
-                if reg:
-                    student_eligibility[reg] = str(getattr(es.student, 'academic_status', '')).strip().lower() == 'eligible'
-                    student_semester[reg] = str(getattr(es.student, 'semester', '')).strip()
-        except Exception as e:
-            print(f"[DEBUG] Error building student maps: {e}")
-            student_eligibility = {}
-            student_semester = {}
-
-        # Build a quick lookup for department exam start/end/semester times
-        dept_exam_lookup = {}
-        try:
-            for de in DepartmentExam.objects.filter(exam=exam):
-                key = (
-                    str(de.department or '').strip().upper(),
-                    str(de.exam_date or ''),
-                    str(de.session or ''),
-                    str(de.semester or '').strip()
-                )
-                dept_exam_lookup[key] = {
-                    'start_time': str(de.start_time) if de.start_time else '',
-                    'end_time': str(de.end_time) if de.end_time else '',
-                    'semester': str(de.semester).strip() if de.semester else ''
-                }
-        except Exception as e:
-            print(f"[DEBUG] Error building department exam lookup: {e}")
-            dept_exam_lookup = {}
-
-        try:
-            seating_queryset = SeatAllocation.objects.filter(exam=exam).select_related('room')
-            seating_count = seating_queryset.count()
-            print(f"[DEBUG] SeatAllocation count for exam {exam.id}: {seating_count}")
-
-            for seat in seating_queryset:
-                try:
-                    allocated_room_ids.add(seat.room_id)
-                    reg = (seat.registration_number or '').strip()
-                    reg_upper = reg.upper()
-                    is_eligible = False
-                    if reg_upper and reg_upper != 'EMPTY':
-                        is_eligible = student_eligibility.get(reg_upper, False)
-
-                    student_sem = student_semester.get(reg_upper, '')
-                    dept_times = _resolve_department_exam_meta(
-                        dept_exam_lookup,
-                        seat.department,
-                        seat.exam_date,
-                        seat.exam_session,
-                        student_sem,
-                    )
-
-                    seating_data.append({
-                        'room_id': seat.room_id,
-                        'room_building': seat.room.building if seat.room else "",
-                        'room_number': seat.room.room_number if seat.room else "",
-                        'row': seat.row or '',
-                        'column': seat.column or 0,
-                        'seat': seat.seat_code or '',
-                        'registration': reg or '',
-                        'department': seat.department or '',
-                        'exam_date': str(seat.exam_date) if seat.exam_date else '',
-                        'session': seat.exam_session or '',
-                        'exam_name': seat.exam_name or '',
-                        'start_time': dept_times.get('start_time', ''),
-                        'end_time': dept_times.get('end_time', ''),
-                        'semester': dept_times.get('semester', '') or student_sem,
-                        'student_semester': student_sem,
-                        'year': '',
-                        'is_eligible': is_eligible
-                    })
-                except Exception as e:
-                    print(f"[DEBUG] Error processing seat {getattr(seat, 'seat_code', '?')}: {e}")
-                    continue
-
-            print(f"[DEBUG] Processed {len(seating_data)} seats successfully")
-
-        except Exception as e:
-            print(f"[DEBUG] Error in seating query: {e}")
-            import traceback
-            traceback.print_exc()
-            seating_data = []
-            allocated_room_ids = set()
-
-        # Build rooms_data with seats and department details from actual allocated seats.
-        rooms_data = []
-        for r in room_data_all:
-            if r.get('id') not in allocated_room_ids:
-                continue
-
-            room_seats = [s for s in seating_data if s.get('room_id') == r.get('id')]
-            if not room_seats:
-                continue
-            room_seats = _hydrate_empty_seat_slot_metadata(room_seats)
+SUMMARY_DEPARTMENT_FIELDS = (
+    'department', 'exam_name', 'paper_code', 'exam_date', 'session', 'start_time', 'end_time', 'semester'
+)
 
-            # Determine departments with actual students in room
-            room_departments = set()
-            for s in room_seats:
-                if s.get('registration') and s.get('registration') != 'Empty' and s.get('department'):
-                    room_departments.add(str(s.get('department')).strip().upper())
 
-            dept_details = []
-            seen_details = set()
-            for s in room_seats:
-                dept = str(s.get('department') or '').strip()
-                if not dept or dept.upper() == 'EMPTY':
-                    continue
-                dept_key = dept.strip().upper()
-                if dept_key not in room_departments:
-                    continue
+def _exam_department_rows(exam):
+    return list(
+        DepartmentExam.objects.filter(exam=exam)
+        .order_by('id')
+        .values('canonical_department_id', *SUMMARY_DEPARTMENT_FIELDS)
+    )
 
-                detail_key = f"{dept_key}||{s.get('exam_name','')}||{s.get('exam_date','')}||{s.get('session','')}||{s.get('start_time','')}||{s.get('end_time','')}"
-                if detail_key in seen_details:
-                    continue
-                seen_details.add(detail_key)
 
-                dept_details.append({
-                    'department': dept,
-                    'semester': s.get('semester',''),
-                    'exam_name': s.get('exam_name','N/A'),
-                    'exam_date': s.get('exam_date','N/A'),
-                    'session': s.get('session','N/A'),
-                    'start_time': s.get('start_time','N/A'),
-                    'end_time': s.get('end_time','N/A')
-                })
+def _build_exam_seat_view(exam, department_rows=None):
+    """
+    Enriched seats of an exam grouped by room, shared by the Step 6 summary
+    and the seating PDF.
 
-            rooms_data.append({
-                'id': r.get('id'),
-                'building': r.get('building'),
-                'room_number': r.get('room_number'),
-                'capacity': r.get('capacity'),
-                'departments': sorted(list(room_departments)),
-                'department_details': dept_details,
-                'seats': room_seats
-            })
-        print(f"[DEBUG] Returning {len(rooms_data)} rooms with seat allocations (from {len(room_data_all)} total rooms)")
-        
-        total_students = ExamStudent.objects.filter(exam=exam).count()
-        total_seats = len(seating_data)
-        
-        return JsonResponse({
-            "status": "success",
-            "exam": exam_data,
-            "departments": departments_data,
-            "rooms": rooms_data,
-            "student_files": student_files_data,
-            "seating": seating_data,
-            "total_students": total_students,
-            "total_seats_allocated": total_seats
-        })
-        
-    except Exception as e:
-        print(f"[DEBUG] Outer error in get_exam_summary: {e}")
-        import traceback
-        traceback.print_exc()
-        return JsonResponse({"status": "error", "message": f"Server error: {str(e)}"}, status=500)
+    Seats come from one values() query ordered by room and slot, so rooms are
+    cut out in a single pass. Paper times resolve through a precompiled
+    lookup. Three queries in all (exam students, seats, and department papers
+    unless `department_rows` is passed in).
 
+    Returns `(rooms, exam_student_count)`; each room carries its `seats`,
+    `departments` and `department_details`, and rooms without seats are left out.
+    """
+    if department_rows is None:
+        department_rows = _exam_department_rows(exam)
+    resolve_paper = _compile_department_exam_lookup(department_rows)
 
-def _build_seating_pdf_rooms(exam):
-    room_data_all = list(exam.rooms.all().values('id', 'building', 'room_number', 'capacity'))
-    allocated_room_ids = set()
-    seating_data = []
     student_eligibility = {}
     student_semester = {}
-
-    exam_students = ExamStudent.objects.filter(exam=exam).select_related('student')
-    for es in exam_students:
-        reg = (es.student.registration_number or '').strip().upper()
+    exam_student_count = 0
+    for reg, academic_status, semester in ExamStudent.objects.filter(exam=exam).values_list(
+        'student__registration_number', 'student__academic_status', 'student__semester'
+    ):
+        exam_student_count += 1
+        reg = (reg or '').strip().upper()
         if reg:
-            student_eligibility[reg] = str(getattr(es.student, 'academic_status', '')).strip().lower() == 'eligible'
-            student_semester[reg] = str(getattr(es.student, 'semester', '')).strip()
+            student_eligibility[reg] = str(academic_status or '').strip().lower() == 'eligible'
+            student_semester[reg] = str(semester or '').strip()
+
+    seats = SeatAllocation.objects.filter(exam=exam).order_by('room_id', 'exam_date', 'exam_session', 'id').values_list(
+        'room_id', 'room__building', 'room__room_number', 'room__capacity',
+        'row', 'column', 'seat_code', 'registration_number',
+        'canonical_department_id', 'canonical_department__code', 'department',
+        'exam_date', 'exam_session', 'exam_name',
+    )
 
-    dept_exam_lookup = {}
-    for de in DepartmentExam.objects.filter(exam=exam):
-        key = (
-            str(de.department or '').strip().upper(),
-            str(de.exam_date or ''),
-            str(de.session or ''),
-            str(de.semester or '').strip()
-        )
-        dept_exam_lookup[key] = {
-            'start_time': str(de.start_time) if de.start_time else '',
-            'end_time': str(de.end_time) if de.end_time else '',
-            'semester': str(de.semester).strip() if de.semester else ''
-        }
+    rooms_data = []
+    room = None
+    for (room_id, building, room_number, capacity, row, column, seat_code, reg,
+         dept_id, dept_code, dept_name, exam_date, session, exam_name) in seats:
+        if room is None or room['id'] != room_id:
+            room = {
+                'id': room_id,
+                'building': building,
+                'room_number': room_number,
+                'capacity': capacity,
+                'seats': [],
+            }
+            rooms_data.append(room)
 
-    for seat in SeatAllocation.objects.filter(exam=exam).select_related('room'):
-        allocated_room_ids.add(seat.room_id)
-        reg = (seat.registration_number or '').strip()
+        reg = (reg or '').strip()
         reg_upper = reg.upper()
         student_sem = student_semester.get(reg_upper, '')
-        dept_times = _resolve_department_exam_meta(
-            dept_exam_lookup,
-            seat.department,
-            seat.exam_date,
-            seat.exam_session,
-            student_sem,
-        )
-
-        seating_data.append({
-            'room_id': seat.room_id,
-            'row': seat.row or '',
-            'column': seat.column or 0,
-            'seat': seat.seat_code or '',
-            'registration': reg or '',
-            'department': seat.department or '',
-            'exam_date': str(seat.exam_date) if seat.exam_date else '',
-            'session': seat.exam_session or '',
-            'exam_name': seat.exam_name or '',
+        dept_times = resolve_paper(dept_id, exam_date, session, student_sem)
+        room['seats'].append({
+            'room_id': room_id,
+            'room_building': building or "",
+            'room_number': room_number or "",
+            'row': row or '',
+            'column': column or 0,
+            'seat': seat_code or '',
+            'registration': reg,
+            'department': dept_code if dept_id else (dept_name or ''),
+            'exam_date': str(exam_date) if exam_date else '',
+            'session': session or '',
+            'exam_name': exam_name or '',
             'start_time': dept_times.get('start_time', ''),
             'end_time': dept_times.get('end_time', ''),
             'semester': dept_times.get('semester', '') or student_sem,
             'student_semester': student_sem,
+            'year': '',
             'is_eligible': student_eligibility.get(reg_upper, False) if reg_upper and reg_upper != 'EMPTY' else False
         })
 
-    rooms_data = []
-    for room_data in room_data_all:
-        if room_data.get('id') not in allocated_room_ids:
-            continue
-
-        room_seats = [seat for seat in seating_data if seat.get('room_id') == room_data.get('id')]
-        if not room_seats:
-            continue
-        room_seats = _hydrate_empty_seat_slot_metadata(room_seats)
+    for room in rooms_data:
+        room_seats = _hydrate_empty_seat_slot_metadata(room['seats'])
 
+        # Departments with actual students in the room
         room_departments = set()
         for seat in room_seats:
-            if seat.get('registration') and seat.get('registration') != 'Empty' and seat.get('department'):
-                room_departments.add(str(seat.get('department')).strip().upper())
+            if seat['registration'] and seat['registration'] != 'Empty' and seat['department']:
+                room_departments.add(str(seat['department']).strip().upper())
 
         dept_details = []
         seen_details = set()
         for seat in room_seats:
-            dept = str(seat.get('department') or '').strip()
-            if not dept or dept.upper() == 'EMPTY':
-                continue
+            dept = str(seat['department'] or '').strip()
             dept_key = dept.upper()
-            if dept_key not in room_departments:
+            if not dept or dept_key == 'EMPTY' or dept_key not in room_departments:
                 continue
-
-            detail_key = f"{dept_key}||{seat.get('exam_name','')}||{seat.get('exam_date','')}||{seat.get('session','')}||{seat.get('start_time','')}||{seat.get('end_time','')}"
+            detail_key = (dept_key, seat['exam_name'], seat['exam_date'], seat['session'], seat['start_time'], seat['end_time'])
             if detail_key in seen_details:
                 continue
             seen_details.add(detail_key)
-
             dept_details.append({
                 'department': dept,
-                'semester': seat.get('semester', ''),
-                'exam_name': seat.get('exam_name', 'N/A'),
-                'exam_date': seat.get('exam_date', 'N/A'),
-                'session': seat.get('session', 'N/A'),
-                'start_time': seat.get('start_time', 'N/A'),
-                'end_time': seat.get('end_time', 'N/A')
+                'semester': seat['semester'],
+                'exam_name': seat['exam_name'],
+                'exam_date': seat['exam_date'],
+                'session': seat['session'],
+                'start_time': seat['start_time'],
+                'end_time': seat['end_time']
             })
 
-        rooms_data.append({
-            'id': room_data.get('id'),
-            'building': room_data.get('building'),
-            'room_number': room_data.get('room_number'),
-            'capacity': room_data.get('capacity'),
-            'departments': sorted(list(room_departments)),
-            'department_details': dept_details,
-            'seats': room_seats
-        })
+        room['departments'] = sorted(room_departments)
+        room['department_details'] = dept_details
+
+    return rooms_data, exam_student_count
+
+
+def _exam_summary_payload(exam):
+    """The full Step 6 summary of an exam, as stored in its ExamSummarySnapshot."""
+    # 1. Exam details
+    exam_data = {
+        "id": exam.id,
+        "name": exam.name or "",
+        "start_date": str(exam.start_date) if exam.start_date else "",
+        "end_date": str(exam.end_date) if exam.end_date else "",
+        "schedule_file_name": getattr(exam, 'schedule_file_name', None) or "",
+        "rooms_file_name": getattr(exam, 'rooms_file_name', None) or ""
+    }
+
+    # 2. Departments & Exams (the same rows feed the seat paper lookup)
+    department_rows = _exam_department_rows(exam)
+    departments_data = [
+        {field: row[field] for field in SUMMARY_DEPARTMENT_FIELDS} for row in department_rows
+    ]
+
+    # 3. Student Files used, with per-file counts in one grouped query
+    student_files_data = [
+        {
+            'id': row['student_file_id'],
+            'file_name': row['student_file__file_name'],
+            'student_count': row['student_count'],
+            'year': '',
+            'semester': '',
+            'department': ''
+        }
+        for row in ExamStudent.objects.filter(exam=exam, student_file__deleted_at__isnull=True)
+        .values('student_file_id', 'student_file__file_name')
+        .annotate(student_count=Count('id'))
+        .order_by('student_file_id')
+    ]
+
+    # 4. Rooms with their seats
+    rooms_data, total_students = _build_exam_seat_view(exam, department_rows)
+    seating_data = [seat for room in rooms_data for seat in room['seats']]
+    logger.debug(f"Built summary of exam {exam.id}: {len(rooms_data)} rooms, {len(seating_data)} seat allocations")
+
+    return {
+        "status": "success",
+        "exam": exam_data,
+        "departments": departments_data,
+        "rooms": rooms_data,
+        "student_files": student_files_data,
+        "seating": seating_data,
+        "total_students": total_students,
+        "total_seats_allocated": len(seating_data)
+    }
+
+
+def _exam_room_slots(summary):
+    """
+    Split the summary's rooms into the per-slot units the exam viewer shows,
+    in display order, as `(summary, seats)` pairs. The summary carries what
+    the viewer needs before the seats arrive.
+    """
+    units = []
+    for room in _expand_room_slots_for_output(summary.get('rooms') or []):
+        seats = room.get('seats') or []
+        students = [
+            seat for seat in seats
+            if str(seat.get('registration') or '').strip() and str(seat.get('registration')).strip().upper() != 'EMPTY'
+        ]
+        units.append(({
+            'id': room.get('id'),
+            'building': room.get('building'),
+            'room_number': room.get('room_number'),
+            'capacity': room.get('capacity'),
+            'slot_date': room.get('slot_date', ''),
+            'slot_session': room.get('slot_session', ''),
+            'slot_start_time': room.get('slot_start_time', ''),
+            'slot_end_time': room.get('slot_end_time', ''),
+            'seat_count': len(seats),
+            'student_count': len(students),
+            'semester': _dominant_room_semester(seats),
+            'departments': sorted({
+                str(seat.get('department')).strip().upper() for seat in students if str(seat.get('department') or '').strip()
+            }),
+            'department_details': room.get('department_details') or [],
+            # the slot of the first seated student, which the viewer's department list is filtered by
+            'student_date': students[0].get('exam_date', '') if students else '',
+            'student_session': students[0].get('session', '') if students else '',
+        }, seats))
+    return units
+
+
+def _load_exam_summary(exam, refresh=False):
+    load = refresh_exam_summary if refresh else load_exam_summary
+    return load(exam, _exam_summary_payload, _exam_room_slots)
+
+
+@gzip_page
+def get_exam_summary(request):
+    """Fetch complete exam summary for Step 6 verification.
+
+    Served from the exam's stored snapshot with an ETag; a request whose
+    If-None-Match still matches gets a 304 after one lookup. Optional
+    `format=compact` and `fields=` shape the seats (see core.payloads); the
+    compact format leaves out the flat `seating` list.
+    """
+    try:
+        exam_id = request.GET.get('exam_id')
+        if not exam_id:
+            return JsonResponse({"status": "error", "message": "exam_id required"}, status=400)
+        try:
+            compact, seat_fields = seat_options(request.GET)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        variant = representation_key(compact, seat_fields)
+
+        etag = _variant_etag(current_summary_etag(exam_id), variant)
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+
+        try:
+            exam = Exam.objects.get(id=exam_id)
+        except Exam.DoesNotExist:
+            return JsonResponse({"status": "error", "message": f"Exam with ID {exam_id} not found"}, status=404)
+
+        payload, etag = _load_exam_summary(exam)
+        if variant:
+            try:
+                rooms = encode_rooms(payload['rooms'], compact, seat_fields)
+            except ValueError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=400)
+            payload = {**payload, 'rooms': rooms}
+            if compact:
+                del payload['seating']
+            else:
+                payload['seating'] = [{field: seat.get(field) for field in seat_fields} for seat in payload['seating']]
+        # Browsers keep the body but revalidate it on every view.
+        return _with_summary_etag(JsonResponse(payload), _variant_etag(etag, variant))
+        
+    except Exception as e:
+        logger.exception(f"get_exam_summary error: {e}")
+        return JsonResponse({"status": "error", "message": f"Server error: {str(e)}"}, status=500)
+
+
+EXAM_ROOM_SEATS_MAX_PREFETCH = 5
+
+
+def _variant_etag(etag, variant):
+    """Tell apart the ETags of different encodings of the same snapshot."""
+    if not etag or not variant:
+        return etag
+    return f'{etag[:-1]}-{hashlib.sha1(variant.encode()).hexdigest()[:8]}"'
+
+
+def _etag_matches(request, etag):
+    # gzip_page weakens the ETags it compresses, so compare weakly.
+    if not etag:
+        return False
+    tags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
 
-    return rooms_data
+
+def _fresh_summary_etag(request, exam_id, variant=''):
+    """`(etag, not_modified)` for an exam's snapshot, rebuilding it first when stale; raises Exam.DoesNotExist."""
+    etag = _variant_etag(current_summary_etag(exam_id), variant)
+    if _etag_matches(request, etag):
+        return etag, True
+    if etag is None:
+        _, etag = _load_exam_summary(Exam.objects.get(id=exam_id))
+    return _variant_etag(etag, variant), False
+
+
+def _not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def _with_summary_etag(response, etag):
+    if etag:
+        response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@gzip_page
+def get_exam_room_index(request):
+    """Room-by-room index of an exam for the viewer: one entry per room and
+    exam slot (building, capacity, slot, counts, departments), without seats.
+
+    Query: exam_id=int. The seats of each entry are fetched separately with
+    `get_exam_room_seats` using its `position`.
+    """
+    try:
+        exam_id = int(request.GET.get('exam_id') or 0)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid exam_id"}, status=400)
+    if not exam_id:
+        return JsonResponse({"status": "error", "message": "exam_id required"}, status=400)
+
+    try:
+        etag, not_modified = _fresh_summary_etag(request, exam_id)
+    except Exam.DoesNotExist:
+        return JsonResponse({"status": "error", "message": f"Exam with ID {exam_id} not found"}, status=404)
+    if not_modified:
+        return _not_modified(etag)
+
+    rooms = [
+        {'position': position, **summary}
+        for position, summary in ExamRoomSlot.objects.filter(exam_id=exam_id).order_by('position').values_list('position', 'summary')
+    ]
+    return _with_summary_etag(JsonResponse({
+        "status": "success",
+        "exam_id": exam_id,
+        "rooms": rooms,
+        "total_rooms": len(rooms),
+        "total_seats_allocated": sum(room['seat_count'] for room in rooms),
+    }), etag)
+
+
+@gzip_page
+def get_exam_room_seats(request):
+    """Seats of one entry of `get_exam_room_index`.
+
+    Query: exam_id=int, position=int, optional prefetch (0-5): the seats of
+    that many following entries are returned too, so the viewer can fill the
+    rooms below the one being shown in the same round trip. `format=compact`
+    and `fields=` shape the seats as in `get_exam_summary`.
+    """
+    try:
+        exam_id = int(request.GET.get('exam_id') or 0)
+        position = int(request.GET.get('position') or 0)
+        prefetch = int(request.GET.get('prefetch') or 0)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "exam_id, position and prefetch must be integers"}, status=400)
+    try:
+        compact, seat_fields = seat_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if not exam_id:
+        return JsonResponse({"status": "error", "message": "exam_id required"}, status=400)
+    prefetch = max(0, min(prefetch, EXAM_ROOM_SEATS_MAX_PREFETCH))
+
+    try:
+        etag, not_modified = _fresh_summary_etag(request, exam_id, representation_key(compact, seat_fields))
+    except Exam.DoesNotExist:
+        return JsonResponse({"status": "error", "message": f"Exam with ID {exam_id} not found"}, status=404)
+    if not_modified:
+        return _not_modified(etag)
+
+    rooms = [
+        {'position': slot_position, 'id': summary.get('id'), 'seats': seats}
+        for slot_position, summary, seats in ExamRoomSlot.objects.filter(
+            exam_id=exam_id, position__gte=position, position__lte=position + prefetch
+        ).order_by('position').values_list('position', 'summary', 'seats')
+    ]
+    if not rooms or rooms[0]['position'] != position:
+        return JsonResponse({"status": "error", "message": f"Room position {position} not found"}, status=404)
+    try:
+        rooms = encode_rooms(rooms, compact, seat_fields)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return _with_summary_etag(JsonResponse({"status": "success", "exam_id": exam_id, "rooms": rooms}), etag)
 
 
 def _expand_room_slots_for_output(rooms):
@@ -4292,7 +4747,7 @@ def _hydrate_empty_seat_slot_metadata(room_seats):
     return room_seats
 
 
-def _draw_seating_pdf_page(pdf, exam, room, page_width, page_height):
+def _draw_seating_pdf_page(pdf, title, room, page_width, page_height):
     margin_x = 24
     top_y = page_height - 26
     content_width = page_width - (margin_x * 2)
@@ -4331,7 +4786,7 @@ def _draw_seating_pdf_page(pdf, exam, room, page_width, page_height):
         str(item.get('department') or '')
     ))
 
-    pdf.setTitle(exam.name or "Exam Seating")
+    pdf.setTitle(title)
     pdf.setFont("Helvetica-Bold", 17)
     pdf.drawString(margin_x, top_y, f"{room.get('building') or 'Main'} - {room.get('room_number') or 'N/A'}")
     pdf.setFont("Helvetica", 10)
@@ -4340,7 +4795,7 @@ def _draw_seating_pdf_page(pdf, exam, room, page_width, page_height):
         top_y - 18,
         f"{target_date} | {target_session} | Capacity: {room.get('capacity') or 0} | Semester: {room_semester or 'N/A'}"
     )
-    pdf.drawRightString(page_width - margin_x, top_y, exam.name or "Exam Seating")
+    pdf.drawRightString(page_width - margin_x, top_y, title)
 
     info_lines = [f"Departments in this room: {', '.join(sorted(room_departments)) or 'N/A'}"]
     if room_semester:
@@ -4430,10 +4885,12 @@ def _draw_seating_pdf_page(pdf, exam, room, page_width, page_height):
                 pdf.drawCentredString(x + (cell_width / 2), y + (cell_height / 2) - 2, "EMPTY")
             elif is_eligible:
                 dept = str((seat or {}).get('department') or '').strip()
-                pdf.setFont("Helvetica-Bold", 7)
-                pdf.drawCentredString(x + (cell_width / 2), y + (cell_height / 2), dept)
-                pdf.setFont("Helvetica", 7)
-                pdf.drawCentredString(x + (cell_width / 2), y + (cell_height / 2) - 10, registration)
+                text, size = fit_text(dept, cell_width - 4, "Helvetica-Bold", 7, 5)
+                pdf.setFont("Helvetica-Bold", size)
+                pdf.drawCentredString(x + (cell_width / 2), y + (cell_height / 2), text)
+                text, size = fit_text(registration, cell_width - 4, "Helvetica", 7, 5)
+                pdf.setFont("Helvetica", size)
+                pdf.drawCentredString(x + (cell_width / 2), y + (cell_height / 2) - 10, text)
 
     pdf.setFont("Helvetica", 8)
     pdf.setFillColorRGB(0.35, 0.35, 0.35)
@@ -4454,34 +4911,37 @@ def download_seating_pdf(request):
     except Exam.DoesNotExist:
         return HttpResponse("Exam not found.", status=404)
 
-    rooms_data = _build_seating_pdf_rooms(exam)
-    expanded_rooms = _expand_room_slots_for_output(rooms_data)
-    if not expanded_rooms:
+    # The seating is addressed by its snapshot version, so a cache hit reads no seats.
+    etag = current_summary_etag(exam.id)
+    rooms_data = None
+    if etag is None:
+        payload, etag = _load_exam_summary(exam)
+        rooms_data = payload['rooms']
+        has_rooms = bool(rooms_data)
+    else:
+        has_rooms = ExamRoomSlot.objects.filter(exam=exam).exists()
+    if not has_rooms:
         return HttpResponse("No seating data available for PDF export.", status=404)
 
-    buffer = BytesIO()
-    pdf = reportlab_canvas.Canvas(buffer, pagesize=A4)
-    page_width, page_height = A4
-
-    for index, room in enumerate(expanded_rooms):
-        if index > 0:
-            pdf.showPage()
-        _draw_seating_pdf_page(pdf, exam, room, page_width, page_height)
+    title = exam.name or "Exam Seating"
 
-    pdf.save()
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
+    def render(output):
+        rooms = rooms_data if rooms_data is not None else _load_exam_summary(exam)[0]['rooms']
+        render_seating_pdf(
+            _draw_seating_pdf_page, title, _expand_room_slots_for_output(rooms), output, chunk_dir=PDF_CACHE_DIR
+        )
 
     filename = _sanitize_download_filename(f"{exam.name or 'exam'}_seating_a4", "exam_seating_a4")
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="{filename}.pdf"'
-    return response
-
+    return _cached_pdf_response(
+        request, "seating", {"exam_id": exam.id, "title": title, "seating": etag or rooms_data},
+        render, f"{filename}.pdf",
+    )
 
 def view_exam(request, exam_id):
     """
     Renders a page showing seating layout for the given exam.
-    The page will fetch seating data via the existing `get_exam_summary` API.
+    The page lists rooms via `get_exam_room_index` and loads each room's
+    seats from `get_exam_room_seats` as it scrolls into view.
     """
     try:
         exam = Exam.objects.get(id=exam_id)
@@ -4512,17 +4972,20 @@ def get_student_info(request):
             return JsonResponse({"status": "error", "message": "Registration number is required"}, status=400)
         
         # Find the student
-        student = Student.objects.filter(registration_number=reg_number).first()
+        student = Student.objects.filter(registration_number=reg_number, student_file__deleted_at__isnull=True).first()
         
         if not student:
             return JsonResponse({"status": "error", "message": "Student not found"}, status=404)
         
-        student_department = str(getattr(student, 'branch', '') or '').strip()
+        if not student.canonical_department_id:
+            return JsonResponse({"status": "error", "message": "No exams found for this student"}, status=404)
+
         student_semester = str(getattr(student, 'semester', '') or '').strip()
 
         dept_exams = DepartmentExam.objects.filter(
             exam__is_completed=True,
-            department__iexact=student_department
+            exam__deleted_at__isnull=True,
+            canonical_department_id=student.canonical_department_id
         ).filter(
             Q(semester=student_semester) | Q(semester='') | Q(semester__isnull=True)
         ).select_related('exam').order_by('exam_date', 'session', 'start_time', 'exam_name', 'id')
@@ -4675,7 +5138,8 @@ def get_student_seat(request):
         # Build filter query
         filter_params = {
             'registration_number': reg_number,
-            'exam_id': exam_id
+            'exam_id': exam_id,
+            'exam__deleted_at__isnull': True,
         }
         
         # If exam_date is provided, use it to filter for the specific exam date
@@ -4706,11 +5170,16 @@ def get_student_seat(request):
         logger.info(f"[SEAT ACCESS] Reg: {reg_number}, Exam: {exam_id}, Server time (IST): {now_ist}, Today (IST): {today}, Exam date: {exam_date}")
         
         # Get exam times from DepartmentExam
-        student = Student.objects.filter(registration_number=reg_number).first()
+        # Seats whose department was never resolved fall back to the branch name,
+        # rather than matching any paper without a canonical department.
+        if seat.canonical_department_id is not None:
+            department_filter = {'canonical_department_id': seat.canonical_department_id}
+        else:
+            department_filter = {'department': seat.department}
         dept_exam = DepartmentExam.objects.filter(
             exam_id=exam_id,
-            department=seat.department,
-            exam_date=exam_date
+            exam_date=exam_date,
+            **department_filter
         ).first()
         
         # Format times for display - use correct field names expected by frontend
@@ -4884,26 +5353,16 @@ def get_exam_status(exam):
         return 'expired'
 
 
-# =========================
-# Delete Expired Exams (Auto Cleanup)
-# =========================
-def cleanup_expired_exams():
-    """
-    Deletes all exams that have ended (end_date < today).
-    Called on dashboard load to auto-clean old exams.
-    """
-    today = date.today()
-    expired_exams = Exam.objects.filter(end_date__lt=today, is_completed=True)
-    count = expired_exams.count()
-    
-    if count > 0:
-        logger.info(f'Deleting {count} expired exams...')
-        for exam in expired_exams:
-            logger.debug(f'Deleting exam: {exam.name} (ID: {exam.id}) - Ended on {exam.end_date}')
-        expired_exams.delete()
-        logger.info(f'Successfully deleted {count} expired exams')
-    
-    return count
+def exam_status_expression(today=None):
+    """`get_exam_status` as a database expression, for annotating exam querysets."""
+    today = today or date.today()
+    return Case(
+        When(Q(start_date__isnull=True) | Q(end_date__isnull=True), then=Value('incomplete')),
+        When(start_date__gt=today, then=Value('upcoming')),
+        When(end_date__gte=today, then=Value('ongoing')),
+        default=Value('expired'),
+        output_field=CharField(),
+    )
 
 
 # =========================
@@ -4912,62 +5371,54 @@ def get_all_exams(request):
     """
     Returns all permanent exams with details for dashboard display.
     Includes: exam name, departments, student count, start_date, end_date, duration, status
-    Auto-deletes expired exams on each call.
+    Built from one query: one row per (exam, distinct department), with the
+    student count and status computed by the database.
     """
     try:
-        # Auto-cleanup expired exams before returning
-        cleanup_expired_exams()
-        
-        # DEBUG: Check all exams first
-        all_exams = Exam.objects.all()
-        logger.debug(f'Total exams in DB: {all_exams.count()}')
-        for exam in all_exams:
-            logger.debug(f'  - {exam.id}: {exam.name} | is_completed={exam.is_completed}, is_temporary={exam.is_temporary}')
-        
-        # Get all permanent exams
-        exams = Exam.objects.filter(is_completed=True, is_temporary=False)
-        logger.info(f'Found {exams.count()} permanent exams (is_completed=True AND is_temporary=False)')
-        
+        # Expired exams are hidden here and their rows purged off the request.
+        delete_expired_exams()
+
+        student_counts = (
+            ExamStudent.objects.filter(exam=OuterRef('pk'))
+            .order_by()
+            .values('exam')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        rows = (
+            Exam.objects.filter(is_completed=True, is_temporary=False)
+            .annotate(
+                student_count=Coalesce(Subquery(student_counts, output_field=IntegerField()), 0),
+                exam_status=exam_status_expression(),
+            )
+            .values('id', 'name', 'start_date', 'end_date', 'student_count', 'exam_status', 'departments__department')
+            .order_by('id', 'departments__department')
+            .distinct()
+        )
+
         exam_list = []
-        for exam in exams:
-            logger.debug(f'Processing exam: {exam.name} (ID: {exam.id})')
-            
-            # Get unique departments for this exam (remove duplicates)
-            dept_exams = DepartmentExam.objects.filter(exam=exam)
-            departments = sorted(set([de.department for de in dept_exams]))
-            
-            # Get student count
-            exam_students = ExamStudent.objects.filter(exam=exam)
-            student_count = exam_students.count()
-            
-            # Calculate duration in days (guard against missing dates)
-            if exam.start_date is None or exam.end_date is None:
-                logger.warning(f"Exam {exam.id} ('{exam.name}') missing start_date or end_date")
-                duration_days = None
-            else:
-                duration_days = (exam.end_date - exam.start_date).days
-            
-            # Ignore poorly configured exams that are essentially empty (temp artifacts)
-            if student_count == 0 and not departments and duration_days is None:
-                logger.info(f'Skipping empty exam {exam.id} ({exam.name}) from dashboard results')
+        for row in rows:
+            if exam_list and exam_list[-1]['id'] == row['id']:
+                exam_list[-1]['departments'].append(row['departments__department'])
                 continue
-            
-            # Determine exam status
-            status = get_exam_status(exam)
-            
-            exam_data = {
-                'id': exam.id,
-                'name': exam.name,
-                'departments': departments,
-                'student_count': student_count,
-                'start_date': str(exam.start_date) if exam.start_date else '',
-                'end_date': str(exam.end_date) if exam.end_date else '',
-                'duration_days': duration_days,
-                'status': status
-            }
-            logger.debug(f'Exam data prepared: {exam_data}')
-            exam_list.append(exam_data)
-        
+            start_date, end_date = row['start_date'], row['end_date']
+            exam_list.append({
+                'id': row['id'],
+                'name': row['name'],
+                'departments': [row['departments__department']] if row['departments__department'] else [],
+                'student_count': row['student_count'],
+                'start_date': str(start_date) if start_date else '',
+                'end_date': str(end_date) if end_date else '',
+                'duration_days': (end_date - start_date).days if start_date and end_date else None,
+                'status': row['exam_status'],
+            })
+
+        # Ignore poorly configured exams that are essentially empty (temp artifacts)
+        exam_list = [
+            exam for exam in exam_list
+            if exam['student_count'] or exam['departments'] or exam['duration_days'] is not None
+        ]
+
         logger.info(f'Returning {len(exam_list)} exams')
         return JsonResponse({
             'status': 'success',
@@ -4980,10 +5431,6 @@ def get_all_exams(request):
             'status': 'error',
             'message': str(e)
         }, status=400)
-        return JsonResponse({
-            'status': 'error',
-            'message': str(e)
-        }, status=400)
 
 
 # DEBUG: Simple test endpoint